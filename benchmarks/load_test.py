@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+End-to-end load generator simulating many IDE agents
+
+Each agent runs the usual loop: send_message_without_waiting to a few random
+peers, then long-poll get_messages, then think for a while. Reports
+throughput, delivery latency percentiles (send to receive, wall clock), peak
+server RSS and server event-loop lag.
+
+Modes:
+    http       start the app (create_app) in a subprocess and drive it over
+               Streamable HTTP, one MCP session per agent (default)
+    inprocess  call MessagingServer directly in this process, so the
+               difference to http mode is the transport cost
+
+Usage:
+    python benchmarks/load_test.py --agents 200 --duration 30
+    python benchmarks/load_test.py --mode inprocess --agents 2000 --duration 30
+    python benchmarks/load_test.py --url http://localhost:8111/mcp --agents 100   # already running server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import signal
+import socket
+import statistics
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+# Per-message INFO logs would dominate the numbers; set before the server is imported
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+STAMP = re.compile(r"bench-stamp (\d+\.\d+) ")
+STATS_PREFIX = "LOADTEST_SERVER_STATS "
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a periodic sleeper."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "loop_lag_p50_ms": percentile(self.samples, 50) * 1000,
+            "loop_lag_p99_ms": percentile(self.samples, 99) * 1000,
+            "loop_lag_max_ms": max(self.samples, default=0.0) * 1000,
+        }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Stats:
+    """Counters shared by all agents."""
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+        # Measurement window: from when all agents are ready until the last one stops
+        self.started = 0.0
+        self.finished = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.finished - self.started, 1e-9)
+
+    def record_deliveries(self, text: str) -> None:
+        """Count delivered benchmark messages in a tool result and their latency."""
+        now = time.time()
+        for match in STAMP.finditer(text):
+            self.received += 1
+            self.latencies.append(now - float(match.group(1)))
+
+
+def make_content(payload_bytes: int) -> str:
+    return f"bench-stamp {time.time():.6f} " + "x" * payload_bytes
+
+
+# Clients: the same two calls, in-process or over Streamable HTTP
+
+class InProcessClient:
+    def __init__(self, server, agent_id: str) -> None:
+        self.server = server
+        self.agent_id = agent_id
+
+    async def send(self, recipients: List[str], contents: List[str]) -> str:
+        return await self.server.send_message_without_waiting(self.agent_id, recipients, contents)
+
+    async def receive(self, max_messages: Optional[int]) -> str:
+        return await self.server.get_messages(self.agent_id, max_messages=max_messages)
+
+
+class HttpClient:
+    def __init__(self, session, agent_id: str) -> None:
+        self.session = session
+        self.agent_id = agent_id
+        self.config = {"my_sender_id": agent_id, "my_name": agent_id}
+
+    async def send(self, recipients: List[str], contents: List[str]) -> str:
+        return await self._call("send_message_without_waiting", {
+            "sender_id": self.agent_id,
+            "recipients": [{"id": r, "message": c} for r, c in zip(recipients, contents)],
+            "recipients_config": self.config,
+        })
+
+    async def receive(self, max_messages: Optional[int]) -> str:
+        arguments = {"sender_id": self.agent_id, "recipients_config": self.config}
+        if max_messages is not None:
+            arguments["max_messages"] = max_messages
+        return await self._call("get_messages", arguments)
+
+    async def _call(self, tool: str, arguments: Dict) -> str:
+        result = await self.session.call_tool(tool, arguments)
+        if result.isError:
+            raise RuntimeError(f"{tool} failed: {result.content}")
+        return "".join(getattr(item, "text", "") for item in result.content)
+
+
+async def run_agent(client, agent_ids: List[str], args, stats: Stats, stop_at: float) -> None:
+    """The send / long-poll / think loop of one agent until stop_at."""
+    rng = random.Random(client.agent_id)
+    peers = [a for a in agent_ids if a != client.agent_id]
+    while time.monotonic() < stop_at:
+        try:
+            recipients = rng.sample(peers, min(args.fanout, len(peers)))
+            contents = [make_content(args.payload_bytes) for _ in recipients]
+            # send_message_without_waiting also returns pending messages for the sender
+            stats.record_deliveries(await client.send(recipients, contents))
+            stats.sent += len(recipients)
+            stats.record_deliveries(await client.receive(args.max_messages))
+        except Exception as e:
+            stats.errors += 1
+            if stats.errors <= 5:
+                print(f"agent {client.agent_id}: {e}", file=sys.stderr)
+        if args.think_time > 0:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+
+async def run_inprocess(args, agent_ids: List[str], stats: Stats) -> Dict[str, float]:
+    from mcp_messaging import server
+
+    server.DEFAULT_CONFIG["timeouts"]["get_messages"] = args.poll_timeout
+    messaging_server = server.MessagingServer(server.create_queue_backend(args.backend))
+    await messaging_server.start()
+
+    monitor = LoopLagMonitor()
+    monitor_task = asyncio.create_task(monitor.run())
+    stats.started = time.monotonic()
+    stop_at = stats.started + args.duration
+    try:
+        await asyncio.gather(*(
+            run_agent(InProcessClient(messaging_server, agent_id), agent_ids, args, stats, stop_at)
+            for agent_id in agent_ids
+        ))
+        stats.finished = time.monotonic()
+    finally:
+        monitor_task.cancel()
+        await messaging_server.close()
+    return {"server_peak_rss_mb": peak_rss_mb(), **monitor.summary()}
+
+
+async def run_http(args, agent_ids: List[str], stats: Stats) -> Dict[str, float]:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    connect_slots = asyncio.Semaphore(args.connect_concurrency)
+    connected = asyncio.Event()
+    ready = 0
+    stop_at = None
+
+    async def agent(agent_id: str) -> None:
+        nonlocal ready, stop_at
+        async with AsyncExitStack() as stack:
+            async with connect_slots:
+                read_stream, write_stream, _ = await stack.enter_async_context(streamablehttp_client(url=url))
+                session = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+                await session.initialize()
+            ready += 1
+            if ready == len(agent_ids):
+                stats.started = time.monotonic()
+                stop_at = stats.started + args.duration
+                connected.set()
+            # Start the clock only when every agent has its session
+            await connected.wait()
+            await run_agent(HttpClient(session, agent_id), agent_ids, args, stats, stop_at)
+
+    server_process = None
+    url = args.url
+    if url is None:
+        server_process, url = await start_server(args)
+    try:
+        await asyncio.gather(*(agent(agent_id) for agent_id in agent_ids))
+        stats.finished = time.monotonic()
+    finally:
+        server_stats = await stop_server(server_process) if server_process else {}
+    return server_stats
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(args):
+    """Start this script in --serve-port mode and wait until it answers."""
+    import httpx
+
+    port = free_port()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__),
+        "--serve-port", str(port), "--backend", args.backend, "--poll-timeout", str(args.poll_timeout),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                await http.get(f"http://127.0.0.1:{port}/metrics")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+        else:
+            process.kill()
+            raise RuntimeError("benchmark server did not start")
+    return process, f"http://127.0.0.1:{port}/mcp"
+
+
+async def stop_server(process) -> Dict[str, float]:
+    """Stop the server subprocess and read the stats it prints on shutdown."""
+    process.send_signal(signal.SIGINT)
+    stdout, _ = await process.communicate()
+    for line in stdout.decode(errors="replace").splitlines():
+        if line.startswith(STATS_PREFIX):
+            return json.loads(line[len(STATS_PREFIX):])
+    return {}
+
+
+def serve(args) -> None:
+    """Server side of http mode: the real app plus a loop lag monitor."""
+    import uvicorn
+
+    from mcp_messaging import server
+
+    server.DEFAULT_CONFIG["timeouts"]["get_messages"] = args.poll_timeout
+    server.messaging_server.queue_backend = server.create_queue_backend(args.backend)
+    config = uvicorn.Config(server.create_app(), host="127.0.0.1", port=args.serve_port, log_level="warning")
+    monitor = LoopLagMonitor()
+
+    async def main() -> None:
+        monitor_task = asyncio.create_task(monitor.run())
+        await uvicorn.Server(config).serve()
+        monitor_task.cancel()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # uvicorn re-raises the SIGINT it handled once it has shut down
+        pass
+    print(STATS_PREFIX + json.dumps({"server_peak_rss_mb": peak_rss_mb(), **monitor.summary()}), flush=True)
+
+
+def report(args, stats: Stats, server_stats: Dict[str, float]) -> None:
+    latencies = stats.latencies
+    print(f"\nmode={args.mode} backend={args.backend} agents={args.agents} fanout={args.fanout} "
+          f"payload={args.payload_bytes}B think={args.think_time}s")
+    print(f"{'sent':>10} {'received':>10} {'errors':>8} {'msgs/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print(
+        f"{stats.sent:>10} {stats.received:>10} {stats.errors:>8} {stats.received / stats.elapsed:>10.0f} "
+        f"{percentile(latencies, 50) * 1000:>9.2f} {percentile(latencies, 95) * 1000:>9.2f} "
+        f"{percentile(latencies, 99) * 1000:>9.2f}"
+    )
+    if latencies:
+        print(f"mean delivery latency: {statistics.fmean(latencies) * 1000:.2f} ms")
+    if server_stats:
+        print(
+            f"server: peak RSS {server_stats['server_peak_rss_mb']:.1f} MB, event-loop lag "
+            f"p50 {server_stats['loop_lag_p50_ms']:.2f} ms / p99 {server_stats['loop_lag_p99_ms']:.2f} ms / "
+            f"max {server_stats['loop_lag_max_ms']:.2f} ms"
+        )
+    else:
+        print("server: not measured (external --url)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate many IDE agents messaging through the server")
+    parser.add_argument("--mode", choices=["http", "inprocess"], default="http", help="Drive the server over HTTP or call it directly")
+    parser.add_argument("--agents", type=int, default=100, help="Number of simulated agents")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds each agent keeps sending")
+    parser.add_argument("--fanout", type=int, default=2, help="Recipients per send")
+    parser.add_argument("--payload-bytes", type=int, default=256, help="Padding added to each message")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between iterations (exponential)")
+    parser.add_argument("--max-messages", type=int, default=None, help="Page size for get_messages")
+    parser.add_argument("--poll-timeout", type=float, default=5.0, help="get_messages long-poll timeout on the server")
+    parser.add_argument("--backend", default="memory", choices=["memory", "redis", "sqlite", "segment"], help="Queue backend")
+    parser.add_argument("--connect-concurrency", type=int, default=50, help="HTTP sessions opened at once")
+    parser.add_argument("--url", default=None, help="Use an already running server's MCP URL (http mode)")
+    parser.add_argument("--serve-port", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_port is not None:
+        serve(args)
+        return
+
+    agent_ids = [f"agent_{i}" for i in range(args.agents)]
+    stats = Stats()
+    runner = run_inprocess if args.mode == "inprocess" else run_http
+
+    server_stats = asyncio.run(runner(args, agent_ids, stats))
+    report(args, stats, server_stats)
+
+
+if __name__ == "__main__":
+    main()
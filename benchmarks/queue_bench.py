@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+QueueBackend micro-benchmark suite
+
+Times the core QueueBackend operations against any backend while the number
+of queues, messages per queue and payload size scale:
+
+    send       send_message for every message (--concurrency sends in flight)
+    peek       get_messages(pop=False) on every queue
+    pop        get_messages(pop=True) draining every queue
+    expire     cleanup_expired_messages removing every message
+    wait       wait_for_messages woken by send_message + notify_new_message,
+               one waiter per queue
+
+"ops" counts messages for send and expire, get_messages calls (one per
+queue) for peek and pop, and wake-ups for wait. Each case runs on a fresh
+backend and the best of --repeat runs is kept.
+
+Results go to a JSON file; ``compare`` diffs two result files so a backend
+change can come with numbers.
+
+Usage:
+    python benchmarks/queue_bench.py run --output before.json
+    python benchmarks/queue_bench.py run --backends memory sqlite --queues 1 1000 --messages 100 --payloads 64 65536 --output after.json
+    python benchmarks/queue_bench.py compare before.json after.json --threshold 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend, QueueBackend
+
+OPERATIONS = ["send", "peek", "pop", "expire", "wait"]
+BACKENDS = ["memory", "sqlite", "segment", "redis"]
+
+# Expiry is timed explicitly, so background sweepers must never run during a case
+NO_SWEEP = 3600.0
+EXPIRATION = 0.05
+
+
+def make_backend(name: str, workdir: str, expiration: float, redis_url: Optional[str]) -> QueueBackend:
+    if name == "memory":
+        return InMemoryQueueBackend(message_expiration_seconds=expiration, sweep_interval_seconds=NO_SWEEP)
+    if name == "sqlite":
+        from mcp_messaging.sqlite_backend import SqliteQueueBackend
+        return SqliteQueueBackend(
+            path=os.path.join(workdir, "bench.db"), message_expiration_seconds=expiration, sweep_interval_seconds=NO_SWEEP
+        )
+    if name == "segment":
+        from mcp_messaging.segment_backend import SegmentLogQueueBackend
+        return SegmentLogQueueBackend(
+            directory=os.path.join(workdir, "segments"), message_expiration_seconds=expiration, sweep_interval_seconds=NO_SWEEP
+        )
+    if name == "redis":
+        from mcp_messaging.redis_backend import RedisQueueBackend
+        return RedisQueueBackend(
+            url=redis_url,
+            message_expiration_seconds=expiration,
+            key_prefix=f"mcpbench{os.getpid()}",
+            sweep_interval_seconds=NO_SWEEP,
+        )
+    raise ValueError(f"Unknown backend: {name}")
+
+
+async def open_backend(name: str, workdir: str, expiration: float, redis_url: Optional[str]) -> QueueBackend:
+    backend = make_backend(name, workdir, expiration, redis_url)
+    # The in-memory backend's start() only runs its expiry sweeper, which
+    # wakes at message deadlines regardless of the sweep interval
+    if name != "memory":
+        await backend.start()
+    return backend
+
+
+def make_batch(queues: int, messages: int, payload: int) -> List[Tuple[str, Message]]:
+    content = "x" * payload
+    return [(f"client_{q}", Message(from_client_id="bench", content=content)) for _ in range(messages) for q in range(queues)]
+
+
+async def send_all(backend: QueueBackend, batch: List[Tuple[str, Message]], concurrency: int) -> None:
+    for start in range(0, len(batch), concurrency):
+        await asyncio.gather(*(backend.send_message(r, m) for r, m in batch[start:start + concurrency]))
+
+
+async def bench_case(backend_name: str, operation: str, queues: int, messages: int, payload: int, args) -> Tuple[int, float]:
+    """Run one case on a fresh backend; returns (operations timed, seconds)."""
+    expiration = EXPIRATION if operation == "expire" else float("inf")
+    with tempfile.TemporaryDirectory(prefix="queue_bench_") as workdir:
+        backend = await open_backend(backend_name, workdir, expiration, args.redis_url)
+        try:
+            client_ids = [f"client_{q}" for q in range(queues)]
+            batch = make_batch(queues, messages, payload)
+
+            if operation == "send":
+                start = time.perf_counter()
+                await send_all(backend, batch, args.concurrency)
+                return len(batch), time.perf_counter() - start
+
+            if operation == "wait":
+                return await bench_wait(backend, client_ids, payload)
+
+            await send_all(backend, batch, args.concurrency)
+
+            if operation == "peek":
+                start = time.perf_counter()
+                for client_id in client_ids:
+                    await backend.get_messages(client_id, pop=False)
+                return queues, time.perf_counter() - start
+
+            if operation == "pop":
+                start = time.perf_counter()
+                for client_id in client_ids:
+                    await backend.get_messages(client_id, pop=True)
+                return queues, time.perf_counter() - start
+
+            if operation == "expire":
+                await asyncio.sleep(EXPIRATION * 2)
+                start = time.perf_counter()
+                removed = await backend.cleanup_expired_messages()
+                elapsed = time.perf_counter() - start
+                if removed != len(batch):
+                    raise RuntimeError(f"expected {len(batch)} expired messages, got {removed}")
+                return removed, elapsed
+
+            raise ValueError(f"Unknown operation: {operation}")
+        finally:
+            await backend.close()
+
+
+async def bench_wait(backend: QueueBackend, client_ids: List[str], payload: int) -> Tuple[int, float]:
+    """Time from sending to one blocked receiver per queue until all have been woken."""
+    waiters = [asyncio.create_task(backend.wait_for_messages(client_id, timeout=30.0)) for client_id in client_ids]
+    await asyncio.sleep(0.05)  # let every waiter register
+    content = "x" * payload
+
+    start = time.perf_counter()
+    for client_id in client_ids:
+        await backend.send_message(client_id, Message(from_client_id="bench", content=content))
+        await backend.notify_new_message(client_id)
+    delivered = await asyncio.gather(*waiters)
+    elapsed = time.perf_counter() - start
+
+    if not all(delivered):
+        raise RuntimeError("a waiter timed out")
+    return len(client_ids), elapsed
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict:
+    results = []
+    for backend_name in args.backends:
+        for operation in args.operations:
+            for queues in args.queues:
+                for messages in args.messages:
+                    for payload in args.payloads:
+                        if operation == "wait" and messages != args.messages[0]:
+                            continue  # one message per queue; messages per queue does not apply
+                        best = float("inf")
+                        for _ in range(args.repeat):
+                            ops, seconds = await bench_case(backend_name, operation, queues, messages, payload, args)
+                            best = min(best, seconds)
+                        result = {
+                            "backend": backend_name,
+                            "operation": operation,
+                            "queues": queues,
+                            "messages_per_queue": 1 if operation == "wait" else messages,
+                            "payload_bytes": payload,
+                            "ops": ops,
+                            "seconds": best,
+                            "ops_per_sec": ops / best if best else 0.0,
+                            "us_per_op": best / ops * 1e6 if ops else 0.0,
+                        }
+                        results.append(result)
+                        print(format_row(result), flush=True)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+
+def case_key(result: Dict) -> Tuple:
+    return (result["backend"], result["operation"], result["queues"], result["messages_per_queue"], result["payload_bytes"])
+
+
+HEADER = f"{'backend':<8} {'operation':<7} {'queues':>7} {'msgs/q':>7} {'payload':>8} {'ops':>9} {'us/op':>10} {'ops/s':>12}"
+
+
+def format_row(result: Dict) -> str:
+    backend, operation, queues, messages, payload = case_key(result)
+    return (
+        f"{backend:<8} {operation:<7} {queues:>7} {messages:>7} {payload:>8} {result['ops']:>9} "
+        f"{result['us_per_op']:>10.2f} {result['ops_per_sec']:>12.0f}"
+    )
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    """Print per-case change in us/op between two result files; returns the number of regressions."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    base_results = {case_key(r): r for r in base["results"]}
+    print(f"base: {base_path} ({base['meta'].get('commit')}, {base['meta'].get('created')})")
+    print(f"new:  {new_path} ({new['meta'].get('commit')}, {new['meta'].get('created')})\n")
+    print(f"{'backend':<8} {'operation':<7} {'queues':>7} {'msgs/q':>7} {'payload':>8} {'base us/op':>11} {'new us/op':>10} {'change':>8}")
+
+    regressions = 0
+    for result in new["results"]:
+        before = base_results.get(case_key(result))
+        if before is None or not before["us_per_op"]:
+            continue
+        change = (result["us_per_op"] / before["us_per_op"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        backend, operation, queues, messages, payload = case_key(result)
+        print(
+            f"{backend:<8} {operation:<7} {queues:>7} {messages:>7} {payload:>8} "
+            f"{before['us_per_op']:>11.2f} {result['us_per_op']:>10.2f} {change:>+7.1f}%{flag}"
+        )
+
+    missing = len(set(base_results) - {case_key(r) for r in new["results"]})
+    if missing:
+        print(f"\n{missing} case(s) only in {base_path}")
+    print(f"\n{regressions} case(s) slower by more than {threshold:g}%")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark QueueBackend operations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark grid and write a results file")
+    run_parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["memory", "sqlite", "segment"])
+    run_parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    run_parser.add_argument("--queues", type=int, nargs="+", default=[1, 100, 1000], help="Number of queues")
+    run_parser.add_argument("--messages", type=int, nargs="+", default=[10, 100], help="Messages per queue")
+    run_parser.add_argument("--payloads", type=int, nargs="+", default=[64, 4096], help="Payload sizes in bytes")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best is reported)")
+    run_parser.add_argument("--concurrency", type=int, default=100, help="Sends in flight while filling queues")
+    run_parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/15"), help="Redis for --backends redis")
+    run_parser.add_argument("--output", default="queue_bench.json", help="Results file (JSON)")
+
+    compare_parser = commands.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("base", help="Baseline results file")
+    compare_parser.add_argument("new", help="New results file")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Percent change reported as slower/faster")
+    compare_parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if any case got slower")
+
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    if args.command == "compare":
+        regressions = compare(args.base, args.new, args.threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+    print(HEADER)
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Markdown rendering micro-benchmark
+
+Compares the original per-message formatting (datetime.now() per message,
+list of parts joined at the end) with MarkdownRenderer.
+
+Usage:
+    python benchmarks/render_bench.py
+    python benchmarks/render_bench.py --sizes 1000 100000 --repeat 5
+"""
+
+import argparse
+import io
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from mcp_messaging.models import Message, format_relative_time
+from mcp_messaging.rendering import MarkdownRenderer
+
+
+def make_messages(count: int, senders: int = 20) -> List[Message]:
+    """count messages from a handful of senders, spread over the last two days.
+
+    Ages sit mid-minute so both renderers see the same relative-time labels.
+    """
+    now = time.time()
+    return [
+        Message(
+            from_client_id=f"sender_{i % senders}",
+            content=f"Status update {i}: build finished, 3 tests flaky, see CI run #{i * 7}",
+            wall_time=now - (i * 2880 // count) * 60 - 30,
+        )
+        for i in range(count)
+    ]
+
+
+def render_legacy(sender_id: str, messages: List[Message]) -> str:
+    """The original _format_messages_as_markdown."""
+    message_parts = [
+        f"📬 **{len(messages)} message{'s' if len(messages) > 1 else ''} for `{sender_id}`:**\n"
+    ]
+    for msg in messages:
+        relative_time = format_relative_time(msg.timestamp)
+        message_parts.append(f"**From:** `{msg.from_client_id}` ({relative_time})\n{msg.content}\n")
+    return "\n".join(message_parts)
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark markdown rendering of message drains")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000], help="Message counts to render")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    renderer = MarkdownRenderer()
+    print(f"{'messages':>10} {'legacy ms':>12} {'renderer ms':>12} {'stream ms':>12} {'per 1k (renderer)':>18} {'speedup':>8}")
+
+    for size in args.sizes:
+        messages = make_messages(size)
+        assert render_legacy("bench", messages) == renderer.render("bench", messages)
+
+        legacy = best_of(args.repeat, lambda: render_legacy("bench", messages))
+        fast = best_of(args.repeat, lambda: renderer.render("bench", messages))
+        stream = best_of(args.repeat, lambda: renderer.render_to(io.StringIO(), "bench", messages))
+
+        print(
+            f"{size:>10} {legacy * 1000:>12.2f} {fast * 1000:>12.2f} {stream * 1000:>12.2f} "
+            f"{fast * 1000 * 1000 / size:>15.3f} ms {legacy / fast:>7.1f}x"
+        )
+
+    print(f"\nRun at {datetime.now():%Y-%m-%d %H:%M:%S}; best of {args.repeat} runs each.")
+
+
+if __name__ == "__main__":
+    main()
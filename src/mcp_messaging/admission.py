@@ -0,0 +1,104 @@
+"""Admission control for blocking tool calls (long-polls)."""
+
+import os
+import random
+from typing import Dict, Iterable, Optional
+
+
+class WaitAdmission:
+    """Caps on how many blocking calls may be parked at once, overall and per client.
+
+    Every ``get_messages``, ``get_messages_multi`` or ``send_message_and_wait``
+    call that is about to block takes a slot with ``try_acquire`` and gives it
+    back with ``release``. When a cap is full the call is turned away at once
+    (with a retry hint) instead of adding one more sleeping coroutine and
+    open socket, so a reconnect storm cannot pile up unbounded waiters.
+
+    Counts are O(1) per call; clients without a parked call take no memory.
+    None means unlimited.
+    """
+
+    def __init__(
+        self,
+        max_waiters: Optional[int] = None,
+        max_waiters_per_client: Optional[int] = None,
+        retry_after_ms: int = 1000,
+    ):
+        self.max_waiters = max_waiters
+        self.max_waiters_per_client = max_waiters_per_client
+        self.retry_after_ms = retry_after_ms
+        self._active = 0
+        self._per_client: Dict[str, int] = {}
+        # Calls turned away, by cap ("global" or "client")
+        self.rejected: Dict[str, int] = {"global": 0, "client": 0}
+        # Bumped on every change, for ETags of the stats
+        self.version = 0
+
+    @classmethod
+    def from_env(cls) -> "WaitAdmission":
+        def optional_int(name: str) -> Optional[int]:
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            max_waiters=optional_int("MAX_WAITERS"),
+            max_waiters_per_client=optional_int("MAX_WAITERS_PER_CLIENT"),
+            retry_after_ms=int(os.getenv("WAITER_RETRY_AFTER_MS", "1000")),
+        )
+
+    def __len__(self) -> int:
+        """Number of admitted blocking calls."""
+        return self._active
+
+    def waiting(self, client_id: str) -> int:
+        """Number of admitted blocking calls for client_id."""
+        return self._per_client.get(client_id, 0)
+
+    def try_acquire(self, client_ids: Iterable[str]) -> Optional[str]:
+        """Admit one blocking call on behalf of client_ids (all counted against their caps).
+
+        Returns None when admitted - pair with ``release`` - or the cap that is
+        full ("global" or "client").
+        """
+        client_ids = list(client_ids)
+        refused = None
+        if self.max_waiters is not None and self._active >= self.max_waiters:
+            refused = "global"
+        elif self.max_waiters_per_client is not None and any(
+            self._per_client.get(client_id, 0) >= self.max_waiters_per_client for client_id in client_ids
+        ):
+            refused = "client"
+        self.version += 1
+        if refused is not None:
+            self.rejected[refused] += 1
+            return refused
+
+        self._active += 1
+        for client_id in client_ids:
+            self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+        return None
+
+    def release(self, client_ids: Iterable[str]) -> None:
+        """Give back the slot taken by ``try_acquire`` for client_ids."""
+        self._active -= 1
+        for client_id in client_ids:
+            remaining = self._per_client[client_id] - 1
+            if remaining:
+                self._per_client[client_id] = remaining
+            else:
+                del self._per_client[client_id]
+        self.version += 1
+
+    def retry_after(self) -> int:
+        """Milliseconds a turned-away client should wait, jittered so retries spread out."""
+        return int(self.retry_after_ms * (1 + random.random()))
+
+    def stats(self) -> Dict:
+        """Admission counters for the sessions API."""
+        return {
+            "blocking_calls": self._active,
+            "blocking_clients": len(self._per_client),
+            "max_blocking_calls": self.max_waiters,
+            "max_blocking_calls_per_client": self.max_waiters_per_client,
+            "rejected_calls": dict(self.rejected),
+        }
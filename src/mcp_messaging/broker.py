@@ -0,0 +1,468 @@
+"""Local queue broker, so several server worker processes can share queues.
+
+One broker process owns an ``InMemoryQueueBackend`` and serves it over a Unix
+domain socket. Each HTTP worker uses a ``BrokerQueueBackend``: a single
+connection on which requests are pipelined (many in flight, replies matched
+by request ID) and over which the broker pushes wake-ups.
+
+Wire format: every frame is ``!I`` length, then ``!BI`` opcode and request ID,
+then the body. Strings are ``!I``-length-prefixed UTF-8; messages are sender,
+content, wall time (``!d``) and sequence number (``!q``). Request ID 0 means
+no reply is expected.
+
+Run the broker on its own with ``python -m mcp_messaging.broker``, or let
+``mcp-ide-bridge --workers N`` start it.
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import signal
+import struct
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .limits import EnqueueResult, QueueLimits
+from .message_logging import configure_logging
+from .models import Message
+from .queue_backends import InMemoryQueueBackend, QueueBackend
+from .waiters import WaiterRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "mcp_broker.sock"
+
+# Requests (worker -> broker)
+OP_SEND = 1
+OP_SEND_BATCH = 2
+OP_BROADCAST = 3
+OP_GET = 4
+OP_CLEANUP = 5
+OP_DEPTH = 6
+OP_DEPTHS = 7
+OP_NOTIFY = 8
+# Responses and pushes (broker -> worker)
+OP_REPLY = 100
+OP_ERROR = 101
+OP_WAKE = 102
+
+_LENGTH = struct.Struct("!I")
+_HEADER = struct.Struct("!BI")
+_U8 = struct.Struct("!B")
+_U32 = struct.Struct("!I")
+_I64 = struct.Struct("!q")
+_F64 = struct.Struct("!d")
+
+# Await drain() only once this much output is buffered, so pipelined writes
+# are not serialized on the socket
+WRITE_HIGH_WATER = 256 * 1024
+
+
+class BrokerError(Exception):
+    """The broker failed to execute a request."""
+
+
+class _Encoder:
+    __slots__ = ("buf",)
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+
+    def u8(self, value: int) -> "_Encoder":
+        self.buf += _U8.pack(value)
+        return self
+
+    def u32(self, value: int) -> "_Encoder":
+        self.buf += _U32.pack(value)
+        return self
+
+    def i64(self, value: int) -> "_Encoder":
+        self.buf += _I64.pack(value)
+        return self
+
+    def text(self, value: str) -> "_Encoder":
+        data = value.encode()
+        self.buf += _U32.pack(len(data))
+        self.buf += data
+        return self
+
+    def texts(self, values: List[str]) -> "_Encoder":
+        self.u32(len(values))
+        for value in values:
+            self.text(value)
+        return self
+
+    def message(self, message: Message) -> "_Encoder":
+        self.text(message.from_client_id).text(message.content)
+        self.buf += _F64.pack(message.wall_time)
+        # Empty text = no correlation ID
+        return self.i64(message.seq).text(message.correlation_id or "")
+
+    def result(self, result: EnqueueResult) -> "_Encoder":
+        return self.text(result.status).text(result.reason).u32(result.dropped)
+
+
+class _Decoder:
+    __slots__ = ("data", "offset")
+
+    def __init__(self, data: bytes, offset: int = 0) -> None:
+        self.data = data
+        self.offset = offset
+
+    def _unpack(self, fmt: struct.Struct):
+        value, = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return value
+
+    def u8(self) -> int:
+        return self._unpack(_U8)
+
+    def u32(self) -> int:
+        return self._unpack(_U32)
+
+    def i64(self) -> int:
+        return self._unpack(_I64)
+
+    def text(self) -> str:
+        length = self.u32()
+        start = self.offset
+        self.offset += length
+        return self.data[start:self.offset].decode()
+
+    def texts(self) -> List[str]:
+        return [self.text() for _ in range(self.u32())]
+
+    def message(self) -> Message:
+        sender = self.text()
+        content = self.text()
+        wall_time = self._unpack(_F64)
+        seq = self.i64()
+        correlation_id = self.text() or None
+        return Message(from_client_id=sender, content=content, wall_time=wall_time, seq=seq, correlation_id=correlation_id)
+
+    def result(self) -> EnqueueResult:
+        return EnqueueResult(status=self.text(), reason=self.text(), dropped=self.u32())
+
+
+def _frame(opcode: int, request_id: int, body: bytes = b"") -> bytes:
+    return _LENGTH.pack(_HEADER.size + len(body)) + _HEADER.pack(opcode, request_id) + body
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Tuple[int, int, _Decoder]:
+    length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    payload = await reader.readexactly(length)
+    opcode, request_id = _HEADER.unpack_from(payload)
+    return opcode, request_id, _Decoder(payload, _HEADER.size)
+
+
+def _optional(value: Optional[int]) -> int:
+    return -1 if value is None else value
+
+
+class QueueBroker:
+    """Serves one in-memory backend to worker processes over a Unix socket."""
+
+    def __init__(self, backend: InMemoryQueueBackend, path: str = DEFAULT_SOCKET_PATH):
+        self.backend = backend
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Start the backend's background work and listen on the socket."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        await self.backend.start()
+        self._server = await asyncio.start_unix_server(self._handle_connection, self.path)
+        logger.info(f"Queue broker listening on {self.path}")
+
+    async def close(self) -> None:
+        """Stop listening, drop worker connections and stop the backend."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._connections):
+            writer.close()
+        await self.backend.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        logger.info(f"Worker connected to queue broker ({len(self._connections)} connected)")
+        try:
+            while True:
+                opcode, request_id, body = await _read_frame(reader)
+                try:
+                    reply = await self._dispatch(opcode, body)
+                except Exception as e:
+                    logger.error(f"Queue broker request {opcode} failed: {e}")
+                    if request_id:
+                        writer.write(_frame(OP_ERROR, request_id, bytes(_Encoder().text(str(e)).buf)))
+                else:
+                    if request_id:
+                        writer.write(_frame(OP_REPLY, request_id, reply))
+                if writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+            logger.info(f"Worker disconnected from queue broker ({len(self._connections)} connected)")
+
+    async def _dispatch(self, opcode: int, body: _Decoder) -> bytes:
+        backend = self.backend
+        out = _Encoder()
+
+        if opcode == OP_SEND:
+            recipient_id = body.text()
+            out.result(await backend.send_message(recipient_id, body.message()))
+        elif opcode == OP_SEND_BATCH:
+            batch = [(body.text(), body.message()) for _ in range(body.u32())]
+            results = await backend.send_messages(batch)
+            out.u32(len(results))
+            for result in results:
+                out.result(result)
+        elif opcode == OP_BROADCAST:
+            recipient_ids = body.texts()
+            results = await backend.send_broadcast(recipient_ids, body.message())
+            out.u32(len(results))
+            for result in results:
+                out.result(result)
+        elif opcode == OP_GET:
+            client_id = body.text()
+            pop = bool(body.u8())
+            max_messages = body.i64()
+            max_bytes = body.i64()
+            messages = await backend.get_messages(
+                client_id,
+                pop=pop,
+                max_messages=None if max_messages < 0 else max_messages,
+                max_bytes=None if max_bytes < 0 else max_bytes,
+            )
+            out.u32(len(messages))
+            for message in messages:
+                out.message(message)
+        elif opcode == OP_CLEANUP:
+            out.i64(await backend.run_expiry_sweep())
+        elif opcode == OP_DEPTH:
+            out.i64(await backend.queue_depth(body.text()))
+        elif opcode == OP_DEPTHS:
+            depths = await backend.queue_depths()
+            out.u32(len(depths))
+            for client_id, depth in depths.items():
+                out.text(client_id).i64(depth)
+        elif opcode == OP_NOTIFY:
+            # Fan the wake-up out to every worker; each wakes its own waiters
+            wake = _frame(OP_WAKE, 0, body.data[body.offset:])
+            for writer in self._connections:
+                writer.write(wake)
+        else:
+            raise BrokerError(f"unknown opcode {opcode}")
+
+        return bytes(out.buf)
+
+
+class BrokerQueueBackend(QueueBackend):
+    """Queue backend client for a ``QueueBroker`` on a Unix socket.
+
+    Keeps one connection per process. Requests are pipelined: each gets a
+    request ID and a future, the write is not awaited, and a reader task
+    resolves futures as replies arrive (in any order). Wake-ups are pushed by
+    the broker and fanned out to local waiters, so blocked ``get_messages``
+    calls cost nothing on the socket. After a lost connection, in-flight
+    requests fail with ConnectionError and the next request reconnects.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH):
+        self.path = path
+        self.waiters = WaiterRegistry()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        logger.info(f"Initialized BrokerQueueBackend ({path})")
+
+    # Connection and pipelining
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        if self._writer is None:
+            async with self._connect_lock:
+                if self._writer is None:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                    self._writer = writer
+                    self._reader_task = asyncio.create_task(self._read_replies(reader, writer))
+                    logger.info(f"Connected to queue broker at {self.path}")
+        return self._writer
+
+    async def _request(self, opcode: int, body: _Encoder) -> _Decoder:
+        writer = await self._connection()
+        request_id = next(self._request_ids) % 0xFFFFFFFF + 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        writer.write(_frame(opcode, request_id, bytes(body.buf)))
+        if writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+            await writer.drain()
+        return await future
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                opcode, request_id, body = await _read_frame(reader)
+                if opcode == OP_WAKE:
+                    for client_id in body.texts():
+                        self.waiters.notify(client_id)
+                    continue
+
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if opcode == OP_ERROR:
+                    future.set_exception(BrokerError(body.text()))
+                else:
+                    future.set_result(body)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.error(f"Lost connection to queue broker: {e!r}")
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("queue broker connection lost"))
+
+    # QueueBackend interface
+
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Queue message in the broker."""
+        reply = await self._request(OP_SEND, _Encoder().text(recipient_id).message(message))
+        return reply.result()
+
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Queue a batch in one request."""
+        if not batch:
+            return []
+        body = _Encoder().u32(len(batch))
+        for recipient_id, message in batch:
+            body.text(recipient_id).message(message)
+        reply = await self._request(OP_SEND_BATCH, body)
+        return [reply.result() for _ in range(reply.u32())]
+
+    async def send_broadcast(self, recipient_ids: List[str], message: Message) -> List[EnqueueResult]:
+        """Send the message once; the broker queues the shared payload for every recipient."""
+        reply = await self._request(OP_BROADCAST, _Encoder().texts(recipient_ids).message(message))
+        return [reply.result() for _ in range(reply.u32())]
+
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get (and optionally pop) one page of messages from the broker."""
+        body = _Encoder().text(client_id).u8(pop).i64(_optional(max_messages)).i64(_optional(max_bytes))
+        reply = await self._request(OP_GET, body)
+        return [reply.message() for _ in range(reply.u32())]
+
+    async def cleanup_expired_messages(self) -> int:
+        """Run an expiry sweep in the broker (which also sweeps on its own)."""
+        return (await self._request(OP_CLEANUP, _Encoder())).i64()
+
+    async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
+        """Block until the broker pushes a wake-up for client_id (or timeout)."""
+        waiter = self.waiters.register([client_id])
+        try:
+            # Registered before checking, so a wake-up pushed in between still wakes us
+            if await self.queue_depth(client_id) > 0:
+                logger.debug(f"Messages already available for {client_id}")
+                return True
+
+            logger.debug(f"Waiting for new message for {client_id} (timeout: {timeout}s)")
+            if await self.waiters.wait(waiter, timeout) is None:
+                logger.debug(f"Timeout waiting for message for {client_id}")
+                return False
+            return True
+        finally:
+            self.waiters.unregister(waiter)
+
+    async def notify_new_message(self, client_id: str) -> None:
+        """Ask the broker to wake waiters for client_id in every worker."""
+        await self.notify_new_messages([client_id])
+
+    async def notify_new_messages(self, client_ids: Iterable[str]) -> None:
+        """One fire-and-forget frame for all clients; no reply is awaited."""
+        client_ids = list(client_ids)
+        if client_ids:
+            writer = await self._connection()
+            writer.write(_frame(OP_NOTIFY, 0, bytes(_Encoder().texts(client_ids).buf)))
+
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        return (await self._request(OP_DEPTH, _Encoder().text(client_id))).i64()
+
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages."""
+        reply = await self._request(OP_DEPTHS, _Encoder())
+        return {reply.text(): reply.i64() for _ in range(reply.u32())}
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Connect to the broker (expiry runs in the broker, not here)."""
+        await self._connection()
+
+    async def close(self) -> None:
+        """Close the broker connection."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+
+
+async def run_broker(path: str, message_expiration_seconds: float) -> None:
+    """Run a broker until SIGINT/SIGTERM."""
+    backend = InMemoryQueueBackend(message_expiration_seconds=message_expiration_seconds, limits=QueueLimits.from_env())
+    broker = QueueBroker(backend, path)
+    await broker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await broker.close()
+
+
+def main() -> None:
+    """Entry point: ``python -m mcp_messaging.broker``."""
+    parser = argparse.ArgumentParser(description="Local queue broker shared by MCP messaging server workers")
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("BROKER_SOCKET", DEFAULT_SOCKET_PATH),
+        help="Unix socket path to listen on",
+    )
+    parser.add_argument(
+        "--message-expiration",
+        type=float,
+        default=300.0,
+        help="Seconds before undelivered messages expire",
+    )
+    args = parser.parse_args()
+
+    configure_logging(level=os.getenv("LOG_LEVEL", "INFO"), log_format=os.getenv("LOG_FORMAT", "text"))
+    asyncio.run(run_broker(args.socket, args.message_expiration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Registry of recently active messaging clients for session stats."""
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+from .models import monotonic_to_wall
+
+
+class ClientInfo:
+    """What a client last told us about itself, and when it was last seen."""
+
+    __slots__ = ("client_id", "name", "description", "client_type", "last_seen")
+
+    def __init__(self, client_id: str, name: str, description: str, client_type: str, last_seen: float):
+        self.client_id = client_id
+        self.name = name
+        self.description = description
+        self.client_type = client_type
+        # time.monotonic() value
+        self.last_seen = last_seen
+
+    def to_dict(self) -> Dict:
+        """The messagingClients entry fields for this client."""
+        return {
+            "client_id": self.client_id,
+            "name": self.name,
+            "description": self.description,
+            "clientType": self.client_type,
+            "last_seen": datetime.fromtimestamp(monotonic_to_wall(self.last_seen)).isoformat(),
+        }
+
+
+class ClientRegistry:
+    """Recently active clients, bounded by age and count.
+
+    Clients are kept in an ``OrderedDict`` in least-recently-seen order:
+    ``touch`` updates the slotted entry in place and moves it to the end, so
+    stale clients are always at the front. That makes every operation O(1)
+    (amortized for eviction):
+
+    - presence (``in``) and lookups are dict lookups
+    - clients not seen for ``ttl_seconds``, and the least recently seen ones
+      beyond ``max_clients``, are evicted from the front
+    - ``recent(offset, limit)`` pages most-recent-first from the end, without
+      visiting clients outside the page
+
+    Every change bumps ``version`` and calls ``on_change(client_id)``.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_clients: Optional[int] = 10_000):
+        self._clients: "OrderedDict[str, ClientInfo]" = OrderedDict()
+        self.ttl_seconds = ttl_seconds
+        self.max_clients = max_clients
+        self.version = 0
+        self.on_change: Optional[Callable[[str], None]] = None
+
+    @classmethod
+    def from_env(cls) -> "ClientRegistry":
+        max_clients = os.getenv("MAX_TRACKED_CLIENTS")
+        return cls(
+            ttl_seconds=float(os.getenv("CLIENT_TTL_SECONDS", "3600")),
+            max_clients=int(max_clients) if max_clients else 10_000,
+        )
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._clients
+
+    def get(self, client_id: str) -> Optional[ClientInfo]:
+        return self._clients.get(client_id)
+
+    def touch(
+        self,
+        client_id: str,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        client_type: Optional[str] = None,
+    ) -> ClientInfo:
+        """Mark client_id as seen now, updating whichever details are given."""
+        now = time.monotonic()
+        info = self._clients.get(client_id)
+        if info is None:
+            info = self._clients[client_id] = ClientInfo(
+                client_id, name or client_id, description or "", client_type or "agent by IDE", now
+            )
+        else:
+            self._clients.move_to_end(client_id)
+            info.last_seen = now
+            if name is not None:
+                info.name = name
+            if description is not None:
+                info.description = description
+            if client_type is not None:
+                info.client_type = client_type
+        self._changed(client_id)
+        self.evict_stale(now)
+        return info
+
+    def seen_within(self, client_id: str, seconds: float) -> bool:
+        """True if client_id was seen in the last ``seconds``."""
+        info = self._clients.get(client_id)
+        return info is not None and time.monotonic() - info.last_seen <= seconds
+
+    def recent(self, offset: int = 0, limit: Optional[int] = None) -> List[ClientInfo]:
+        """Clients, most recently seen first, skipping offset and returning at most limit."""
+        stop = None if limit is None else offset + limit
+        return list(islice(reversed(self._clients.values()), offset, stop))
+
+    def evict_stale(self, now: Optional[float] = None) -> int:
+        """Drop clients past the TTL or beyond max_clients. Returns how many were dropped."""
+        if now is None:
+            now = time.monotonic()
+        evicted = 0
+        clients = self._clients
+        while clients:
+            client_id, info = next(iter(clients.items()))
+            over_capacity = self.max_clients is not None and len(clients) > self.max_clients
+            if not over_capacity and now - info.last_seen <= self.ttl_seconds:
+                break
+            del clients[client_id]
+            self._changed(client_id)
+            evicted += 1
+        return evicted
+
+    def _changed(self, client_id: str) -> None:
+        self.version += 1
+        if self.on_change is not None:
+            self.on_change(client_id)
@@ -0,0 +1,440 @@
+"""Clustered mode: recipients sharded across bridge nodes by consistent hashing.
+
+Every node runs the normal server with its own local backend and knows the
+full node list. A ``HashRing`` maps each recipient ID to its owner node;
+``ClusterQueueBackend`` keeps operations for locally owned recipients local
+and forwards the rest to the owner's ``/cluster/*`` routes over one pooled
+keep-alive ``httpx.AsyncClient``. Long-polls for a remote recipient are
+proxied: the owner blocks on its own waiters and answers when messages arrive.
+Proxied long-polls count against the owner's waiter caps, and messages popped
+for a proxy that has hung up are put back in the owner's queue.
+
+Forwarded requests are always served from the owner's local backend, so a
+request is never forwarded twice even if two nodes disagree about the ring.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from . import metrics
+from .admission import WaitAdmission
+from .disconnect import cancel_on_disconnect, watch_disconnect
+from .limits import EnqueueResult
+from .models import Message
+from .queue_backends import QueueBackend
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Cluster-Secret"
+
+
+class ClusterBusy(Exception):
+    """The owner node turned a proxied long-poll away because a waiter cap is full."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClusterError(Exception):
+    """A forwarded request to another node failed."""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes.
+
+    Adding or removing a node only moves the keys on the ring segments that
+    node owned (about 1/N of them), and ``replicas`` virtual points per node
+    keep the split even.
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 128):
+        self.nodes = sorted(set(nodes))
+        if not self.nodes:
+            raise ValueError("HashRing needs at least one node")
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """Node owning key: the first virtual point clockwise from its hash."""
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+def encode_message(message: Message) -> Dict:
+    data = {"from": message.from_client_id, "content": message.content, "ts": message.wall_time, "seq": message.seq}
+    if message.correlation_id is not None:
+        data["cid"] = message.correlation_id
+    return data
+
+
+def decode_message(data: Dict) -> Message:
+    return Message(
+        from_client_id=data["from"],
+        content=data["content"],
+        wall_time=data["ts"],
+        seq=data["seq"],
+        correlation_id=data.get("cid"),
+    )
+
+
+class ClusterQueueBackend(QueueBackend):
+    """Routes queue operations to the node that owns each recipient.
+
+    ``local`` is this node's own backend; ``node_url`` is this node's base URL
+    exactly as it appears in ``nodes``. Stats, expiry and change events are
+    the local backend's (each node reports the recipients it owns).
+    """
+
+    def __init__(
+        self,
+        local: QueueBackend,
+        nodes: Iterable[str],
+        node_url: str,
+        secret: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        request_timeout: float = 10.0,
+        admission: Optional[WaitAdmission] = None,
+    ):
+        self.local = local
+        # Caps for long-polls proxied to this node (the server's own admission)
+        self.admission = admission if admission is not None else WaitAdmission()
+        self.node_url = node_url.rstrip("/")
+        self.ring = HashRing(node.rstrip("/") for node in nodes)
+        if self.node_url not in self.ring.nodes:
+            raise ValueError(f"This node ({self.node_url}) is not in the cluster node list {self.ring.nodes}")
+        self.secret = secret
+        self.request_timeout = request_timeout
+        self.client = client or httpx.AsyncClient(
+            timeout=request_timeout,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+        logger.info(f"Initialized ClusterQueueBackend ({self.node_url}, {len(self.ring.nodes)} nodes)")
+
+    def owner(self, client_id: str) -> Optional[str]:
+        """Base URL of the node owning client_id, or None if it is this node."""
+        node = self.ring.node_for(client_id)
+        return None if node == self.node_url else node
+
+    def _group(self, recipient_ids: Iterable[str]) -> Dict[Optional[str], List[int]]:
+        """Positions of recipient_ids grouped by owner (None = local), in order."""
+        groups: Dict[Optional[str], List[int]] = {}
+        for index, recipient_id in enumerate(recipient_ids):
+            groups.setdefault(self.owner(recipient_id), []).append(index)
+        return groups
+
+    async def _post(self, node: str, path: str, payload: Dict, timeout: Optional[float] = None) -> Dict:
+        headers = {SECRET_HEADER: self.secret} if self.secret else None
+        try:
+            response = await self.client.post(
+                f"{node}{path}", json=payload, headers=headers, timeout=timeout or self.request_timeout
+            )
+            if response.status_code == 429:
+                raise ClusterBusy(f"{node}{path} is busy", response.json()["retry_after_ms"] / 1000)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ClusterError(f"{node}{path} failed: {e!r}") from e
+        return response.json()
+
+    # Sending
+
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Queue locally or forward to the recipient's owner."""
+        return (await self.send_messages([(recipient_id, message)]))[0]
+
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Split the batch by owner: one local call plus one request per remote owner, concurrently."""
+        results: List[Optional[EnqueueResult]] = [None] * len(batch)
+
+        async def send_group(node: Optional[str], positions: List[int]) -> None:
+            items = [batch[i] for i in positions]
+            if node is None:
+                group_results = await self.local.send_messages(items)
+            else:
+                payload = {"messages": [{"recipient": r, **encode_message(m)} for r, m in items]}
+                group_results = await self._forward_send(node, "/cluster/send", payload, len(items))
+            for position, result in zip(positions, group_results):
+                results[position] = result
+
+        await asyncio.gather(*(
+            send_group(node, positions) for node, positions in self._group(r for r, _ in batch).items()
+        ))
+        return results
+
+    async def send_broadcast(self, recipient_ids: List[str], message: Message) -> List[EnqueueResult]:
+        """The message goes once to each owner node, which shares it across its recipients."""
+        results: List[Optional[EnqueueResult]] = [None] * len(recipient_ids)
+
+        async def send_group(node: Optional[str], positions: List[int]) -> None:
+            group = [recipient_ids[i] for i in positions]
+            if node is None:
+                group_results = await self.local.send_broadcast(group, message)
+            else:
+                payload = {"recipients": group, "message": encode_message(message)}
+                group_results = await self._forward_send(node, "/cluster/broadcast", payload, len(group))
+            for position, result in zip(positions, group_results):
+                results[position] = result
+
+        await asyncio.gather(*(send_group(node, positions) for node, positions in self._group(recipient_ids).items()))
+        return results
+
+    async def _forward_send(self, node: str, path: str, payload: Dict, count: int) -> List[EnqueueResult]:
+        try:
+            data = await self._post(node, path, payload)
+        except ClusterError as e:
+            logger.error(str(e))
+            # Nothing was queued; tell the sender to back off and retry
+            return [EnqueueResult(status="rejected", reason=f"could not forward to owner node {node}")] * count
+        return [EnqueueResult(**result) for result in data["results"]]
+
+    async def restore_messages(self, recipient_id: str, messages: List[Message]) -> List[EnqueueResult]:
+        """Put undelivered messages back at the head of the owner's queue."""
+        node = self.owner(recipient_id)
+        if node is None:
+            return await self.local.restore_messages(recipient_id, messages)
+        payload = {"client_id": recipient_id, "messages": [encode_message(m) for m in messages]}
+        return await self._forward_send(node, "/cluster/restore", payload, len(messages))
+
+    # Receiving
+
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get one page from the owner's queue."""
+        node = self.owner(client_id)
+        if node is None:
+            return await self.local.get_messages(client_id, pop=pop, max_messages=max_messages, max_bytes=max_bytes)
+        payload = {"client_id": client_id, "pop": pop, "max_messages": max_messages, "max_bytes": max_bytes}
+        data = await self._post(node, "/cluster/messages", payload)
+        return [decode_message(m) for m in data["messages"]]
+
+    async def wait_for_messages(
+        self,
+        client_id: str,
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Long-poll on the owner node, which blocks on its own waiters."""
+        node = self.owner(client_id)
+        if node is None:
+            return await self.local.wait_for_messages(client_id, timeout, max_messages=max_messages, max_bytes=max_bytes)
+        payload = {"client_id": client_id, "wait": timeout, "max_messages": max_messages, "max_bytes": max_bytes}
+        try:
+            data = await self._post(node, "/cluster/messages", payload, timeout=timeout + self.request_timeout)
+        except ClusterBusy as e:
+            # Hold the caller for the owner's retry hint rather than have it poll again at once
+            await asyncio.sleep(min(timeout, e.retry_after))
+            return []
+        return [decode_message(m) for m in data["messages"]]
+
+    async def wait_for_any_messages(
+        self,
+        client_ids: List[str],
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, List[Message]]:
+        """One local waiter when this node owns every ID; otherwise a non-popping wait per ID."""
+        if all(self.owner(client_id) is None for client_id in client_ids):
+            return await self.local.wait_for_any_messages(client_ids, timeout, max_messages=max_messages, max_bytes=max_bytes)
+        pages = await self._pop_pages(client_ids, max_messages, max_bytes)
+        if pages:
+            return pages
+        return await self._wait_for_any_separately(client_ids, timeout, max_messages, max_bytes)
+
+    async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
+        """Block on the owner node until messages are available (or timeout)."""
+        node = self.owner(client_id)
+        if node is None:
+            return await self.local.wait_for_new_message(client_id, timeout)
+        try:
+            data = await self._post(node, "/cluster/wait", {"client_id": client_id, "wait": timeout}, timeout=timeout + self.request_timeout)
+        except ClusterBusy as e:
+            await asyncio.sleep(min(timeout, e.retry_after))
+            return False
+        return data["available"]
+
+    async def notify_new_message(self, client_id: str) -> None:
+        await self.notify_new_messages([client_id])
+
+    async def notify_new_messages(self, client_ids: Iterable[str]) -> None:
+        """Wake local waiters; owners of forwarded messages already woke theirs on receipt."""
+        local_ids = [client_id for client_id in client_ids if self.owner(client_id) is None]
+        if local_ids:
+            await self.local.notify_new_messages(local_ids)
+
+    async def queue_depth(self, client_id: str) -> int:
+        node = self.owner(client_id)
+        if node is None:
+            return await self.local.queue_depth(client_id)
+        return (await self._post(node, "/cluster/depth", {"client_id": client_id}))["depth"]
+
+    async def queue_depths_for(self, client_ids: Iterable[str]) -> Dict[str, int]:
+        """One local lookup plus one request per remote owner, concurrently."""
+        client_ids = list(client_ids)
+        depths: Dict[str, int] = {}
+
+        async def group_depths(node: Optional[str], positions: List[int]) -> None:
+            group = [client_ids[i] for i in positions]
+            if node is None:
+                depths.update(await self.local.queue_depths_for(group))
+            else:
+                depths.update((await self._post(node, "/cluster/depths", {"client_ids": group}))["depths"])
+
+        await asyncio.gather(*(group_depths(node, positions) for node, positions in self._group(client_ids).items()))
+        return {client_id: depths[client_id] for client_id in client_ids}
+
+    # Local-only: each node sweeps, counts and reports the recipients it owns
+
+    async def cleanup_expired_messages(self) -> int:
+        return await self.local.cleanup_expired_messages()
+
+    async def queue_depths(self) -> Dict[str, int]:
+        return await self.local.queue_depths()
+
+    @property
+    def emits_queue_changes(self) -> bool:
+        return self.local.emits_queue_changes
+
+    @property
+    def waiters(self):
+        return getattr(self.local, "waiters", None)
+
+    def set_change_listener(self, listener: Optional[Callable[[str], None]]) -> None:
+        self.local.set_change_listener(listener)
+
+    def stats_version(self) -> Optional[str]:
+        return self.local.stats_version()
+
+    async def start(self) -> None:
+        await self.local.start()
+
+    async def close(self) -> None:
+        await self.local.close()
+        await self.client.aclose()
+
+    # Routes served to other nodes (always answered from the local backend)
+
+    def routes(self) -> List[Route]:
+        return [
+            Route("/cluster/send", self._serve_send, methods=["POST"]),
+            Route("/cluster/broadcast", self._serve_broadcast, methods=["POST"]),
+            Route("/cluster/restore", self._serve_restore, methods=["POST"]),
+            Route("/cluster/messages", self._serve_messages, methods=["POST"]),
+            Route("/cluster/wait", self._serve_wait, methods=["POST"]),
+            Route("/cluster/depth", self._serve_depth, methods=["POST"]),
+            Route("/cluster/depths", self._serve_depths, methods=["POST"]),
+        ]
+
+    def _authorized(self, request: Request) -> bool:
+        return not self.secret or request.headers.get(SECRET_HEADER) == self.secret
+
+    async def _serve_send(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        batch = [(item["recipient"], decode_message(item)) for item in (await request.json())["messages"]]
+        results = await self.local.send_messages(batch)
+        await self.local.notify_new_messages(dict.fromkeys(r for (r, _), result in zip(batch, results) if result.accepted))
+        return JSONResponse({"results": [asdict(result) for result in results]})
+
+    async def _serve_broadcast(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        recipient_ids = data["recipients"]
+        results = await self.local.send_broadcast(recipient_ids, decode_message(data["message"]))
+        await self.local.notify_new_messages([r for r, result in zip(recipient_ids, results) if result.accepted])
+        return JSONResponse({"results": [asdict(result) for result in results]})
+
+    async def _serve_restore(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        results = await self.local.restore_messages(data["client_id"], [decode_message(m) for m in data["messages"]])
+        return JSONResponse({"results": [asdict(result) for result in results]})
+
+    def _refuse_wait(self, call: str, client_id: str) -> Optional[JSONResponse]:
+        """Take a waiter slot for a proxied long-poll; the 429 response if a cap is full."""
+        refused = self.admission.try_acquire([client_id])
+        if refused is None:
+            return None
+        metrics.WAITS_REJECTED.labels(call, refused).inc()
+        logger.info(f"Refused proxied {call} for {client_id}: {refused} waiter cap reached")
+        return JSONResponse({"error": "busy", "retry_after_ms": self.admission.retry_after()}, status_code=429)
+
+    async def _serve_messages(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        client_id = data["client_id"]
+        page = {"max_messages": data.get("max_messages"), "max_bytes": data.get("max_bytes")}
+        if not data.get("wait"):
+            messages = await self.local.get_messages(client_id, pop=data.get("pop", True), **page)
+            return JSONResponse({"messages": [encode_message(m) for m in messages]})
+
+        busy = self._refuse_wait("get_messages", client_id)
+        if busy:
+            return busy
+        try:
+            async with watch_disconnect(request) as disconnected:
+                messages = await cancel_on_disconnect(
+                    self.local.wait_for_messages(client_id, float(data["wait"]), **page), disconnected
+                )
+                if messages and disconnected.is_set():
+                    # Popped just as the proxying node hung up: nobody would read the response
+                    logger.info(f"Proxy for {client_id} disconnected, requeueing {len(messages)} message(s)")
+                    results = await self.local.restore_messages(client_id, messages)
+                    lost = [result for result in results if not result.accepted]
+                    if lost:
+                        logger.error(f"Lost {len(lost)} undelivered message(s) for {client_id} that could not be requeued: {lost[0].reason}")
+                    messages = []
+        finally:
+            self.admission.release([client_id])
+        return JSONResponse({"messages": [encode_message(m) for m in messages or ()]})
+
+    async def _serve_wait(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        busy = self._refuse_wait("wait", data["client_id"])
+        if busy:
+            return busy
+        try:
+            async with watch_disconnect(request) as disconnected:
+                available = await cancel_on_disconnect(
+                    self.local.wait_for_new_message(data["client_id"], float(data["wait"])), disconnected
+                )
+        finally:
+            self.admission.release([data["client_id"]])
+        return JSONResponse({"available": bool(available)})
+
+    async def _serve_depth(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        return JSONResponse({"depth": await self.local.queue_depth(data["client_id"])})
+
+    async def _serve_depths(self, request: Request) -> JSONResponse:
+        if not self._authorized(request):
+            return JSONResponse({"error": "forbidden"}, status_code=403)
+        data = await request.json()
+        return JSONResponse({"depths": await self.local.queue_depths_for(data["client_ids"])})
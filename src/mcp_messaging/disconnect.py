@@ -0,0 +1,103 @@
+"""Detection of HTTP clients that go away while a blocking tool call is parked."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Optional, TypeVar
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Scope key holding the asyncio.Event set when the client disconnects
+DISCONNECTED_KEY = "mcp_messaging.disconnected"
+
+T = TypeVar("T")
+
+
+class DisconnectMiddleware:
+    """ASGI middleware that flags each HTTP request once its client is gone.
+
+    Stores an ``asyncio.Event`` in the request scope. It is set when the
+    server sees ``http.disconnect`` (the SSE response listens for it) or when
+    the response has ended for any reason, since nobody can read a result
+    after that. Tool calls find it through their Starlette request
+    (``disconnect_event``).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        disconnected = asyncio.Event()
+        scope[DISCONNECTED_KEY] = disconnected
+
+        async def watched_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            return message
+
+        try:
+            await self.app(scope, watched_receive, send)
+        finally:
+            disconnected.set()
+
+
+def disconnect_event(request: Optional[Any]) -> Optional[asyncio.Event]:
+    """The disconnect event of the HTTP request behind a tool call, if there is one."""
+    if not isinstance(request, Request):
+        return None
+    return request.scope.get(DISCONNECTED_KEY)
+
+
+async def cancel_on_disconnect(call: Awaitable[T], disconnected: Optional[asyncio.Event]) -> Optional[T]:
+    """Await call, cancelling it as soon as disconnected is set. Returns None if it was cancelled.
+
+    Cancelling unwinds the call's waiter registrations (and requeues any
+    messages already handed to it), so a dropped client stops holding a
+    waiter slot straight away instead of for the rest of its timeout.
+    """
+    if disconnected is None:
+        return await call
+
+    task = asyncio.ensure_future(call)
+    watcher = asyncio.create_task(disconnected.wait())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if task.done():
+        return task.result()
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        return None
+    # Finished before the cancellation took effect
+    return task.result()
+
+
+@asynccontextmanager
+async def watch_disconnect(request: Request) -> AsyncIterator[asyncio.Event]:
+    """Disconnect event for a plain (non-streaming) request that blocks before responding.
+
+    Nothing reads from such a request once its body has been consumed, so
+    ``http.disconnect`` would go unnoticed; this listens for it while the
+    block runs.
+    """
+    disconnected = disconnect_event(request) or asyncio.Event()
+
+    async def listen() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    listener = asyncio.create_task(listen())
+    try:
+        yield disconnected
+    finally:
+        listener.cancel()
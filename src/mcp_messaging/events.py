@@ -0,0 +1,113 @@
+"""Debounced change events for live session dashboards."""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One connected dashboard: a bounded queue of pending deltas.
+
+    A ``None`` item means the subscriber fell behind and must be sent a fresh
+    snapshot instead of the deltas it missed.
+    """
+
+    __slots__ = ("queue",)
+
+    def __init__(self, max_queued_events: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_events)
+
+    def put(self, delta: Dict) -> None:
+        try:
+            self.queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog and ask for a resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Next delta, ``None`` for "resync", or raise TimeoutError."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class SessionEventBus:
+    """Coalesces change notifications into debounced deltas for subscribers.
+
+    ``mark_dirty(client_id)`` is cheap and synchronous, so queue backends can
+    call it on every enqueue/dequeue: it only records the client ID and arms
+    a timer. When the timer fires (after ``debounce_seconds``), one delta is
+    built for all dirty clients and fanned out to every subscriber. Nothing is
+    recorded or built while nobody is subscribed.
+    """
+
+    def __init__(
+        self,
+        build_delta: Callable[[Set[str]], Awaitable[Dict]],
+        debounce_seconds: float = 0.25,
+        max_queued_events: int = 64,
+    ):
+        self.build_delta = build_delta
+        self.debounce_seconds = debounce_seconds
+        self.max_queued_events = max_queued_events
+        self._subscribers: Dict[Subscription, None] = {}
+        self._dirty: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        """Number of subscribers."""
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_queued_events)
+        self._subscribers[subscription] = None
+        logger.debug(f"Session event subscriber added ({len(self._subscribers)} total)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.pop(subscription, None)
+        if not self._subscribers:
+            self._dirty.clear()
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+        logger.debug(f"Session event subscriber removed ({len(self._subscribers)} total)")
+
+    def mark_dirty(self, client_id: str) -> None:
+        """Record that client_id changed; a delta follows after the debounce delay."""
+        if not self._subscribers:
+            return
+
+        self._dirty.add(client_id)
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._flush_handle = loop.call_later(self.debounce_seconds, self._flush)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        dirty, self._dirty = self._dirty, set()
+        if dirty and self._subscribers:
+            task = asyncio.get_running_loop().create_task(self._publish(dirty))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, dirty: Set[str]) -> None:
+        try:
+            delta = await self.build_delta(dirty)
+        except Exception as e:
+            logger.error(f"Error building session delta: {e}")
+            return
+        for subscription in list(self._subscribers):
+            subscription.put(delta)
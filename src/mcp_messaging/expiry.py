@@ -0,0 +1,107 @@
+"""Time-ordered expiry index for queued messages."""
+
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ExpiryIndex:
+    """Min-heap of message deadlines keyed by recipient.
+
+    Queues are FIFO and every message in a backend shares the same TTL, so the
+    expired messages of a recipient are always a prefix of its queue. A heap
+    entry therefore only stores the recipient and the message's position in
+    that recipient's stream, never the message itself; popping expired entries
+    yields "drop N messages from the head of queue X".
+
+    Deadlines are in the clock the owning backend chooses (``clock``), and
+    every deadline scheduled in one index must use it. The default,
+    ``time.monotonic``, means wall-clock adjustments never expire (or
+    resurrect) messages; a persistent backend whose deadlines must survive
+    restarts uses ``time.time`` instead. Indexes with different clocks must
+    not be shared or merged.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self._heap: List[Tuple[float, str, int]] = []
+        # Per-recipient stream positions: how many messages were ever scheduled
+        # and how many have left the head of the queue (delivered or expired).
+        self._scheduled: Dict[str, int] = {}
+        self._consumed: Dict[str, int] = {}
+        self._live = 0
+
+    def __len__(self) -> int:
+        """Number of scheduled messages that are still queued."""
+        return self._live
+
+    def schedule(self, recipient_id: str, deadline: float) -> None:
+        """Record that a message was appended to ``recipient_id``'s queue."""
+        position = self._scheduled.get(recipient_id, 0)
+        self._scheduled[recipient_id] = position + 1
+        self._live += 1
+        heapq.heappush(self._heap, (deadline, recipient_id, position))
+
+    def schedule_head(self, recipient_id: str, deadline: float) -> None:
+        """Record that a message was put back at the head of ``recipient_id``'s queue.
+
+        It takes the stream position just before the current head, so its
+        deadline must not be later than those of the messages behind it
+        (true for a message that was taken off the queue and returned).
+        """
+        position = self._consumed.get(recipient_id, 0) - 1
+        self._consumed[recipient_id] = position
+        self._scheduled.setdefault(recipient_id, 0)
+        self._live += 1
+        heapq.heappush(self._heap, (deadline, recipient_id, position))
+
+    def consume(self, recipient_id: str, count: int) -> None:
+        """Record that ``count`` messages left the head of the queue."""
+        if count <= 0:
+            return
+        consumed = self._consumed.get(recipient_id, 0)
+        scheduled = self._scheduled.get(recipient_id, 0)
+        count = min(count, scheduled - consumed)
+        self._consumed[recipient_id] = consumed + count
+        self._live -= count
+        self._maybe_compact()
+
+    def pop_expired(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Pop every deadline <= now (default: the index's clock) and return how many to drop per recipient."""
+        if now is None:
+            now = self.clock()
+
+        expired: Dict[str, int] = {}
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, recipient_id, position = heapq.heappop(heap)
+            consumed = self._consumed.get(recipient_id, 0)
+            if position < consumed:
+                continue  # Already delivered before it expired
+            count = position - consumed + 1
+            expired[recipient_id] = expired.get(recipient_id, 0) + count
+            self._consumed[recipient_id] = position + 1
+            self._live -= count
+
+        return expired
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest pending deadline, or None if nothing is scheduled."""
+        return self._heap[0][0] if self._heap else None
+
+    def _maybe_compact(self) -> None:
+        """Drop entries for delivered messages once they dominate the heap."""
+        if len(self._heap) <= 2 * self._live + 64:
+            return
+
+        self._heap = [
+            entry for entry in self._heap
+            if entry[2] >= self._consumed.get(entry[1], 0)
+        ]
+        heapq.heapify(self._heap)
+
+        # Forget stream positions of recipients with nothing left in flight
+        for recipient_id in list(self._scheduled):
+            if self._consumed.get(recipient_id, 0) >= self._scheduled[recipient_id]:
+                del self._scheduled[recipient_id]
+                self._consumed.pop(recipient_id, None)
@@ -0,0 +1,293 @@
+"""Queue limits, overflow policies and enqueue results."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def content_size(content: str) -> int:
+    """Size of content in UTF-8 bytes (no copy for ASCII content)."""
+    return len(content) if content.isascii() else len(content.encode())
+
+
+def message_size(message: Message) -> int:
+    """Size of the message content in UTF-8 bytes (precomputed on the message)."""
+    return message.size
+
+
+def take_page(
+    items: Iterable[T],
+    max_messages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    size: Callable[[T], int] = message_size,
+) -> List[T]:
+    """Leading items that fit in one page of max_messages / max_bytes.
+
+    The first item is always included, so a single message larger than
+    max_bytes cannot stall a queue. Stops reading items once the page is full.
+    """
+    page: List[T] = []
+    total_bytes = 0
+    for item in items:
+        if max_messages is not None and len(page) >= max_messages:
+            break
+        if max_bytes is not None:
+            total_bytes += size(item)
+            if page and total_bytes > max_bytes:
+                break
+        page.append(item)
+    return page
+
+
+class OverflowPolicy(str, Enum):
+    """What to do with a message that would exceed a queue limit."""
+    REJECT = "reject"
+    DROP_OLDEST = "drop_oldest"
+    SPILL = "spill"
+
+
+@dataclass
+class QueueLimits:
+    """Per-recipient and global caps (None = unlimited)."""
+    max_messages_per_queue: Optional[int] = None
+    max_bytes_per_queue: Optional[int] = None
+    max_total_messages: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    overflow_policy: OverflowPolicy = OverflowPolicy.REJECT
+    spill_directory: str = "mcp_spill"
+
+    @classmethod
+    def from_env(cls) -> "QueueLimits":
+        def optional_int(name: str) -> Optional[int]:
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            max_messages_per_queue=optional_int("MAX_QUEUE_MESSAGES"),
+            max_bytes_per_queue=optional_int("MAX_QUEUE_BYTES"),
+            max_total_messages=optional_int("MAX_TOTAL_MESSAGES"),
+            max_total_bytes=optional_int("MAX_TOTAL_BYTES"),
+            overflow_policy=OverflowPolicy(os.getenv("QUEUE_OVERFLOW_POLICY", "reject")),
+            spill_directory=os.getenv("SPILL_DIR", "mcp_spill"),
+        )
+
+    @property
+    def bounded(self) -> bool:
+        return any(limit is not None for limit in (
+            self.max_messages_per_queue, self.max_bytes_per_queue,
+            self.max_total_messages, self.max_total_bytes,
+        ))
+
+
+@dataclass
+class EnqueueResult:
+    """Outcome of QueueBackend.send_message.
+
+    status is one of "queued", "delivered" (handed straight to a waiting
+    receiver), "dropped_oldest" (queued after evicting ``dropped`` older
+    messages), "spilled" (queued on disk) or "rejected" (not queued; the
+    sender should back off and retry).
+    """
+    status: str = "queued"
+    reason: str = ""
+    dropped: int = 0
+
+    @property
+    def accepted(self) -> bool:
+        return self.status != "rejected"
+
+
+class SpillStore:
+    """Per-recipient overflow files holding messages that did not fit in memory.
+
+    Each recipient gets an append-only JSON-lines file that starts with a
+    fixed-width header naming the recipient and the byte offset read so far;
+    messages are read back in order and the file is deleted once drained.
+    The header lets a restarted server re-count the files left behind.
+
+    Appends go to buffered handles kept open in an ``OrderedDict`` LRU (the
+    least recently used handle is closed first), and are flushed once per
+    event-loop turn, so a burst of spills costs one write per file rather
+    than an open and a write per message.
+    """
+
+    def __init__(self, directory: str, max_open_files: int = 64):
+        self.directory = directory
+        self.max_open_files = max_open_files
+        self.counts: Dict[str, int] = {}
+        self._offsets: Dict[str, int] = {}
+        self._writers: "OrderedDict[str, BinaryIO]" = OrderedDict()
+        self._flush_scheduled = False
+        self._recount()
+
+    def _path(self, recipient_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(recipient_id.encode()).hexdigest() + ".jsonl")
+
+    @staticmethod
+    def _header(recipient_id: str, offset: int) -> bytes:
+        return json.dumps({"recipient": recipient_id, "read": f"{offset:016d}"}).encode() + b"\n"
+
+    def _recount(self) -> None:
+        """Pick up spill files left by a previous process."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith(".jsonl"):
+                continue
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as f:
+                try:
+                    header = json.loads(f.readline())
+                    recipient_id, offset = header["recipient"], int(header["read"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Removing unreadable spill file {path}")
+                    recipient_id = None
+                else:
+                    f.seek(offset)
+                    count = 0
+                    end = offset
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # Torn by a crash mid-write
+                        count += 1
+                        end += len(line)
+            if recipient_id is None or not count:
+                os.remove(path)
+                continue
+            os.truncate(path, end)
+            self.counts[recipient_id] = count
+            self._offsets[recipient_id] = offset
+        if self.counts:
+            logger.info(f"Found {len(self)} spilled messages for {len(self.counts)} recipients in {self.directory}")
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def count(self, recipient_id: str) -> int:
+        return self.counts.get(recipient_id, 0)
+
+    def _writer(self, recipient_id: str) -> BinaryIO:
+        writer = self._writers.get(recipient_id)
+        if writer is not None:
+            self._writers.move_to_end(recipient_id)
+            return writer
+        if len(self._writers) >= self.max_open_files:
+            _, oldest = self._writers.popitem(last=False)
+            oldest.close()
+        writer = open(self._path(recipient_id), "ab")
+        self._writers[recipient_id] = writer
+        return writer
+
+    def append(self, recipient_id: str, message: Message, deadline: Optional[float]) -> None:
+        """Spill one message; deadline is wall-clock (None = never expires)."""
+        data = {
+            "from": message.from_client_id,
+            "content": message.content,
+            "ts": message.wall_time,
+            "exp": deadline,
+        }
+        if message.correlation_id is not None:
+            data["cid"] = message.correlation_id
+        line = json.dumps(data).encode() + b"\n"
+        if recipient_id not in self._offsets:
+            os.makedirs(self.directory, exist_ok=True)
+            header = self._header(recipient_id, 0)
+            header = self._header(recipient_id, len(header))
+            self._writer(recipient_id).write(header)
+            self._offsets[recipient_id] = len(header)
+        self._writer(recipient_id).write(line)
+        self.counts[recipient_id] = self.count(recipient_id) + 1
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_scheduled = True
+        loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Write out buffered spills."""
+        self._flush_scheduled = False
+        for writer in self._writers.values():
+            writer.flush()
+
+    def close(self) -> None:
+        """Flush and close every open spill file; the files stay for the next start."""
+        self._flush_scheduled = False
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def take(self, recipient_id: str, max_messages: int, max_bytes: Optional[int]) -> List[Tuple[Message, Optional[float]]]:
+        """Read back up to max_messages (and max_bytes) spilled messages, oldest first.
+
+        Messages whose deadline already passed are dropped on the way.
+        """
+        if not self.count(recipient_id):
+            return []
+
+        writer = self._writers.get(recipient_id)
+        if writer is not None:
+            writer.flush()
+        path = self._path(recipient_id)
+        taken: List[Tuple[Message, Optional[float]]] = []
+        consumed = 0
+        total_bytes = 0
+        now = time.time()
+        with open(path, "r+b") as f:
+            f.seek(self._offsets[recipient_id])
+            while len(taken) < max_messages:
+                position = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                data = json.loads(line)
+                message = Message(
+                    from_client_id=data["from"], content=data["content"], wall_time=data["ts"], correlation_id=data.get("cid")
+                )
+                size = message_size(message)
+                if max_bytes is not None and taken and total_bytes + size > max_bytes:
+                    f.seek(position)
+                    break
+                consumed += 1
+                if data["exp"] is not None and data["exp"] <= now:
+                    continue
+                taken.append((message, data["exp"]))
+                total_bytes += size
+            offset = f.tell()
+
+            remaining = self.count(recipient_id) - consumed
+            if remaining > 0:
+                # Record progress in place (the header has a fixed width) so a restart does not redeliver
+                f.seek(0)
+                f.write(self._header(recipient_id, offset))
+
+        if remaining <= 0:
+            del self.counts[recipient_id]
+            del self._offsets[recipient_id]
+            writer = self._writers.pop(recipient_id, None)
+            if writer is not None:
+                writer.close()
+            os.remove(path)
+        else:
+            self.counts[recipient_id] = remaining
+            self._offsets[recipient_id] = offset
+        return taken
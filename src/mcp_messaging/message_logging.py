@@ -0,0 +1,226 @@
+"""Message logging: lazy, structured, sampled and off the event loop."""
+
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_MODES = ("full", "structured", "off")
+CONTENT_POLICIES = ("full", "truncate", "hash", "none")
+
+
+def format_message_log(action: str, sender_id: str, recipient_id: str, message: str) -> str:
+    """Format a message log entry with complete details."""
+    return f"""
+MESSAGE {action.upper()}
+FROM: {sender_id}
+TO: {recipient_id}
+CONTENT:
+{message}
+{"=" * 80}"""
+
+
+@dataclass
+class MessageLogConfig:
+    """How message traffic is logged.
+
+    Attributes:
+        mode: "full" (the classic multi-line block), "structured" (one
+            key=value line plus fields on the record) or "off".
+        content: "full", "truncate" (to ``max_content_chars``), "hash"
+            (short SHA-256 digest) or "none".
+        max_content_chars: Truncation length for the "truncate" policy.
+        sample_every: Log one of every N messages per sender (1 = all).
+    """
+    mode: str = "full"
+    content: str = "full"
+    max_content_chars: int = 200
+    sample_every: int = 1
+
+    @classmethod
+    def from_env(cls) -> "MessageLogConfig":
+        config = cls(
+            mode=os.getenv("LOG_MESSAGES", "full").lower(),
+            content=os.getenv("LOG_MESSAGE_CONTENT", "full").lower(),
+            max_content_chars=int(os.getenv("LOG_MESSAGE_MAX_CHARS", "200")),
+            sample_every=max(1, int(os.getenv("LOG_MESSAGE_SAMPLE_EVERY", "1"))),
+        )
+        if config.mode not in LOG_MODES:
+            raise ValueError(f"LOG_MESSAGES must be one of {LOG_MODES}, got {config.mode!r}")
+        if config.content not in CONTENT_POLICIES:
+            raise ValueError(f"LOG_MESSAGE_CONTENT must be one of {CONTENT_POLICIES}, got {config.content!r}")
+        return config
+
+
+# Shared by every MessageLogger; replace fields (or the object) to reconfigure
+MESSAGE_LOG_CONFIG = MessageLogConfig.from_env()
+
+
+class _LazyMessageRecord:
+    """Log argument that renders the message only when a handler formats it."""
+
+    __slots__ = ("config", "action", "sender_id", "recipient_id", "content")
+
+    def __init__(self, config: MessageLogConfig, action: str, sender_id: str, recipient_id: str, content: str):
+        self.config = config
+        self.action = action
+        self.sender_id = sender_id
+        self.recipient_id = recipient_id
+        self.content = content
+
+    def rendered_content(self) -> str:
+        policy = self.config.content
+        if policy == "full":
+            return self.content
+        if policy == "truncate":
+            limit = self.config.max_content_chars
+            if len(self.content) <= limit:
+                return self.content
+            return f"{self.content[:limit]}… (+{len(self.content) - limit} chars)"
+        if policy == "hash":
+            return f"sha256:{hashlib.sha256(self.content.encode()).hexdigest()[:16]}"
+        return f"<{len(self.content)} chars>"
+
+    def __str__(self) -> str:
+        if self.config.mode == "structured":
+            return (
+                f"message.{self.action} sender={self.sender_id} recipient={self.recipient_id} "
+                f"chars={len(self.content)} content={json.dumps(self.rendered_content(), ensure_ascii=False)}"
+            )
+        return format_message_log(self.action, self.sender_id, self.recipient_id, self.rendered_content())
+
+
+class MessageLogger:
+    """Logs message traffic according to ``MESSAGE_LOG_CONFIG``.
+
+    Nothing is formatted unless the record is actually emitted: the level and
+    sampling checks run first, and the message text is built by the handler
+    (on the queue listener thread when ``configure_logging`` installed one).
+    """
+
+    MAX_TRACKED_SENDERS = 10_000
+
+    def __init__(self, logger: logging.Logger, config: Optional[MessageLogConfig] = None):
+        self.logger = logger
+        self._config = config
+        self._sender_counts: Dict[str, int] = {}
+
+    @property
+    def config(self) -> MessageLogConfig:
+        return self._config or MESSAGE_LOG_CONFIG
+
+    @property
+    def enabled(self) -> bool:
+        """Cheap pre-check so callers can skip per-message loops entirely."""
+        return self.config.mode != "off" and self.logger.isEnabledFor(logging.INFO)
+
+    def _sampled(self, sender_id: str) -> bool:
+        every = self.config.sample_every
+        if every <= 1:
+            return True
+        if len(self._sender_counts) >= self.MAX_TRACKED_SENDERS:
+            self._sender_counts.clear()
+        count = self._sender_counts.get(sender_id, 0)
+        self._sender_counts[sender_id] = count + 1
+        return count % every == 0
+
+    def log(self, action: str, sender_id: str, recipient_id: str, content: str) -> None:
+        """Log one message event (queued, delivered, retrieved, sent, ...)."""
+        if not self.enabled or not self._sampled(sender_id):
+            return
+
+        config = self.config
+        self.logger.info(
+            "%s",
+            _LazyMessageRecord(config, action, sender_id, recipient_id, content),
+            extra={
+                "event": f"message.{action}",
+                "sender": sender_id,
+                "recipient": recipient_id,
+                "content_chars": len(content),
+            },
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including message event fields when present."""
+
+    FIELDS = ("event", "sender", "recipient", "content_chars")
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting of message records to the listener thread.
+
+    The stock ``prepare`` fully formats every record on the calling thread
+    (the event loop). Message event records (``MessageLogger.log``) only hold
+    immutable strings, so they are handed over as-is and rendered later, which
+    is where the per-message cost is. Any other record - from this package or
+    a third-party library - may have mutable arguments, so its message is
+    merged eagerly (``getMessage``) to log the state at the time of the call;
+    the rest of its formatting still happens on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, tuple) and len(args) == 1 and isinstance(args[0], _LazyMessageRecord):
+            return record
+        if args:
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def configure_logging(
+    level: str = "INFO",
+    log_format: str = "text",
+    async_handler: bool = True,
+    message_config: Optional[MessageLogConfig] = None,
+) -> Optional[QueueListener]:
+    """Configure root logging and message logging.
+
+    With async_handler, records are queued and all formatting and I/O runs on
+    a background listener thread. message_config defaults to the LOG_MESSAGE*
+    environment variables (read again here, after any .env file was loaded).
+    """
+    global MESSAGE_LOG_CONFIG
+    MESSAGE_LOG_CONFIG = message_config or MessageLogConfig.from_env()
+
+    handler = logging.StreamHandler()
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s\n%(message)s\n"  # Added newline for better readability
+        ))
+
+    if not async_handler:
+        logging.basicConfig(level=getattr(logging, level), handlers=[handler])
+        return None
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    logging.basicConfig(level=getattr(logging, level), handlers=[DeferredQueueHandler(log_queue)])
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
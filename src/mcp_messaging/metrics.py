@@ -0,0 +1,251 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Dependency-free and cheap enough to leave on: recording a sample is a dict
+lookup (done once when a labelled child is bound) plus a few integer and
+float additions; histogram buckets are found with ``bisect``. Everything
+else (cumulative buckets, formatting) happens only when ``/metrics`` is
+scraped.
+"""
+
+import functools
+import time
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond queue operations up to 5 minute long-polls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+DEPTH_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """A metric family: one child per combination of label values."""
+
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["MetricsRegistry"] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported (as zero) from the start
+            self.labels()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Child for these label values. Bind it once and reuse it on hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def reset(self) -> None:
+        self._children.clear()
+        if not self.labelnames:
+            self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: Optional["MetricsRegistry"] = None,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            labels = _format_labels(self.labelnames, values, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process, plus collectors that refresh gauges at scrape time."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]) -> None:
+        """Run collector before each render (e.g. to sample queue depths)."""
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        for collector in self._collectors:
+            await collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Tool calls
+TOOL_LATENCY = Histogram("mcp_tool_duration_seconds", "MCP tool call latency.", ["tool"])
+TOOL_ERRORS = Counter("mcp_tool_errors_total", "MCP tool calls that raised an exception.", ["tool"])
+
+# Messages
+MESSAGES_SENT = Counter("mcp_messages_sent_total", "Messages handed to the queue backend, by enqueue status.", ["status"])
+DELIVERY_LATENCY = Histogram("mcp_message_delivery_seconds", "Time from enqueue to delivery to the recipient.")
+
+SENDS_RATE_LIMITED = Counter(
+    "mcp_sends_rate_limited_total", "Sends refused by a token-bucket rate limit.", ["limit"]
+)
+
+# Long-polls (get_messages / send_message_and_wait blocking for messages)
+LONG_POLL_WAIT = Histogram(
+    "mcp_long_poll_wait_seconds", "Time blocked waiting for messages.", ["call", "outcome"]
+)
+
+# Admission control (blocking calls turned away by a waiter cap)
+WAITS_REJECTED = Counter(
+    "mcp_waits_rejected_total", "Blocking calls refused because a waiter cap was full.", ["call", "cap"]
+)
+
+# Expiry
+EXPIRY_SWEEP_DURATION = Histogram("mcp_expiry_sweep_duration_seconds", "Duration of one expiry sweep.")
+MESSAGES_EXPIRED = Counter("mcp_messages_expired_total", "Messages removed because they expired.")
+
+# Sampled at scrape time
+QUEUE_DEPTH = Histogram("mcp_queue_depth", "Distribution of per-client queue depths.", buckets=DEPTH_BUCKETS)
+QUEUED_MESSAGES = Gauge("mcp_queued_messages", "Messages currently queued.")
+QUEUES = Gauge("mcp_queues", "Clients with queued messages.")
+ACTIVE_WAITERS = Gauge("mcp_active_waiters", "Calls currently blocked waiting for messages.")
+BLOCKING_CALLS = Gauge("mcp_blocking_calls", "Blocking tool calls currently admitted (counted against the waiter caps).")
+
+
+def timed_tool(fn: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """Record latency (and errors) of an async MCP tool function under its name."""
+    latency = TOOL_LATENCY.labels(fn.__name__)
+    errors = TOOL_ERRORS.labels(fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    return wrapper
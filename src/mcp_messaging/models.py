@@ -1,29 +1,114 @@
 """Shared data models and utilities for MCP messaging server."""
 
+import itertools
+import sys
+import time
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional, Union
 
+# One wall-clock anchor per process: message times are stored as monotonic
+# floats and converted to wall-clock time only when needed.
+_WALL_ANCHOR = time.time()
+_MONOTONIC_ANCHOR = time.monotonic()
 
-@dataclass
+_sequence = itertools.count(1)
+
+
+def monotonic_to_wall(created_at: float) -> float:
+    """Convert a monotonic timestamp from this process to epoch seconds."""
+    return _WALL_ANCHOR + (created_at - _MONOTONIC_ANCHOR)
+
+
+def wall_to_monotonic(wall_time: float) -> float:
+    """Convert epoch seconds to this process's monotonic clock."""
+    return _MONOTONIC_ANCHOR + (wall_time - _WALL_ANCHOR)
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class Message:
-    """Represents a message between clients."""
+    """Represents a message between clients.
+
+    Compact and immutable, so one instance can sit in many queues:
+
+    - ``created_at`` is a monotonic float (``timestamp`` derives the
+      wall-clock datetime on demand)
+    - ``from_client_id`` is interned, so every message from a sender shares
+      one string
+    - ``seq`` is a process-wide sequence number and ``size`` the content's
+      UTF-8 byte size, both available to backends for ordering and accounting
+    - ``correlation_id`` (optional) ties a request to its reply: a
+      ``send_message_and_wait`` request carries a fresh ID, and a reply that
+      carries the same ID is routed to exactly that waiting call
+
+    ``timestamp=`` (a datetime) or ``wall_time=`` (epoch seconds) can still be
+    passed, e.g. when decoding stored messages; by default the message is
+    stamped with the current time.
+    """
     from_client_id: str
     content: str
-    timestamp: datetime
-
-
-def format_relative_time(timestamp: datetime) -> str:
-    """Format timestamp as relative time (e.g., '5 minutes ago')."""
-    now = datetime.now()
-    diff = now - timestamp
-    
-    if diff.days > 0:
-        return f"{diff.days} day{'s' if diff.days != 1 else ''} ago"
-    elif diff.seconds >= 3600:
-        hours = diff.seconds // 3600
+    created_at: float
+    seq: int
+    size: int
+    correlation_id: Optional[str]
+
+    def __init__(
+        self,
+        from_client_id: str,
+        content: str,
+        timestamp: Optional[datetime] = None,
+        *,
+        wall_time: Optional[float] = None,
+        created_at: Optional[float] = None,
+        seq: Optional[int] = None,
+        correlation_id: Optional[str] = None,
+    ) -> None:
+        if created_at is None:
+            if timestamp is not None:
+                wall_time = timestamp.timestamp()
+            created_at = time.monotonic() if wall_time is None else wall_to_monotonic(wall_time)
+
+        set_field = object.__setattr__
+        set_field(self, "from_client_id", sys.intern(from_client_id))
+        set_field(self, "content", content)
+        set_field(self, "created_at", created_at)
+        set_field(self, "seq", next(_sequence) if seq is None else seq)
+        set_field(self, "size", len(content) if content.isascii() else len(content.encode()))
+        set_field(self, "correlation_id", correlation_id)
+
+    @property
+    def wall_time(self) -> float:
+        """Creation time in epoch seconds."""
+        return monotonic_to_wall(self.created_at)
+
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time as a (naive, local) datetime."""
+        return datetime.fromtimestamp(self.wall_time)
+
+
+def format_age(seconds: float) -> str:
+    """Format an age in seconds as relative time (e.g., '5 minutes ago')."""
+    seconds = int(seconds)
+    days = seconds // 86400
+    if days > 0:
+        return f"{days} day{'s' if days != 1 else ''} ago"
+    elif seconds >= 3600:
+        hours = seconds // 3600
         return f"{hours} hour{'s' if hours != 1 else ''} ago"
-    elif diff.seconds >= 60:
-        minutes = diff.seconds // 60
+    elif seconds >= 60:
+        minutes = seconds // 60
         return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
     else:
-        return "just now" 
\ No newline at end of file
+        return "just now"
+
+
+def format_relative_time(timestamp: Union[datetime, float]) -> str:
+    """Format timestamp as relative time (e.g., '5 minutes ago').
+
+    Accepts a datetime or a monotonic float such as ``Message.created_at``
+    (which avoids building a datetime per message).
+    """
+    if isinstance(timestamp, datetime):
+        return format_age((datetime.now() - timestamp).total_seconds())
+    return format_age(time.monotonic() - timestamp)
@@ -0,0 +1,121 @@
+"""Server-initiated delivery of new messages to connected MCP sessions."""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+
+from .models import Message
+
+if TYPE_CHECKING:
+    from .server import MessagingServer
+
+logger = logging.getLogger(__name__)
+
+# Writes one notification to the subscribed session
+PushSender = Callable[[Dict], Awaitable[None]]
+
+
+def message_payload(recipient_id: str, messages: List[Message]) -> Dict:
+    """Notification data for one pushed page of messages."""
+    entries = []
+    for message in messages:
+        entry = {"from": message.from_client_id, "content": message.content, "sent_at": message.timestamp.isoformat()}
+        if message.correlation_id is not None:
+            entry["correlation_id"] = message.correlation_id
+        entries.append(entry)
+    return {"type": "messages", "recipient": recipient_id, "messages": entries}
+
+
+class PushSubscription:
+    """One client's push session and the task feeding it."""
+
+    __slots__ = ("client_id", "send", "task")
+
+    def __init__(self, client_id: str, send: PushSender):
+        self.client_id = client_id
+        self.send = send
+        self.task: Optional[asyncio.Task] = None
+
+
+class PushDelivery:
+    """Pushes each subscribed client's new messages to its MCP session.
+
+    One task per subscribed client blocks in ``wait_for_messages`` - a
+    single waiter for as long as the client stays idle - and writes every
+    page it receives as one notification. Idle clients cost no requests, and
+    delivery takes one write instead of a long-poll round trip.
+
+    A client has at most one push session; subscribing again moves it there.
+    If a write fails (the session has gone, or has no stream that would
+    carry the notification), the page is put back at the head of the queue
+    for ``get_messages`` and the subscription ends.
+    """
+
+    def __init__(self, server: "MessagingServer", wait_seconds: float = 300.0, max_messages: int = 100):
+        self.server = server
+        self.wait_seconds = wait_seconds
+        self.max_messages = max_messages
+        self._subscriptions: Dict[str, PushSubscription] = {}
+
+    def __len__(self) -> int:
+        """Number of clients with a push session."""
+        return len(self._subscriptions)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._subscriptions
+
+    def subscribe(self, client_id: str, send: PushSender) -> None:
+        """Push client_id's messages through send, replacing any earlier subscription."""
+        self.unsubscribe(client_id)
+        subscription = PushSubscription(client_id, send)
+        subscription.task = asyncio.create_task(self._run(subscription))
+        self._subscriptions[client_id] = subscription
+
+    def unsubscribe(self, client_id: str) -> bool:
+        """Stop pushing to client_id. Returns False if it had no push session."""
+        subscription = self._subscriptions.pop(client_id, None)
+        if subscription is None:
+            return False
+        subscription.task.cancel()
+        return True
+
+    async def close(self) -> None:
+        """Stop every push task."""
+        tasks = [subscription.task for subscription in self._subscriptions.values()]
+        self._subscriptions.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, subscription: PushSubscription) -> None:
+        client_id = subscription.client_id
+        try:
+            while self._subscriptions.get(client_id) is subscription:
+                # Drain what is already queued, page by page, before blocking
+                messages = await self.server.queue_backend.get_messages(client_id, max_messages=self.max_messages)
+                if not messages:
+                    messages = await self.server._wait_for_messages(
+                        "push", client_id, self.wait_seconds, max_messages=self.max_messages
+                    )
+                if not messages:
+                    continue
+                if self._subscriptions.get(client_id) is not subscription:
+                    # Unsubscribed while a page was being handed over
+                    await self._requeue(client_id, messages)
+                    return
+                try:
+                    await subscription.send(message_payload(client_id, messages))
+                except asyncio.CancelledError:
+                    await self._requeue(client_id, messages)
+                    raise
+                except Exception as e:
+                    logger.info(f"Push session for {client_id} is gone ({e!r}), requeueing {len(messages)} message(s)")
+                    await self._requeue(client_id, messages)
+                    return
+                self.server._observe_delivery(messages)
+        finally:
+            if self._subscriptions.get(client_id) is subscription:
+                del self._subscriptions[client_id]
+
+    async def _requeue(self, client_id: str, messages: List[Message]) -> None:
+        await self.server._restore_messages(client_id, messages)
@@ -2,43 +2,97 @@
 
 import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
 
+from . import metrics
+from .expiry import ExpiryIndex
+from .limits import EnqueueResult, OverflowPolicy, QueueLimits, SpillStore, message_size, take_page
+from .message_logging import MessageLogger
 from .models import Message, format_relative_time
+from .waiters import ReplyRegistry, WaiterRegistry
 
 logger = logging.getLogger(__name__)
-
-def format_message_log(action: str, sender_id: str, recipient_id: str, message: str) -> str:
-    """Format a message log entry with complete details."""
-    return f"""
-MESSAGE {action.upper()}
-FROM: {sender_id}
-TO: {recipient_id}
-CONTENT:
-{message}
-{"=" * 80}"""
-
+message_log = MessageLogger(logger)
 
 class QueueBackend(ABC):
     """Abstract queue backend interface - designed for Redis compatibility."""
     
+    # True if change_listener hears about every queue depth change (queues
+    # live in this process); otherwise it only hears about waiter changes.
+    emits_queue_changes = False
+    change_listener: Optional[Callable[[str], None]] = None
+    # Calls waiting for a reply, resolved on the send path (see ReplyRegistry).
+    # Only set by backends every send passes through (queues in this
+    # process); elsewhere request/reply waits fall back to the queue.
+    replies: Optional[ReplyRegistry] = None
+    
     @abstractmethod
-    async def send_message(self, recipient_id: str, message: Message) -> None:
-        """Add message to recipient's queue."""
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Add message to recipient's queue. A rejected result means the sender should back off."""
         pass
     
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Queue (recipient_id, message) pairs; returns one result per pair, in order.
+        
+        The default sends them one at a time. Backends override this to write
+        the whole batch in one round trip or transaction.
+        """
+        return [await self.send_message(recipient_id, message) for recipient_id, message in batch]
+    
+    async def send_broadcast(self, recipient_ids: List[str], message: Message) -> List[EnqueueResult]:
+        """Queue one message for every recipient; returns one result per recipient, in order.
+        
+        The same Message object is queued for each recipient, so backends that
+        keep messages in memory store the payload only once.
+        """
+        return await self.send_messages([(recipient_id, message) for recipient_id in recipient_ids])
+    
+    async def restore_messages(self, recipient_id: str, messages: List[Message]) -> List[EnqueueResult]:
+        """Put messages taken off recipient_id's queue, but never delivered, back at its head.
+        
+        They keep their original order ahead of anything sent since, and
+        waiting calls are woken. Returns one result per message, in order;
+        check them, since a rejected one is lost. The default has no way to
+        insert at the head and sends them again (at the tail, subject to the
+        queue limits); backends override it where they can.
+        """
+        results = await self.send_messages([(recipient_id, message) for message in messages])
+        await self.notify_new_message(recipient_id)
+        return results
+    
     @abstractmethod 
-    async def get_messages(self, client_id: str, pop: bool = True) -> List[Message]:
-        """Get messages for client (and optionally remove them)."""
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get messages for client (and optionally remove them), oldest first.
+        
+        max_messages / max_bytes bound the page returned (see ``take_page``);
+        anything beyond it stays queued for the next call.
+        """
         pass
     
     @abstractmethod
-    async def cleanup_expired_messages(self) -> None:
-        """Remove expired messages from all queues."""
+    async def cleanup_expired_messages(self) -> int:
+        """Remove expired messages from all queues. Returns the number removed."""
         pass
     
+    async def run_expiry_sweep(self) -> int:
+        """Run cleanup_expired_messages, recording its duration and yield in metrics."""
+        start = time.perf_counter()
+        removed = await self.cleanup_expired_messages()
+        metrics.EXPIRY_SWEEP_DURATION.observe(time.perf_counter() - start)
+        if removed:
+            metrics.MESSAGES_EXPIRED.inc(removed)
+        return removed
+    
     @abstractmethod
     async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
         """Block until new message arrives (or timeout). Returns True if message available."""
@@ -48,69 +102,475 @@ class QueueBackend(ABC):
     async def notify_new_message(self, client_id: str) -> None:
         """Notify any blocked calls that new message arrived."""
         pass
+    
+    async def notify_new_messages(self, client_ids: Iterable[str]) -> None:
+        """Notify blocked calls for several clients (e.g. after ``send_messages``)."""
+        for client_id in client_ids:
+            await self.notify_new_message(client_id)
+    
+    async def wait_for_messages(
+        self,
+        client_id: str,
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Block until messages arrive (or timeout) and pop one page of them. Returns [] on timeout.
+        
+        Backends that can hand messages directly to a waiting receiver override
+        this to skip the second queue read.
+        """
+        if await self.wait_for_new_message(client_id, timeout):
+            return await self.get_messages(client_id, pop=True, max_messages=max_messages, max_bytes=max_bytes)
+        return []
+    
+    async def wait_for_any_messages(
+        self,
+        client_ids: List[str],
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, List[Message]]:
+        """Block until any of client_ids has messages (or timeout); pop one page per ID that has some.
+        
+        Returns {client_id: page} for the IDs with messages, {} on timeout.
+        Backends with a ``waiters`` registry park the call as a single waiter
+        registered on every ID, so one caller acting as many identities holds
+        one waiter, not one per identity.
+        """
+        pages = await self._pop_pages(client_ids, max_messages, max_bytes)
+        if pages:
+            return pages
+        
+        waiters: Optional[WaiterRegistry] = getattr(self, "waiters", None)
+        if waiters is None:
+            return await self._wait_for_any_separately(client_ids, timeout, max_messages, max_bytes)
+        
+        waiter = waiters.register(client_ids)
+        try:
+            # Registered before checking again, so an arrival in between still wakes us
+            pages = await self._pop_pages(client_ids, max_messages, max_bytes)
+            if pages or await waiters.wait(waiter, timeout) is None:
+                return pages
+        finally:
+            waiters.unregister(waiter)
+        return await self._pop_pages(client_ids, max_messages, max_bytes)
+    
+    async def _pop_pages(
+        self, client_ids: List[str], max_messages: Optional[int], max_bytes: Optional[int]
+    ) -> Dict[str, List[Message]]:
+        pages = {}
+        for client_id in client_ids:
+            messages = await self.get_messages(client_id, pop=True, max_messages=max_messages, max_bytes=max_bytes)
+            if messages:
+                pages[client_id] = messages
+        return pages
+    
+    async def _wait_for_any_separately(
+        self, client_ids: List[str], timeout: float, max_messages: Optional[int], max_bytes: Optional[int]
+    ) -> Dict[str, List[Message]]:
+        """wait_for_any_messages with one ``wait_for_new_message`` per ID.
+        
+        Those waits do not pop, so the ones still pending when the first
+        returns can be cancelled without losing messages.
+        """
+        tasks = [asyncio.create_task(self.wait_for_new_message(client_id, timeout)) for client_id in client_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                if await next_done:
+                    break
+            else:
+                return {}
+        finally:
+            for task in tasks:
+                task.cancel()
+        return await self._pop_pages(client_ids, max_messages, max_bytes)
+    
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        return len(await self.get_messages(client_id, pop=False))
+    
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages."""
+        return {}
+    
+    async def queue_depths_for(self, client_ids: Iterable[str]) -> Dict[str, int]:
+        """Queue depth of each of client_ids (0 included). Backends override this to batch the lookups."""
+        return {client_id: await self.queue_depth(client_id) for client_id in client_ids}
+    
+    def set_change_listener(self, listener: Optional[Callable[[str], None]]) -> None:
+        """Call listener(client_id) whenever a client's queue depth or waiter count changes.
+        
+        The listener runs synchronously inside queue operations and must be cheap.
+        """
+        self.change_listener = listener
+        waiters = getattr(self, "waiters", None)
+        if waiters is not None:
+            waiters.on_change = listener
+    
+    def stats_version(self) -> Optional[str]:
+        """Token that changes whenever queue_depths / queue stats would change.
+        
+        Lets callers skip recomputing stats when nothing happened. None means
+        the backend cannot tell cheaply (e.g. queues shared between processes).
+        """
+        return None
+    
+    async def start(self) -> None:
+        """Start background work (expiry sweeper, connections). Called once at server startup."""
+        pass
+    
+    async def close(self) -> None:
+        """Stop background work and release resources. Called once at server shutdown."""
+        pass
 
 
 class InMemoryQueueBackend(QueueBackend):
-    """In-memory queue backend using asyncio.Event for wake-up notifications."""
+    """In-memory queue backend using per-waiter futures for wake-up notifications.
+    
+    When a receiver is already blocked in ``wait_for_messages`` and its queue
+    is empty, ``send_message`` hands the message to it directly. A reply to a
+    pending ``send_message_and_wait`` call goes straight to that call
+    (``replies``) and never touches the queue.
+    
+    Expiry is driven by an ``ExpiryIndex`` and a background sweeper task
+    (see ``start``), so sending and receiving never scan the queues.
+    
+    Optional ``QueueLimits`` cap each queue and the whole backend by message
+    count and bytes; what happens on overflow is the limits' overflow policy.
+    Spilled messages are kept on disk and moved back into memory, in order,
+    once the recipient's in-memory queue drains.
+    
+    Every queue change bumps ``version`` and is reported to the change
+    listener, if one is set.
+    
+    A message queued for several recipients (``send_broadcast``) is stored
+    once: queues hold references to the same object, and its payload is
+    reference-counted so ``total_bytes`` counts it a single time.
+    """
     
-    def __init__(self, message_expiration_seconds: float = float('inf')):  # Set to infinity by default
-        self.queues: Dict[str, List[Message]] = {}
-        self.notification_events: Dict[str, asyncio.Event] = {}
+    emits_queue_changes = True
+    
+    def __init__(
+        self,
+        message_expiration_seconds: float = float('inf'),  # Set to infinity by default
+        sweep_interval_seconds: float = 1.0,
+        limits: Optional[QueueLimits] = None,
+    ):
+        self.queues: Dict[str, Deque[Message]] = {}
+        self.waiters = WaiterRegistry()
+        self.replies = ReplyRegistry()
         self.message_expiration_seconds = message_expiration_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.expiry_index = ExpiryIndex()
+        self.limits = limits or QueueLimits()
+        self.spill = SpillStore(self.limits.spill_directory)
+        self.queue_bytes: Dict[str, int] = {}
+        self.total_messages = 0
+        self.total_bytes = 0
+        # id(message) -> number of queue entries referencing it
+        self._payload_refs: Dict[int, int] = {}
+        # Bumped on every queue change, see stats_version
+        self.version = 0
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._started = False
         logger.info(f"Initialized InMemoryQueueBackend (message expiration: {message_expiration_seconds}s)")
     
-    async def send_message(self, recipient_id: str, message: Message) -> None:
-        """Add message to recipient's queue."""
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Add message to recipient's queue, or hand it straight to a waiting receiver."""
+        return self._send(recipient_id, message)
+    
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Queue a batch without yielding to the event loop between messages."""
+        return [self._send(recipient_id, message) for recipient_id, message in batch]
+    
+    def _send(self, recipient_id: str, message: Message) -> EnqueueResult:
+        if self.replies.deliver(recipient_id, message) or (
+            not self.queues.get(recipient_id)
+            and not self.spill.count(recipient_id)
+            and self.waiters.deliver(recipient_id, [message])
+        ):
+            message_log.log("delivered", message.from_client_id, recipient_id, message.content)
+            return EnqueueResult(status="delivered")
+        
+        result = self._admit(recipient_id, message)
+        if result.accepted:
+            message_log.log(result.status, message.from_client_id, recipient_id, message.content)
+        else:
+            logger.warning(f"Rejected message from {message.from_client_id} to {recipient_id}: {result.reason}")
+        return result
+    
+    def _overflow_reason(
+        self,
+        queue_messages: int,
+        queue_bytes: int,
+        total_messages: int,
+        total_bytes: int,
+        size: int,
+        added_total_bytes: Optional[int] = None,
+    ) -> str:
+        """Why a message of size bytes does not fit, or "" if it does.
+        
+        added_total_bytes is what queueing it adds to the global byte count
+        (0 for a payload that is already stored for another recipient).
+        """
+        if added_total_bytes is None:
+            added_total_bytes = size
+        limits = self.limits
+        if limits.max_messages_per_queue is not None and queue_messages + 1 > limits.max_messages_per_queue:
+            return f"recipient queue is full ({queue_messages} messages, limit {limits.max_messages_per_queue})"
+        if limits.max_bytes_per_queue is not None and queue_bytes + size > limits.max_bytes_per_queue:
+            return f"recipient queue is full ({queue_bytes} bytes, limit {limits.max_bytes_per_queue})"
+        if limits.max_total_messages is not None and total_messages + 1 > limits.max_total_messages:
+            return f"server queue capacity reached ({total_messages} messages, limit {limits.max_total_messages})"
+        if limits.max_total_bytes is not None and total_bytes + added_total_bytes > limits.max_total_bytes:
+            return f"server queue capacity reached ({total_bytes} bytes, limit {limits.max_total_bytes})"
+        return ""
+    
+    def _admit(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Queue message subject to the configured limits and overflow policy."""
+        if not self.limits.bounded:
+            self._enqueue(recipient_id, message)
+            return EnqueueResult()
+        
+        if self.spill.count(recipient_id):
+            # Older messages are already on disk; keep FIFO order behind them
+            self.spill.append(recipient_id, message, self._wall_deadline())
+            self._changed(recipient_id)
+            return EnqueueResult(status="spilled", reason="recipient has spilled messages")
+        
+        size = message_size(message)
+        added_total_bytes = 0 if id(message) in self._payload_refs else size
+        queue = self.queues.get(recipient_id, ())
+        queue_bytes = self.queue_bytes.get(recipient_id, 0)
+        reason = self._overflow_reason(len(queue), queue_bytes, self.total_messages, self.total_bytes, size, added_total_bytes)
+        if not reason:
+            self._enqueue(recipient_id, message, size)
+            return EnqueueResult()
+        
+        policy = self.limits.overflow_policy
+        if policy == OverflowPolicy.SPILL:
+            self.spill.append(recipient_id, message, self._wall_deadline())
+            self._changed(recipient_id)
+            return EnqueueResult(status="spilled", reason=reason)
+        
+        if policy == OverflowPolicy.DROP_OLDEST:
+            # Only evict from this recipient's own queue, and only if that makes room
+            if not self._overflow_reason(0, 0, self.total_messages - len(queue), self.total_bytes - queue_bytes, size, added_total_bytes):
+                dropped = 0
+                while self._overflow_reason(
+                    len(self.queues.get(recipient_id, ())), self.queue_bytes.get(recipient_id, 0),
+                    self.total_messages, self.total_bytes, size, added_total_bytes,
+                ):
+                    self._remove_head(recipient_id, 1)
+                    dropped += 1
+                self.expiry_index.consume(recipient_id, dropped)
+                self._enqueue(recipient_id, message, size)
+                logger.warning(f"Dropped {dropped} oldest messages for {recipient_id}: {reason}")
+                return EnqueueResult(status="dropped_oldest", reason=reason, dropped=dropped)
+        
+        return EnqueueResult(status="rejected", reason=reason)
+    
+    def _changed(self, client_id: str) -> None:
+        self.version += 1
+        if self.change_listener is not None:
+            self.change_listener(client_id)
+    
+    def _wall_deadline(self) -> Optional[float]:
+        if self.message_expiration_seconds == float('inf'):
+            return None
+        return time.time() + self.message_expiration_seconds
+    
+    def _enqueue(
+        self,
+        recipient_id: str,
+        message: Message,
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        at_head: bool = False,
+    ) -> None:
         if recipient_id not in self.queues:
-            self.queues[recipient_id] = []
+            self.queues[recipient_id] = deque()
             logger.info(f"Created new queue for {recipient_id}")
         
-        self.queues[recipient_id].append(message)
-        logger.info(format_message_log("queued", message.from_client_id, recipient_id, message.content))
+        if size is None:
+            size = message_size(message)
+        if at_head:
+            self.queues[recipient_id].appendleft(message)
+        else:
+            self.queues[recipient_id].append(message)
+        self.queue_bytes[recipient_id] = self.queue_bytes.get(recipient_id, 0) + size
+        self.total_messages += 1
+        self._changed(recipient_id)
+        
+        refs = self._payload_refs.get(id(message), 0)
+        self._payload_refs[id(message)] = refs + 1
+        if not refs:
+            self.total_bytes += size
+        
+        if ttl is None:
+            ttl = self.message_expiration_seconds
+        if ttl == float('inf'):
+            return
+        if at_head:
+            # Dated from its creation, so its deadline is no later than those of the newer messages behind it
+            self.expiry_index.schedule_head(recipient_id, message.created_at + ttl)
+        else:
+            self.expiry_index.schedule(recipient_id, time.monotonic() + ttl)
     
-    async def get_messages(self, client_id: str, pop: bool = True) -> List[Message]:
-        """Get messages for client (and optionally remove them)."""
+    async def restore_messages(self, recipient_id: str, messages: List[Message]) -> List[EnqueueResult]:
+        """Put undelivered messages back at the head of the queue (never refused: they were queued before)."""
+        self._restore_head(recipient_id, messages)
+        await self.notify_new_message(recipient_id)
+        return [EnqueueResult() for _ in messages]
+    
+    def _restore_head(self, recipient_id: str, messages: List[Message]) -> None:
+        """Put messages taken off a queue back at its head, in their original order.
+        
+        Used when a hand-off reaches a call that is cancelled before it can
+        return them: messages sent in the meantime must not overtake them.
+        """
+        for message in reversed(messages):
+            self._enqueue(recipient_id, message, at_head=True)
+    
+    def _remove_head(self, recipient_id: str, count: int) -> List[Message]:
+        """Remove up to count messages from the head of a queue, keeping the accounting."""
+        queue = self.queues.get(recipient_id)
+        if not queue:
+            return []
+        
+        removed = [queue.popleft() for _ in range(min(count, len(queue)))]
+        removed_bytes = 0
+        for message in removed:
+            size = message_size(message)
+            removed_bytes += size
+            refs = self._payload_refs[id(message)] - 1
+            if refs:
+                self._payload_refs[id(message)] = refs
+            else:
+                del self._payload_refs[id(message)]
+                self.total_bytes -= size
+        self.total_messages -= len(removed)
+        self.queue_bytes[recipient_id] -= removed_bytes
+        self._changed(recipient_id)
+        
+        if not queue:
+            del self.queues[recipient_id]
+            del self.queue_bytes[recipient_id]
+        return removed
+    
+    def _refill_from_spill(self, recipient_id: str) -> None:
+        """Move spilled messages back into a drained in-memory queue."""
+        if not self.spill.count(recipient_id) or self.queues.get(recipient_id):
+            return
+        
+        limits = self.limits
+        max_messages = limits.max_messages_per_queue or 1000
+        if limits.max_total_messages is not None:
+            max_messages = min(max_messages, limits.max_total_messages - self.total_messages)
+        max_bytes = limits.max_bytes_per_queue
+        if limits.max_total_bytes is not None:
+            room = limits.max_total_bytes - self.total_bytes
+            max_bytes = room if max_bytes is None else min(max_bytes, room)
+        if max_messages <= 0:
+            return
+        
+        now = time.time()
+        for message, deadline in self.spill.take(recipient_id, max_messages, max_bytes):
+            ttl = float('inf') if deadline is None else deadline - now
+            self._enqueue(recipient_id, message, ttl=ttl)
+        logger.debug(f"Refilled {len(self.queues.get(recipient_id, ()))} spilled messages for {recipient_id}")
+    
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get one page of messages for client (and optionally remove them).
+        
+        Only the returned page is copied, so cost does not grow with the backlog.
+        """
         if client_id not in self.queues or not self.queues[client_id]:
             return []
         
-        messages = self.queues[client_id].copy()
+        queue = self.queues[client_id]
+        if max_bytes is None:
+            messages = list(islice(queue, max_messages))
+        else:
+            messages = take_page(queue, max_messages, max_bytes)
         message_count = len(messages)
         
         if pop:
-            # Remove the queue entirely (pop all messages)
-            del self.queues[client_id]
+            # Pop the page from the head of the queue
+            self._remove_head(client_id, message_count)
+            self.expiry_index.consume(client_id, message_count)
+            self._refill_from_spill(client_id)
             # Log each retrieved message
-            for msg in messages:
-                logger.info(format_message_log("retrieved", msg.from_client_id, client_id, msg.content))
+            if message_log.enabled:
+                for msg in messages:
+                    message_log.log("retrieved", msg.from_client_id, client_id, msg.content)
             logger.info(f"Popped {message_count} messages for {client_id}")
         else:
             logger.debug(f"Peeked at {message_count} messages for {client_id}")
         
         return messages
     
-    async def cleanup_expired_messages(self) -> None:
-        """Remove expired messages from all queues."""
-        # Skip cleanup if expiration is disabled (infinity)
-        if self.message_expiration_seconds == float('inf'):
-            return
-            
-        cutoff_time = datetime.now() - timedelta(seconds=self.message_expiration_seconds)
-        
-        for recipient_id in list(self.queues.keys()):
-            original_count = len(self.queues[recipient_id])
-            self.queues[recipient_id] = [
-                msg for msg in self.queues[recipient_id] 
-                if msg.timestamp > cutoff_time
-            ]
+    async def cleanup_expired_messages(self) -> int:
+        """Remove expired messages using the expiry index (no queue scans)."""
+        expired = self.expiry_index.pop_expired(time.monotonic())
+        
+        removed = 0
+        for recipient_id, count in expired.items():
+            expired_messages = self._remove_head(recipient_id, count)
+            if not expired_messages:
+                continue
             
-            cleaned_count = original_count - len(self.queues[recipient_id])
-            if cleaned_count > 0:
-                logger.info(f"Cleaned up {cleaned_count} expired messages for {recipient_id}")
+            removed += len(expired_messages)
+            logger.info(f"Cleaned up {len(expired_messages)} expired messages for {recipient_id}")
+            self._refill_from_spill(recipient_id)
+        
+        return removed
+    
+    async def start(self) -> None:
+        """Refill messages spilled before a restart, then start the background expiry sweeper."""
+        if not self._started:
+            self._started = True
+            # Done here rather than in __init__, so a backend built but never started leaves the spill files alone.
+            # Anything sent before start() was spilled behind them, so order is kept.
+            for recipient_id in list(self.spill.counts):
+                self._refill_from_spill(recipient_id)
+        if self.message_expiration_seconds == float('inf') or self._sweeper_task is not None:
+            return
+        self._sweeper_task = asyncio.create_task(self._sweep_expired_messages())
+        logger.info(f"Started expiry sweeper (interval: {self.sweep_interval_seconds}s)")
+    
+    async def close(self) -> None:
+        """Stop the background expiry sweeper and close spill files."""
+        self.spill.close()
+        if self._sweeper_task is None:
+            return
+        self._sweeper_task.cancel()
+        try:
+            await self._sweeper_task
+        except asyncio.CancelledError:
+            pass
+        self._sweeper_task = None
+    
+    async def _sweep_expired_messages(self) -> None:
+        """Sleep until the next deadline (capped by the sweep interval) and expire."""
+        while True:
+            delay = self.sweep_interval_seconds
+            next_deadline = self.expiry_index.next_deadline()
+            if next_deadline is not None:
+                delay = min(delay, max(0.0, next_deadline - time.monotonic()))
+            await asyncio.sleep(delay)
             
-            # Remove empty queues
-            if not self.queues[recipient_id]:
-                del self.queues[recipient_id]
-                logger.debug(f"Removed empty queue for {recipient_id}")
+            try:
+                await self.run_expiry_sweep()
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {e}")
     
     async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
         """Block until new message arrives, but check existing messages first."""
@@ -120,39 +580,122 @@ class InMemoryQueueBackend(QueueBackend):
             logger.debug(f"Messages already available for {client_id}")
             return True  # Messages exist, no need to wait
         
-        # Create event if it doesn't exist
-        if client_id not in self.notification_events:
-            self.notification_events[client_id] = asyncio.Event()
-        
         logger.debug(f"Waiting for new message for {client_id} (timeout: {timeout}s)")
         
+        waiter = self.waiters.register([client_id])
         try:
-            await asyncio.wait_for(self.notification_events[client_id].wait(), timeout)
-            # Clear the event for next wait
-            self.notification_events[client_id].clear()
+            if await self.waiters.wait(waiter, timeout) is None:
+                logger.debug(f"Timeout waiting for message for {client_id}")
+                return False
             logger.debug(f"Wake-up notification received for {client_id}")
             return True
-        except asyncio.TimeoutError:
+        finally:
+            self.waiters.unregister(waiter)
+    
+    async def wait_for_messages(
+        self,
+        client_id: str,
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Wait for messages and return a page of them, taking direct hand-off from send_message."""
+        if self.queues.get(client_id):
+            return await self.get_messages(client_id, pop=True, max_messages=max_messages, max_bytes=max_bytes)
+        
+        waiter = self.waiters.register([client_id], accepts_delivery=True)
+        try:
+            wake_up = await self.waiters.wait(waiter, timeout)
+        except asyncio.CancelledError:
+            # Cancelled after a hand-off but before we resumed: don't lose the messages
+            if waiter.future.done() and not waiter.future.cancelled():
+                _, handed_off = waiter.future.result()
+                self._restore_head(client_id, list(handed_off or ()))
+            raise
+        finally:
+            self.waiters.unregister(waiter)
+        
+        if wake_up is None:
             logger.debug(f"Timeout waiting for message for {client_id}")
-            return False
+            return []
+        
+        _, handed_off = wake_up
+        messages = list(handed_off or ())
+        if messages and (max_messages is not None or max_bytes is not None):
+            # A paged caller gets the hand-off on its own; the rest waits for the next page
+            return messages
+        if self.queues.get(client_id):
+            messages.extend(await self.get_messages(client_id, pop=True, max_messages=max_messages, max_bytes=max_bytes))
+        return messages
+    
+    async def wait_for_any_messages(
+        self,
+        client_ids: List[str],
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, List[Message]]:
+        """Wait on several queues with one waiter, taking direct hand-off from send_message."""
+        pages = await self._pop_pages(client_ids, max_messages, max_bytes)
+        if pages:
+            return pages
+        
+        waiter = self.waiters.register(client_ids, accepts_delivery=True)
+        try:
+            wake_up = await self.waiters.wait(waiter, timeout)
+        except asyncio.CancelledError:
+            # Cancelled after a hand-off but before we resumed: don't lose the messages
+            if waiter.future.done() and not waiter.future.cancelled():
+                client_id, handed_off = waiter.future.result()
+                self._restore_head(client_id, list(handed_off or ()))
+            raise
         finally:
-            # Clean up the event if no messages are waiting
-            if client_id in self.notification_events and client_id not in self.queues:
-                del self.notification_events[client_id]
-                logger.debug(f"Cleaned up notification event for {client_id}")
+            self.waiters.unregister(waiter)
+        
+        if wake_up is None:
+            return {}
+        
+        client_id, handed_off = wake_up
+        if handed_off and (max_messages is not None or max_bytes is not None):
+            # A paged caller gets the hand-off on its own for that ID
+            pages = await self._pop_pages([c for c in client_ids if c != client_id], max_messages, max_bytes)
+        else:
+            pages = await self._pop_pages(client_ids, max_messages, max_bytes)
+        if handed_off:
+            # Handed over only when that queue was empty, so it comes first
+            pages[client_id] = list(handed_off) + pages.get(client_id, [])
+        return pages
     
     async def notify_new_message(self, client_id: str) -> None:
-        """Wake up any blocked send_message_and_wait calls."""
-        if client_id in self.notification_events:
-            self.notification_events[client_id].set()
-            logger.debug(f"Notified blocked call for {client_id}")
+        """Wake up every blocked call waiting on client_id."""
+        woken = self.waiters.notify(client_id)
+        if woken:
+            logger.debug(f"Notified {woken} blocked calls for {client_id}")
         else:
             logger.debug(f"No blocked calls waiting for {client_id}")
     
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        return len(self.queues.get(client_id, ())) + self.spill.count(client_id)
+    
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages (including spilled ones)."""
+        depths = {client_id: len(queue) for client_id, queue in self.queues.items()}
+        for client_id, count in self.spill.counts.items():
+            depths[client_id] = depths.get(client_id, 0) + count
+        return depths
+    
+    def stats_version(self) -> Optional[str]:
+        """Queue change counter plus waiter count (both part of the stats)."""
+        return f"{self.version}.{len(self.waiters)}"
+    
     def get_queue_stats(self) -> Dict[str, int]:
         """Get statistics about current queues (for debugging)."""
         return {
             "total_queues": len(self.queues),
-            "total_messages": sum(len(msgs) for msgs in self.queues.values()),
-            "active_waiters": len(self.notification_events)
+            "total_messages": self.total_messages,
+            "total_bytes": self.total_bytes,
+            "stored_payloads": len(self._payload_refs),
+            "spilled_messages": len(self.spill),
+            "active_waiters": len(self.waiters)
         } 
\ No newline at end of file
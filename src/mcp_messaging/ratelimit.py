@@ -0,0 +1,147 @@
+"""Token-bucket rate limiting of sends, per sender and per recipient."""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Tokens left for one key, as of ``updated`` (a time.monotonic() value)."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token buckets keyed by client ID: ``rate`` tokens per second, up to ``burst``.
+
+    A bucket is two floats, refilled lazily when its key is next seen, so
+    checking a send is O(1). Buckets are kept in an ``OrderedDict`` in
+    least-recently-used order; one idle long enough to have refilled
+    completely is no different from a new bucket and is evicted from the
+    front, so memory only grows with the clients that are actually sending.
+
+    ``version`` is bumped whenever a bucket is added or evicted, i.e. when
+    the reported bucket count changes.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        # Seconds for an empty bucket to fill up; idle buckets older than this are dropped
+        self.idle_seconds = self.burst / rate
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.version = 0
+
+    def __len__(self) -> int:
+        """Number of buckets held (keys seen within idle_seconds)."""
+        return len(self._buckets)
+
+    def _tokens(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        return min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+
+    def retry_after(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Seconds until key can spend cost tokens; 0.0 if it can now. Takes nothing."""
+        if now is None:
+            now = time.monotonic()
+        missing = min(cost, self.burst) - self._tokens(key, now)
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> None:
+        """Spend cost tokens from key's bucket (check ``retry_after`` first)."""
+        if now is None:
+            now = time.monotonic()
+        tokens = self._tokens(key, now) - cost
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = TokenBucket(tokens, now)
+            self.version += 1
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = tokens
+            bucket.updated = now
+        self.evict_idle(now)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop buckets that have refilled completely. Returns how many were dropped."""
+        if now is None:
+            now = time.monotonic()
+        evicted = 0
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket.updated < self.idle_seconds:
+                break
+            del buckets[key]
+            evicted += 1
+            self.version += 1
+        return evicted
+
+
+class SendRateLimits:
+    """Rate limits applied to every send: one bucket per sender and one per recipient (None = unlimited)."""
+
+    def __init__(self, per_sender: Optional[RateLimiter] = None, per_recipient: Optional[RateLimiter] = None):
+        self.per_sender = per_sender
+        self.per_recipient = per_recipient
+
+    @classmethod
+    def from_env(cls) -> "SendRateLimits":
+        def limiter(rate_name: str, burst_name: str) -> Optional[RateLimiter]:
+            rate = os.getenv(rate_name)
+            if not rate:
+                return None
+            burst = os.getenv(burst_name)
+            return RateLimiter(float(rate), float(burst) if burst else None)
+
+        return cls(
+            per_sender=limiter("SEND_RATE_PER_SENDER", "SEND_BURST_PER_SENDER"),
+            per_recipient=limiter("SEND_RATE_PER_RECIPIENT", "SEND_BURST_PER_RECIPIENT"),
+        )
+
+    def acquire(self, sender_id: Optional[str], recipient_id: Optional[str]) -> Optional[str]:
+        """Take one send from both buckets if both allow it (a None ID skips its bucket).
+
+        Returns None when the send may go ahead, or which limit is exhausted
+        ("sender" or "recipient"); nothing is taken then.
+        """
+        now = time.monotonic()
+        sender = self.per_sender if sender_id is not None else None
+        recipient = self.per_recipient if recipient_id is not None else None
+        if sender is not None and sender.retry_after(sender_id, now=now):
+            return "sender"
+        if recipient is not None and recipient.retry_after(recipient_id, now=now):
+            return "recipient"
+        if sender is not None:
+            sender.take(sender_id, now=now)
+        if recipient is not None:
+            recipient.take(recipient_id, now=now)
+        return None
+
+    def retry_after(self, limit: str, client_id: str) -> float:
+        """Seconds until client_id's bucket for limit ("sender" or "recipient") has a token again."""
+        limiter = self.per_sender if limit == "sender" else self.per_recipient
+        return limiter.retry_after(client_id) if limiter is not None else 0.0
+
+    @property
+    def version(self) -> str:
+        """Token that changes whenever ``stats`` would."""
+        return "-".join(str(limiter.version) if limiter is not None else "0" for limiter in (self.per_sender, self.per_recipient))
+
+    def stats(self) -> Dict:
+        """Configured rates and bucket counts, for the sessions API."""
+        def describe(limiter: Optional[RateLimiter]) -> Optional[Dict]:
+            if limiter is None:
+                return None
+            return {"rate_per_second": limiter.rate, "burst": limiter.burst, "buckets": len(limiter)}
+
+        return {"per_sender": describe(self.per_sender), "per_recipient": describe(self.per_recipient)}
@@ -0,0 +1,426 @@
+"""Redis queue backend - lets several server processes share queues."""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .limits import EnqueueResult, take_page
+from .models import Message
+from .message_logging import MessageLogger
+from .queue_backends import QueueBackend
+from .waiters import WaiterRegistry
+
+try:
+    import redis.asyncio as redis
+    from redis.exceptions import WatchError
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+    WatchError = Exception
+
+logger = logging.getLogger(__name__)
+message_log = MessageLogger(logger)
+
+
+class RedisQueueBackend(QueueBackend):
+    """Queue backend storing each recipient's queue in a Redis list.
+
+    Keys (all under ``key_prefix``):
+
+    - ``{prefix}:queue:{client_id}`` - list of JSON-encoded messages (FIFO)
+    - ``{prefix}:clients`` - set of client IDs with a non-empty queue
+    - ``{prefix}:expiry`` - sorted set of client IDs scored by the deadline of
+      their oldest message, swept by a background task
+    - ``{prefix}:notify:{client_id}`` - pub/sub channel used for wake-ups
+
+    Deadlines are wall-clock (``time.time()``) because monotonic clocks are
+    not comparable across processes or hosts.
+
+    Each process keeps a single pattern subscription to the notify channels
+    and fans wake-ups out to its local waiters, so blocked ``get_messages``
+    calls never hold a Redis connection.
+    """
+
+    # Messages read per round trip for a page bounded only by max_bytes
+    PAGE_FETCH_SIZE = 1000
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        message_expiration_seconds: float = float('inf'),
+        key_prefix: str = "mcp",
+        max_connections: int = 50,
+        sweep_interval_seconds: float = 1.0,
+        client: Optional[Any] = None,
+    ):
+        if client is None:
+            if redis is None:
+                raise ImportError("RedisQueueBackend requires the 'redis' package: pip install 'mcp-ide-bridge[redis]'")
+            pool = redis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+            client = redis.Redis(connection_pool=pool)
+
+        self.redis = client
+        self.key_prefix = key_prefix
+        self.message_expiration_seconds = message_expiration_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.waiters = WaiterRegistry()
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listener_lock = asyncio.Lock()
+        self._sweeper_task: Optional[asyncio.Task] = None
+        logger.info(f"Initialized RedisQueueBackend (prefix: {key_prefix}, message expiration: {message_expiration_seconds}s)")
+
+    # Key helpers
+
+    def _queue_key(self, client_id: str) -> str:
+        return f"{self.key_prefix}:queue:{client_id}"
+
+    def _notify_channel(self, client_id: str) -> str:
+        return f"{self.key_prefix}:notify:{client_id}"
+
+    @property
+    def _clients_key(self) -> str:
+        return f"{self.key_prefix}:clients"
+
+    @property
+    def _expiry_key(self) -> str:
+        return f"{self.key_prefix}:expiry"
+
+    # Encoding
+
+    def _deadline(self) -> Optional[float]:
+        if self.message_expiration_seconds == float('inf'):
+            return None
+        return time.time() + self.message_expiration_seconds
+
+    @staticmethod
+    def _encode(message: Message, deadline: Optional[float]) -> str:
+        data = {
+            "from": message.from_client_id,
+            "content": message.content,
+            "ts": message.wall_time,
+            "exp": deadline,
+        }
+        if message.correlation_id is not None:
+            data["cid"] = message.correlation_id
+        return json.dumps(data)
+
+    @staticmethod
+    def _decode(raw: str) -> Message:
+        data = json.loads(raw)
+        return Message(
+            from_client_id=data["from"],
+            content=data["content"],
+            wall_time=data["ts"],
+            correlation_id=data.get("cid"),
+        )
+
+    # QueueBackend interface
+
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Append message to recipient's list in a single pipelined transaction."""
+        deadline = self._deadline()
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(self._queue_key(recipient_id), self._encode(message, deadline))
+            pipe.sadd(self._clients_key, recipient_id)
+            if deadline is not None:
+                # NX keeps the score at the deadline of the oldest queued message
+                pipe.zadd(self._expiry_key, {recipient_id: deadline}, nx=True)
+            await pipe.execute()
+
+        message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return EnqueueResult()
+
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Append the whole batch in a single pipelined transaction (one RPUSH per recipient)."""
+        if not batch:
+            return []
+
+        deadline = self._deadline()
+        encoded: Dict[str, List[str]] = {}
+        for recipient_id, message in batch:
+            encoded.setdefault(recipient_id, []).append(self._encode(message, deadline))
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for recipient_id, values in encoded.items():
+                pipe.rpush(self._queue_key(recipient_id), *values)
+            pipe.sadd(self._clients_key, *encoded)
+            if deadline is not None:
+                pipe.zadd(self._expiry_key, {recipient_id: deadline for recipient_id in encoded}, nx=True)
+            await pipe.execute()
+
+        if message_log.enabled:
+            for recipient_id, message in batch:
+                message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return [EnqueueResult() for _ in batch]
+
+    async def send_broadcast(self, recipient_ids: List[str], message: Message) -> List[EnqueueResult]:
+        """Encode the message once and push it to every recipient in one transaction."""
+        recipients = list(dict.fromkeys(recipient_ids))
+        if not recipients:
+            return []
+
+        deadline = self._deadline()
+        encoded = self._encode(message, deadline)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for recipient_id in recipient_ids:
+                pipe.rpush(self._queue_key(recipient_id), encoded)
+            pipe.sadd(self._clients_key, *recipients)
+            if deadline is not None:
+                pipe.zadd(self._expiry_key, {recipient_id: deadline for recipient_id in recipients}, nx=True)
+            await pipe.execute()
+
+        if message_log.enabled:
+            for recipient_id in recipient_ids:
+                message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return [EnqueueResult() for _ in recipient_ids]
+
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get one page of messages for client (and optionally remove them atomically)."""
+        key = self._queue_key(client_id)
+        paged = max_messages is not None or max_bytes is not None
+        end = (max_messages or self.PAGE_FETCH_SIZE) - 1 if paged else -1
+
+        if not pop:
+            raw_messages = await self.redis.lrange(key, 0, end)
+            messages = take_page((self._decode(raw) for raw in raw_messages), max_messages, max_bytes)
+            logger.debug(f"Peeked at {len(messages)} messages for {client_id}")
+            return messages
+
+        if paged:
+            messages = await self._pop_page(client_id, end, max_messages, max_bytes)
+        else:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrange(key, 0, -1)
+                pipe.delete(key)
+                pipe.srem(self._clients_key, client_id)
+                pipe.zrem(self._expiry_key, client_id)
+                raw_messages, *_ = await pipe.execute()
+            messages = [self._decode(raw) for raw in raw_messages]
+
+        if not messages:
+            return []
+
+        if message_log.enabled:
+            for msg in messages:
+                message_log.log("retrieved", msg.from_client_id, client_id, msg.content)
+        logger.info(f"Popped {len(messages)} messages for {client_id}")
+        return messages
+
+    async def _pop_page(self, client_id: str, end: int, max_messages: Optional[int], max_bytes: Optional[int]) -> List[Message]:
+        """Pop the head page of one queue; retries if another process races us.
+
+        The expiry score is left at the popped head's deadline; the next sweep
+        of this client moves it forward.
+        """
+        key = self._queue_key(client_id)
+
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    head = await pipe.lrange(key, 0, end)
+                    length = await pipe.llen(key)
+                    messages = take_page((self._decode(raw) for raw in head), max_messages, max_bytes)
+
+                    pipe.multi()
+                    pipe.ltrim(key, len(messages), -1)
+                    if len(messages) == length:
+                        pipe.srem(self._clients_key, client_id)
+                        pipe.zrem(self._expiry_key, client_id)
+                    await pipe.execute()
+                    return messages
+                except WatchError:
+                    continue
+
+    async def cleanup_expired_messages(self) -> int:
+        """Trim expired prefixes of the queues whose oldest deadline has passed."""
+        if self.message_expiration_seconds == float('inf'):
+            return 0
+
+        now = time.time()
+        due_clients = await self.redis.zrangebyscore(self._expiry_key, "-inf", now)
+
+        removed = 0
+        for client_id in due_clients:
+            count = await self._trim_expired(client_id, now)
+            if count:
+                removed += count
+                logger.info(f"Cleaned up {count} expired messages for {client_id}")
+        return removed
+
+    async def _trim_expired(self, client_id: str, now: float, batch_size: int = 100) -> int:
+        """Drop the expired head of one queue; retries if another process races us."""
+        key = self._queue_key(client_id)
+
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    head = await pipe.lrange(key, 0, batch_size - 1)
+                    expired = 0
+                    next_deadline = None
+                    for raw in head:
+                        deadline = json.loads(raw)["exp"]
+                        if deadline is not None and deadline <= now:
+                            expired += 1
+                        else:
+                            next_deadline = deadline
+                            break
+
+                    pipe.multi()
+                    if expired:
+                        pipe.ltrim(key, expired, -1)
+                    if next_deadline is not None:
+                        pipe.zadd(self._expiry_key, {client_id: next_deadline})
+                    elif expired == batch_size:
+                        # Whole batch expired - re-check this client on the next pass
+                        pipe.zadd(self._expiry_key, {client_id: now})
+                    elif expired == len(head):
+                        pipe.zrem(self._expiry_key, client_id)
+                        pipe.srem(self._clients_key, client_id)
+                    else:
+                        # Head was queued while expiration was disabled
+                        pipe.zrem(self._expiry_key, client_id)
+                    await pipe.execute()
+                    return expired
+                except WatchError:
+                    continue
+
+    async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
+        """Block until a notification for client_id arrives (or timeout)."""
+        await self._ensure_listener()
+
+        waiter = self.waiters.register([client_id])
+        try:
+            # Registered before checking, so a message pushed in between still wakes us
+            if await self.redis.llen(self._queue_key(client_id)) > 0:
+                logger.debug(f"Messages already available for {client_id}")
+                return True
+
+            logger.debug(f"Waiting for new message for {client_id} (timeout: {timeout}s)")
+            if await self.waiters.wait(waiter, timeout) is None:
+                logger.debug(f"Timeout waiting for message for {client_id}")
+                return False
+            logger.debug(f"Wake-up notification received for {client_id}")
+            return True
+        finally:
+            self.waiters.unregister(waiter)
+
+    async def wait_for_any_messages(
+        self,
+        client_ids: List[str],
+        timeout: float,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, List[Message]]:
+        """Wait on several queues with one waiter, woken by the shared notification listener."""
+        await self._ensure_listener()
+        return await super().wait_for_any_messages(client_ids, timeout, max_messages=max_messages, max_bytes=max_bytes)
+
+    async def notify_new_message(self, client_id: str) -> None:
+        """Publish a wake-up so waiters in every process re-check the queue."""
+        await self.redis.publish(self._notify_channel(client_id), "1")
+
+    async def notify_new_messages(self, client_ids: Iterable[str]) -> None:
+        """Publish wake-ups for several clients in one pipelined round trip."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for client_id in client_ids:
+                pipe.publish(self._notify_channel(client_id), "1")
+            await pipe.execute()
+
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        return await self.redis.llen(self._queue_key(client_id))
+
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages (one pipelined round trip)."""
+        client_ids = sorted(await self.redis.smembers(self._clients_key))
+        if not client_ids:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for client_id in client_ids:
+                pipe.llen(self._queue_key(client_id))
+            lengths = await pipe.execute()
+
+        return {client_id: length for client_id, length in zip(client_ids, lengths) if length}
+
+    async def queue_depths_for(self, client_ids: Iterable[str]) -> Dict[str, int]:
+        """Queue depth of each of client_ids in one pipelined round trip."""
+        client_ids = list(client_ids)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for client_id in client_ids:
+                pipe.llen(self._queue_key(client_id))
+            lengths = await pipe.execute()
+        return dict(zip(client_ids, lengths))
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Subscribe to wake-ups and start the expiry sweeper."""
+        await self._ensure_listener()
+        if self.message_expiration_seconds != float('inf') and self._sweeper_task is None:
+            self._sweeper_task = asyncio.create_task(self._sweep_expired_messages())
+
+    async def close(self) -> None:
+        """Stop background tasks and release pooled connections."""
+        for task in (self._listener_task, self._sweeper_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener_task = None
+        self._sweeper_task = None
+
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.redis.aclose()
+
+    async def _ensure_listener(self) -> None:
+        if self._listener_task is not None:
+            return
+
+        # Concurrent first waiters must not each open a pubsub connection
+        async with self._listener_lock:
+            if self._listener_task is not None:
+                return
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.psubscribe(self._notify_channel("*"))
+            self._pubsub = pubsub
+            self._listener_task = asyncio.create_task(self._listen_for_notifications())
+
+    async def _listen_for_notifications(self) -> None:
+        prefix_length = len(self._notify_channel(""))
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis notification listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            if message and message.get("type") == "pmessage":
+                self.waiters.notify(message["channel"][prefix_length:])
+
+    async def _sweep_expired_messages(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await self.run_expiry_sweep()
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {e}")
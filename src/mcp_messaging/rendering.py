@@ -0,0 +1,87 @@
+"""Markdown rendering of message lists."""
+
+import io
+import time
+from typing import Dict, List, Optional, TextIO
+
+from .models import Message, format_age
+
+EMPTY_INBOX = "📭 **No messages** for you right now."
+CORRELATION_TEMPLATE = "🔗 **Correlation ID:** `{correlation_id}` (pass it as `correlation_id` when you reply)\n"
+
+
+class MarkdownRenderer:
+    """Renders messages as markdown, cheaply enough for very large drains.
+
+    - "now" is read once per render, not once per message
+    - relative times are bucketed (the displayed unit: minutes, hours or
+      days) and each bucket's label is formatted once and cached
+    - the per-sender "**From:** `id` (" prefix is built once and cached
+    - output is written message by message into a text stream (``render_to``)
+      instead of being assembled from a list of intermediate strings
+
+    The output is identical to joining the per-message blocks with newlines.
+    """
+
+    HEADER_TEMPLATE = "📬 **{count} message{plural} for `{recipient}`:**\n"
+    MAX_CACHED_SENDERS = 10_000
+
+    def __init__(self) -> None:
+        self._age_labels: Dict[int, str] = {}
+        self._sender_prefixes: Dict[str, str] = {}
+
+    @staticmethod
+    def age_bucket(age_seconds: float) -> int:
+        """Age in minutes, rounded down to the unit it is displayed in."""
+        minutes = int(age_seconds) // 60
+        if minutes < 60:
+            return max(minutes, 0)
+        if minutes < 1440:
+            return minutes - minutes % 60
+        return minutes - minutes % 1440
+
+    def age_label(self, age_seconds: float) -> str:
+        """Cached relative-time label for an age in seconds ("5 minutes ago")."""
+        bucket = self.age_bucket(age_seconds)
+        label = self._age_labels.get(bucket)
+        if label is None:
+            label = self._age_labels[bucket] = format_age(bucket * 60)
+        return label
+
+    def _sender_prefix(self, sender_id: str) -> str:
+        prefix = self._sender_prefixes.get(sender_id)
+        if prefix is None:
+            if len(self._sender_prefixes) >= self.MAX_CACHED_SENDERS:
+                self._sender_prefixes.clear()
+            prefix = self._sender_prefixes[sender_id] = f"\n**From:** `{sender_id}` ("
+        return prefix
+
+    def render_to(self, out: TextIO, recipient_id: str, messages: List[Message], now: Optional[float] = None) -> None:
+        """Write the markdown for messages into out.
+
+        now is a ``time.monotonic()`` value; defaults to the current time.
+        """
+        if not messages:
+            out.write(EMPTY_INBOX)
+            return
+
+        if now is None:
+            now = time.monotonic()
+        count = len(messages)
+        write = out.write
+        write(self.HEADER_TEMPLATE.format(count=count, plural="s" if count > 1 else "", recipient=recipient_id))
+
+        age_label = self.age_label
+        sender_prefix = self._sender_prefix
+        for msg in messages:
+            write(f"{sender_prefix(msg.from_client_id)}{age_label(now - msg.created_at)})\n{msg.content}\n")
+            if msg.correlation_id is not None:
+                write(CORRELATION_TEMPLATE.format(correlation_id=msg.correlation_id))
+
+    def render(self, recipient_id: str, messages: List[Message], now: Optional[float] = None) -> str:
+        """Render messages to a markdown string."""
+        if not messages:
+            return EMPTY_INBOX
+        buffer = io.StringIO()
+        self.render_to(buffer, recipient_id, messages, now)
+        return buffer.getvalue()
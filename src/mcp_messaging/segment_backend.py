@@ -0,0 +1,628 @@
+"""Append-only segment log queue backend with mmap reads and compaction."""
+
+import asyncio
+import bisect
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .expiry import ExpiryIndex
+from .limits import EnqueueResult, take_page
+from .models import Message
+from .message_logging import MessageLogger
+from .queue_backends import QueueBackend
+from .waiters import WaiterRegistry
+
+logger = logging.getLogger(__name__)
+message_log = MessageLogger(logger)
+
+# Record layout: header (payload length, crc32 of type + payload, type) + payload.
+# A zero length marks the end of the written part of a preallocated segment.
+HEADER = struct.Struct("<IIB")
+# MESSAGE / RELOCATED payload prefix: created_at, deadline (-1 = never),
+# recipient length, sender length, content length; then the three UTF-8 strings,
+# followed by the correlation ID (UTF-8) if the message has one. Records
+# written before correlation IDs were stored simply end after the content.
+MESSAGE_FIXED = struct.Struct("<ddHHI")
+# ACK payload prefix: recipient length, number of messages removed from the head
+ACK_FIXED = struct.Struct("<HI")
+
+RECORD_MESSAGE = 1
+RECORD_ACK = 2
+RECORD_RELOCATED = 3
+
+CHECKPOINT_MAGIC = b"MCPCKPT1"
+CHECKPOINT_HEADER = struct.Struct("<QI")      # log position, number of queues
+CHECKPOINT_QUEUE = struct.Struct("<HI")       # recipient length, number of entries
+CHECKPOINT_ENTRY = struct.Struct("<QId")      # position, record length, deadline
+
+# In-memory queue entry: (log position, record length, deadline or -1)
+Entry = Tuple[int, int, float]
+
+
+def _crc(record_type: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(bytes((record_type,))))
+
+
+class _Segment:
+    """One preallocated, memory-mapped segment file."""
+
+    def __init__(self, path: str, base: int, size: int, create: bool = False):
+        self.path = path
+        self.base = base
+        self.live_count = 0
+        self.live_bytes = 0
+        self.write_offset = 0
+
+        self._file = open(path, "w+b" if create else "r+b")
+        if create:
+            self._file.truncate(size)
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.mmap = mmap.mmap(self._file.fileno(), self.size)
+
+    @property
+    def end(self) -> int:
+        """Log position just past the last written record."""
+        return self.base + self.write_offset
+
+    def append(self, record: bytes) -> int:
+        offset = self.write_offset
+        self.mmap[offset:offset + len(record)] = record
+        self.write_offset += len(record)
+        return self.base + offset
+
+    def scan(self, start_offset: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield (offset, record type, payload) up to the first empty or torn record."""
+        offset = start_offset
+        while offset + HEADER.size <= self.size:
+            length, crc, record_type = HEADER.unpack_from(self.mmap, offset)
+            end = offset + HEADER.size + length
+            if length == 0 or end > self.size:
+                break
+            payload = self.mmap[offset + HEADER.size:end]
+            if _crc(record_type, payload) != crc:
+                break
+            yield offset, record_type, payload
+            offset = end
+        self.write_offset = offset
+
+    def close(self) -> None:
+        self.mmap.close()
+        self._file.close()
+
+
+class SegmentLogQueueBackend(QueueBackend):
+    """File-backed queue backend built on an append-only segment log.
+
+    Every sent message is appended to the active segment; each recipient's
+    queue in memory is only a deque of ``(position, length, deadline)``
+    entries, and ``get_messages`` decodes records straight out of the
+    memory-mapped segments. Removing messages (pop or expiry) appends a small
+    ACK record saying how many entries left the head of a queue.
+
+    Recovery loads the latest checkpoint (a binary snapshot of the in-memory
+    entries plus the log position it covers) and replays only the records
+    written after it, so restart time depends on the log tail rather than on
+    the number of queued messages.
+
+    Background maintenance flushes dirty pages, writes checkpoints, relocates
+    the few live records out of mostly-dead sealed segments, and deletes
+    segments that hold nothing live and are covered by a checkpoint.
+
+    Deadlines are wall-clock (``time.time()``) so they survive restarts.
+    """
+
+    emits_queue_changes = True
+
+    def __init__(
+        self,
+        directory: str = "mcp_segments",
+        message_expiration_seconds: float = float('inf'),
+        segment_bytes: int = 64 * 1024 * 1024,
+        flush_interval_seconds: float = 0.05,
+        checkpoint_interval_seconds: float = 30.0,
+        compaction_live_ratio: float = 0.25,
+        sweep_interval_seconds: float = 1.0,
+    ):
+        self.directory = directory
+        self.message_expiration_seconds = message_expiration_seconds
+        self.segment_bytes = segment_bytes
+        self.flush_interval_seconds = flush_interval_seconds
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self.compaction_live_ratio = compaction_live_ratio
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self.queues: Dict[str, Deque[Entry]] = {}
+        self.waiters = WaiterRegistry()
+        # Deadlines are stored in the log, so they are wall-clock, not monotonic
+        self.expiry_index = ExpiryIndex(clock=time.time)
+        # Bumped on every queue change, see stats_version
+        self.version = 0
+        self.segments: List[_Segment] = []
+        self._segment_bases: List[int] = []
+        self._checkpoint_position = 0
+        # Queue version the last checkpoint covers; maintenance skips the checkpoint when unchanged
+        self._checkpoint_version = 0
+        self._dirty = False
+        self._tasks: List[asyncio.Task] = []
+        # Flushes and checkpoint writes run here, one at a time, off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-log")
+        self._pending_io: Optional[asyncio.Future] = None
+        # Recovery happens in start(), so a backend built but never started leaves the log alone
+        self._started = False
+
+    # Paths and segment lookup
+
+    @property
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.directory, "checkpoint")
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}.seg")
+
+    @property
+    def _active(self) -> _Segment:
+        return self.segments[-1]
+
+    def _segment_for(self, position: int) -> _Segment:
+        return self.segments[bisect.bisect_right(self._segment_bases, position) - 1]
+
+    def _roll_segment(self, min_size: int) -> None:
+        base = self._active.end if self.segments else self._checkpoint_position
+        segment = _Segment(self._segment_path(base), base, max(self.segment_bytes, min_size), create=True)
+        self.segments.append(segment)
+        self._segment_bases.append(base)
+        logger.debug(f"Rolled new segment at position {base}")
+
+    # Record encoding
+
+    @staticmethod
+    def _frame(record_type: int, payload: bytes) -> bytes:
+        return HEADER.pack(len(payload), _crc(record_type, payload), record_type) + payload
+
+    @staticmethod
+    def _encode_message(recipient_id: str, message: Message, deadline: float, record_type: int = RECORD_MESSAGE) -> bytes:
+        recipient = recipient_id.encode()
+        sender = message.from_client_id.encode()
+        content = message.content.encode()
+        correlation_id = message.correlation_id.encode() if message.correlation_id else b""
+        payload = b"".join((
+            MESSAGE_FIXED.pack(message.wall_time, deadline, len(recipient), len(sender), len(content)),
+            recipient, sender, content, correlation_id,
+        ))
+        return SegmentLogQueueBackend._frame(record_type, payload)
+
+    @staticmethod
+    def _decode_message(payload) -> Tuple[str, Message, float]:
+        created_at, deadline, recipient_len, sender_len, content_len = MESSAGE_FIXED.unpack_from(payload, 0)
+        start = MESSAGE_FIXED.size
+        recipient = bytes(payload[start:start + recipient_len]).decode()
+        start += recipient_len
+        sender = bytes(payload[start:start + sender_len]).decode()
+        start += sender_len
+        content = bytes(payload[start:start + content_len]).decode()
+        start += content_len
+        correlation_id = bytes(payload[start:]).decode() or None
+        message = Message(from_client_id=sender, content=content, wall_time=created_at, correlation_id=correlation_id)
+        return recipient, message, deadline
+
+    def _append(self, record: bytes) -> Tuple[int, _Segment]:
+        if not self.segments or self._active.write_offset + len(record) + HEADER.size > self._active.size:
+            self._roll_segment(len(record) + HEADER.size)
+        segment = self._active
+        self._dirty = True
+        return segment.append(record), segment
+
+    def _read(self, entry: Entry) -> Message:
+        position, length, _ = entry
+        segment = self._segment_for(position)
+        offset = position - segment.base + HEADER.size
+        _, message, _ = self._decode_message(memoryview(segment.mmap)[offset:offset + length - HEADER.size])
+        return message
+
+    def _track(self, entry: Entry, delta: int) -> None:
+        segment = self._segment_for(entry[0])
+        segment.live_count += delta
+        segment.live_bytes += delta * entry[1]
+
+    # Queue mutation
+
+    def _enqueue(self, recipient_id: str, entry: Entry) -> None:
+        self.queues.setdefault(recipient_id, deque()).append(entry)
+        self._track(entry, 1)
+        self._changed(recipient_id)
+        if entry[2] >= 0:
+            self.expiry_index.schedule(recipient_id, entry[2])
+
+    def _dequeue(self, recipient_id: str, count: int) -> List[Entry]:
+        queue = self.queues.get(recipient_id)
+        if not queue:
+            return []
+        removed = [queue.popleft() for _ in range(min(count, len(queue)))]
+        for entry in removed:
+            self._track(entry, -1)
+        self._changed(recipient_id)
+        if not queue:
+            del self.queues[recipient_id]
+        return removed
+
+    def _changed(self, recipient_id: str) -> None:
+        self.version += 1
+        if self.change_listener is not None:
+            self.change_listener(recipient_id)
+
+    def _append_ack(self, recipient_id: str, count: int) -> None:
+        recipient = recipient_id.encode()
+        self._append(self._frame(RECORD_ACK, ACK_FIXED.pack(len(recipient), count) + recipient))
+
+    # QueueBackend interface
+
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Append message to the log and index it in the recipient's queue."""
+        await self.start()
+        deadline = -1.0
+        if self.message_expiration_seconds != float('inf'):
+            deadline = time.time() + self.message_expiration_seconds
+
+        record = self._encode_message(recipient_id, message, deadline)
+        position, _ = self._append(record)
+        self._enqueue(recipient_id, (position, len(record), deadline))
+
+        message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return EnqueueResult()
+
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Append the whole batch to the log; the background flusher syncs it in one pass."""
+        await self.start()
+        deadline = -1.0
+        if self.message_expiration_seconds != float('inf'):
+            deadline = time.time() + self.message_expiration_seconds
+
+        for recipient_id, message in batch:
+            record = self._encode_message(recipient_id, message, deadline)
+            position, _ = self._append(record)
+            self._enqueue(recipient_id, (position, len(record), deadline))
+            message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return [EnqueueResult() for _ in batch]
+
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Decode one page of messages from the mapped segments (and optionally ack them)."""
+        await self.start()
+        queue = self.queues.get(client_id)
+        if not queue:
+            return []
+
+        messages = take_page((self._read(entry) for entry in queue), max_messages, max_bytes)
+
+        if pop:
+            self._dequeue(client_id, len(messages))
+            self._append_ack(client_id, len(messages))
+            self.expiry_index.consume(client_id, len(messages))
+            if message_log.enabled:
+                for msg in messages:
+                    message_log.log("retrieved", msg.from_client_id, client_id, msg.content)
+            logger.info(f"Popped {len(messages)} messages for {client_id}")
+        else:
+            logger.debug(f"Peeked at {len(messages)} messages for {client_id}")
+
+        return messages
+
+    async def cleanup_expired_messages(self) -> int:
+        """Ack the expired head of each queue found through the expiry index."""
+        await self.start()
+        removed = 0
+        for recipient_id, count in self.expiry_index.pop_expired().items():
+            expired = self._dequeue(recipient_id, count)
+            if expired:
+                self._append_ack(recipient_id, len(expired))
+                removed += len(expired)
+                logger.info(f"Cleaned up {len(expired)} expired messages for {recipient_id}")
+        return removed
+
+    async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
+        """Block until new message arrives, but check existing messages first."""
+        waiter = self.waiters.register([client_id])
+        try:
+            # Registered before checking, so an arrival in between still wakes us
+            if await self.queue_depth(client_id) > 0:
+                logger.debug(f"Messages already available for {client_id}")
+                return True
+
+            logger.debug(f"Waiting for new message for {client_id} (timeout: {timeout}s)")
+            if await self.waiters.wait(waiter, timeout) is None:
+                logger.debug(f"Timeout waiting for message for {client_id}")
+                return False
+            logger.debug(f"Wake-up notification received for {client_id}")
+            return True
+        finally:
+            self.waiters.unregister(waiter)
+
+    async def notify_new_message(self, client_id: str) -> None:
+        """Wake up every blocked call waiting on client_id."""
+        woken = self.waiters.notify(client_id)
+        if woken:
+            logger.debug(f"Notified {woken} blocked calls for {client_id}")
+
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        await self.start()
+        return len(self.queues.get(client_id, ()))
+
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages."""
+        await self.start()
+        return {client_id: len(queue) for client_id, queue in self.queues.items()}
+
+    def stats_version(self) -> Optional[str]:
+        """Queue change counter plus waiter count."""
+        return f"{self.version}.{len(self.waiters)}"
+
+    # Durability: flush, checkpoint, recovery
+
+    def flush(self) -> None:
+        """Flush dirty pages of every segment to disk."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        for segment in self.segments:
+            segment.mmap.flush()
+
+    def checkpoint(self) -> None:
+        """Persist the in-memory index so recovery only replays later records."""
+        self._dirty = False
+        version = self.version
+        position, queues = self._checkpoint_snapshot()
+        self._write_checkpoint(position, queues, list(self.segments))
+        self._checkpoint_written(position, version)
+
+    def _checkpoint_snapshot(self) -> Tuple[int, List[Tuple[str, List[Entry]]]]:
+        """Log position and queue entries a checkpoint taken now covers."""
+        position = self._active.end if self.segments else self._checkpoint_position
+        return position, [(recipient_id, list(queue)) for recipient_id, queue in self.queues.items()]
+
+    def _write_checkpoint(self, position: int, queues: List[Tuple[str, List[Entry]]], segments: List[_Segment]) -> None:
+        """Flush segments, then write and fsync the checkpoint file. Touches no shared state."""
+        for segment in segments:
+            segment.mmap.flush()
+
+        parts = [CHECKPOINT_MAGIC, CHECKPOINT_HEADER.pack(position, len(queues))]
+        for recipient_id, queue in queues:
+            recipient = recipient_id.encode()
+            parts.append(CHECKPOINT_QUEUE.pack(len(recipient), len(queue)))
+            parts.append(recipient)
+            parts.extend(CHECKPOINT_ENTRY.pack(*entry) for entry in queue)
+
+        tmp_path = self._checkpoint_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(parts))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._checkpoint_path)
+
+    def _checkpoint_written(self, position: int, version: int) -> None:
+        self._checkpoint_position = position
+        self._checkpoint_version = version
+        logger.debug(f"Wrote checkpoint at log position {position}")
+
+    def _load_checkpoint(self) -> None:
+        if not os.path.exists(self._checkpoint_path):
+            return
+
+        with open(self._checkpoint_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(CHECKPOINT_MAGIC):
+            raise ValueError(f"Corrupt checkpoint file: {self._checkpoint_path}")
+
+        offset = len(CHECKPOINT_MAGIC)
+        position, queue_count = CHECKPOINT_HEADER.unpack_from(data, offset)
+        offset += CHECKPOINT_HEADER.size
+        for _ in range(queue_count):
+            recipient_len, entry_count = CHECKPOINT_QUEUE.unpack_from(data, offset)
+            offset += CHECKPOINT_QUEUE.size
+            recipient_id = data[offset:offset + recipient_len].decode()
+            offset += recipient_len
+            end = offset + entry_count * CHECKPOINT_ENTRY.size
+            self.queues[recipient_id] = deque(CHECKPOINT_ENTRY.iter_unpack(data[offset:end]))
+            offset = end
+        self._checkpoint_position = position
+
+    def _recover(self) -> None:
+        """Load the checkpoint, then replay the log tail written after it."""
+        self._load_checkpoint()
+
+        bases = sorted(
+            int(name[:-len(".seg")]) for name in os.listdir(self.directory) if name.endswith(".seg")
+        )
+        for base in bases:
+            path = self._segment_path(base)
+            if os.path.getsize(path) == 0:
+                # A crash right after rolling can leave a segment not yet preallocated; it holds nothing
+                logger.warning(f"Removing empty segment file {path}")
+                os.remove(path)
+                continue
+            segment = _Segment(path, base, 0)
+            self.segments.append(segment)
+            self._segment_bases.append(base)
+
+        replayed = 0
+        for index, segment in enumerate(self.segments):
+            next_base = self._segment_bases[index + 1] if index + 1 < len(self.segments) else None
+            if next_base is not None and next_base <= self._checkpoint_position:
+                segment.write_offset = next_base - segment.base  # Fully covered by the checkpoint
+                continue
+            start = max(0, self._checkpoint_position - segment.base)
+            for offset, record_type, payload in segment.scan(start):
+                replayed += 1
+                if record_type == RECORD_MESSAGE:
+                    recipient_id, _, deadline = self._decode_message(payload)
+                    length = HEADER.size + len(payload)
+                    self.queues.setdefault(recipient_id, deque()).append((segment.base + offset, length, deadline))
+                elif record_type == RECORD_ACK:
+                    recipient_len, count = ACK_FIXED.unpack_from(payload, 0)
+                    recipient_id = bytes(payload[ACK_FIXED.size:ACK_FIXED.size + recipient_len]).decode()
+                    queue = self.queues.get(recipient_id)
+                    for _ in range(min(count, len(queue) if queue else 0)):
+                        queue.popleft()
+                    if queue is not None and not queue:
+                        del self.queues[recipient_id]
+                # RELOCATED copies are only referenced once a checkpoint covers them
+
+        if self.segments:
+            # Discard whatever a crash left after the last valid record
+            active = self._active
+            active.mmap[active.write_offset:] = bytes(active.size - active.write_offset)
+
+        for recipient_id, queue in self.queues.items():
+            for entry in queue:
+                self._track(entry, 1)
+                if entry[2] >= 0:
+                    self.expiry_index.schedule(recipient_id, entry[2])
+
+        if replayed:
+            # The checkpoint is behind the log, so the next maintenance pass rewrites it
+            self._checkpoint_version = -1
+            logger.info(f"Replayed {replayed} log records after checkpoint")
+
+    # Compaction
+
+    async def compact(self) -> int:
+        """Reclaim space held by sealed segments. Returns the number of segments deleted."""
+        await self.start()
+        self._relocate()
+        # Deleting needs a checkpoint that no longer references the old segments
+        await self._checkpoint_async()
+        return self._delete_covered_segments()
+
+    def _relocate(self) -> None:
+        """Copy the live records of mostly-dead sealed segments to the active one."""
+        sealed = self.segments[:-1]
+        victims = {
+            segment.base for segment in sealed
+            if segment.live_count and segment.live_bytes < self.compaction_live_ratio * segment.write_offset
+        }
+        if not victims:
+            return
+
+        relocated = 0
+        for recipient_id, queue in self.queues.items():
+            if not any(self._segment_for(entry[0]).base in victims for entry in queue):
+                continue
+            new_queue: Deque[Entry] = deque()
+            for entry in queue:
+                if self._segment_for(entry[0]).base in victims:
+                    message = self._read(entry)
+                    record = self._encode_message(recipient_id, message, entry[2], RECORD_RELOCATED)
+                    position, _ = self._append(record)
+                    self._track(entry, -1)
+                    entry = (position, len(record), entry[2])
+                    self._track(entry, 1)
+                    relocated += 1
+                new_queue.append(entry)
+            self.queues[recipient_id] = new_queue
+        logger.info(f"Relocated {relocated} live records out of {len(victims)} segments")
+
+    def _delete_covered_segments(self) -> int:
+        """Delete sealed segments with nothing live that the checkpoint covers."""
+        deleted = 0
+        for segment in list(self.segments[:-1]):
+            if segment.live_count == 0 and segment.end <= self._checkpoint_position:
+                index = self.segments.index(segment)
+                del self.segments[index]
+                del self._segment_bases[index]
+                segment.close()
+                os.remove(segment.path)
+                deleted += 1
+        if deleted:
+            logger.info(f"Compaction deleted {deleted} segments")
+        return deleted
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Recover the log, then start the flusher, checkpoint/compaction and expiry tasks."""
+        if self._started:
+            return
+        self._started = True
+        os.makedirs(self.directory, exist_ok=True)
+        self._recover()
+        logger.info(
+            f"Opened SegmentLogQueueBackend ({self.directory}, {len(self.segments)} segments, "
+            f"{sum(len(q) for q in self.queues.values())} queued messages)"
+        )
+        self._tasks.append(asyncio.create_task(self._every(self.flush_interval_seconds, self._flush_async)))
+        self._tasks.append(asyncio.create_task(self._every(self.checkpoint_interval_seconds, self._compact_async)))
+        if self.message_expiration_seconds != float('inf'):
+            self._tasks.append(asyncio.create_task(self._every(self.sweep_interval_seconds, self.run_expiry_sweep)))
+
+    async def close(self) -> None:
+        """Stop background tasks, checkpoint and unmap all segments."""
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._pending_io is not None:
+            # A cancelled task's flush or checkpoint write may still be running on the executor
+            try:
+                await self._pending_io
+            except Exception as e:
+                logger.error(f"Segment I/O failed during shutdown: {e}")
+            self._pending_io = None
+
+        if self.segments:
+            await self._checkpoint_async()
+        self._executor.shutdown()
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self._segment_bases = []
+
+    async def _run_io(self, fn, *args):
+        """Run blocking file I/O on the executor; close() waits for it even if the caller is cancelled."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        # The executor has one worker, so the latest job is also the last to finish
+        self._pending_io = future
+        return await asyncio.shield(future)
+
+    async def _flush_async(self) -> None:
+        if self._dirty:
+            self._dirty = False
+            segments = list(self.segments)
+            await self._run_io(lambda: [s.mmap.flush() for s in segments])
+
+    async def _checkpoint_async(self) -> None:
+        """checkpoint() with the file write on the executor."""
+        # Snapshot the index on the loop, with no await in between, so it matches the log position
+        self._dirty = False
+        version = self.version
+        position, queues = self._checkpoint_snapshot()
+        await self._run_io(self._write_checkpoint, position, queues, list(self.segments))
+        self._checkpoint_written(position, version)
+
+    async def _compact_async(self) -> None:
+        """compact(), skipped if no queue changed since the last checkpoint."""
+        if self.version == self._checkpoint_version:
+            return
+        await self.compact()
+
+    async def _every(self, interval: float, action) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await action()
+            except Exception as e:
+                logger.error(f"Segment log maintenance failed: {e}")
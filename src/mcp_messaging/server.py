@@ -2,71 +2,175 @@
 
 import argparse
 import asyncio
+import hashlib
 import json
 import logging
+import math
 import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
-import httpx
 import uvicorn
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.streamable_http import GET_STREAM_KEY, MCP_SESSION_ID_HEADER
+from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 # Removed pydantic BaseModel - no longer needed
 
-from .models import Message, format_relative_time
+from . import metrics
+from .admission import WaitAdmission
+from .clients import ClientRegistry
+from .cluster import ClusterError, ClusterQueueBackend
+from .disconnect import DisconnectMiddleware, cancel_on_disconnect, disconnect_event
+from .events import SessionEventBus, format_sse
+from .limits import EnqueueResult, QueueLimits
+from .message_logging import MessageLogger, configure_logging
+from .models import Message
+from .push import PushDelivery, PushSender
 from .queue_backends import QueueBackend, InMemoryQueueBackend
+from .ratelimit import SendRateLimits
+from .rendering import MarkdownRenderer
+from .waiters import ReplyRegistry, ReplyWaiter
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging with a more detailed format
-logging.basicConfig(
-    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
-    format="%(asctime)s - %(name)s - %(levelname)s\n%(message)s\n"  # Added newline for better readability
+# Configure logging with a more detailed format; log I/O runs on a background
+# thread unless LOG_ASYNC=false
+configure_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    log_format=os.getenv("LOG_FORMAT", "text"),
+    async_handler=os.getenv("LOG_ASYNC", "true").lower() != "false",
 )
 logger = logging.getLogger(__name__)
+message_log = MessageLogger(logger)
 
 # Default configuration values
 DEFAULT_CONFIG = {
     "max_tokens": 4096,
     "max_iterations": 10,
     "timeouts": {
-        "send_message_and_wait": 180.0,  # 3 minutes
-        "get_messages": 60.0,  # 1 minute
-        "message_expiration": 300.0  # 5 minutes
+        "send_message_and_wait": float(os.getenv("SEND_AND_WAIT_TIMEOUT_SECONDS", "180")),  # 3 minutes
+        "get_messages": float(os.getenv("GET_MESSAGES_TIMEOUT_SECONDS", "60")),  # 1 minute
+        "push_wait": float(os.getenv("PUSH_WAIT_SECONDS", "300")),  # how long one push waiter blocks before re-arming
+        "message_expiration": float(os.getenv("MESSAGE_EXPIRATION_SECONDS", "300"))  # 5 minutes
     }
 }
 
-# Global client tracking (in-memory)
-client_activity_tracking: Dict[str, Dict] = {}
+# Environment variables each timeout is read from (passed on to worker processes)
+TIMEOUT_ENV_VARS = {
+    "send_message_and_wait": "SEND_AND_WAIT_TIMEOUT_SECONDS",
+    "get_messages": "GET_MESSAGES_TIMEOUT_SECONDS",
+    "push_wait": "PUSH_WAIT_SECONDS",
+    "message_expiration": "MESSAGE_EXPIRATION_SECONDS",
+}
+
+
+def create_queue_backend(
+    name: str,
+    redis_url: Optional[str] = None,
+    sqlite_path: Optional[str] = None,
+    segment_dir: Optional[str] = None,
+    broker_socket: Optional[str] = None,
+) -> QueueBackend:
+    """Create the queue backend selected with --queue-backend / QUEUE_BACKEND."""
+    expiration = DEFAULT_CONFIG["timeouts"]["message_expiration"]
+    
+    if name == "memory":
+        return InMemoryQueueBackend(message_expiration_seconds=expiration, limits=QueueLimits.from_env())
+    
+    if name == "redis":
+        from .redis_backend import RedisQueueBackend
+        return RedisQueueBackend(
+            url=redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            message_expiration_seconds=expiration,
+            key_prefix=os.getenv("REDIS_KEY_PREFIX", "mcp"),
+        )
+    
+    if name == "sqlite":
+        from .sqlite_backend import SqliteQueueBackend
+        return SqliteQueueBackend(
+            path=sqlite_path or os.getenv("SQLITE_PATH", "mcp_messages.db"),
+            message_expiration_seconds=expiration,
+        )
+    
+    if name == "segment":
+        from .segment_backend import SegmentLogQueueBackend
+        return SegmentLogQueueBackend(
+            directory=segment_dir or os.getenv("SEGMENT_DIR", "mcp_segments"),
+            message_expiration_seconds=expiration,
+        )
+    
+    if name == "broker":
+        from .broker import BrokerQueueBackend
+        return BrokerQueueBackend(path=broker_socket or os.getenv("BROKER_SOCKET", "mcp_broker.sock"))
+    
+    raise ValueError(f"Unknown queue backend: {name}")
+
+def is_failed_send(result: str) -> bool:
+    """True for send_message results that mean the message was not queued."""
+    return result.startswith(("❌", "⚠️", "⏳"))
 
-def update_client_activity(recipients_config: Dict, queue_backend: Optional[QueueBackend] = None) -> None:
+def update_client_activity(recipients_config: Dict) -> None:
     """Update client activity tracking from required recipients_config."""
     client_id = recipients_config.get("my_sender_id")
     if not client_id:
         return
     
-    # Extract client info from config
-    client_info = {
-        "client_id": client_id,
-        "name": recipients_config.get("my_name", client_id),
-        "description": recipients_config.get("my_description", ""),
-        "clientType": recipients_config.get("clientType", "agent by IDE"),
-        "last_seen": datetime.now().isoformat(),
-        "messages_in_queue": 0  # Will be updated below
-    }
+    messaging_server.clients.touch(
+        client_id,
+        name=recipients_config.get("my_name", client_id),
+        description=recipients_config.get("my_description", ""),
+        client_type=recipients_config.get("clientType", "agent by IDE"),
+    )
+
+async def unless_disconnected(call: Awaitable[str], ctx: Optional[Context]) -> str:
+    """Run a blocking tool call, cancelling it as soon as the HTTP client behind ctx disconnects.
     
-    # Update messages in queue count
-    if queue_backend and hasattr(queue_backend, 'queues'):
-        queue_messages = queue_backend.queues.get(client_id, [])
-        client_info["messages_in_queue"] = len(queue_messages)
+    Cancellation releases the call's waiters (and requeues anything handed
+    to them) right away instead of when its timeout runs out. An owner node
+    that cannot be reached in clustered mode is reported as an error result.
+    """
+    disconnected = None
+    if ctx is not None:
+        try:
+            disconnected = disconnect_event(ctx.request_context.request)
+        except ValueError:
+            # Not called from an MCP request
+            pass
+    
+    try:
+        result = await cancel_on_disconnect(call, disconnected)
+    except ClusterError as e:
+        logger.error(f"Blocking call failed: {e}")
+        return "❌ **Error**: The cluster node that owns this queue could not be reached. Try again shortly."
+    if result is None:
+        logger.debug("Client disconnected during a blocking call, wait cancelled")
+        return "🔌 **Cancelled**: the client disconnected while waiting"
+    return result
+
+def push_stream_open(session_id: Optional[str]) -> bool:
+    """Whether a notification sent to the MCP session now would reach its client.
     
-    # Store in global tracking
-    client_activity_tracking[client_id] = client_info
+    The streamable HTTP transport writes server-initiated notifications to
+    the session's standalone GET stream and silently drops them while none
+    is open, unless an event store keeps them for the client to replay.
+    """
+    manager = mcp.session_manager
+    if manager.event_store is not None:
+        return True
+    transport = manager._server_instances.get(session_id)
+    return transport is not None and GET_STREAM_KEY in transport._request_streams
 
 # Configuration management removed - now handled by clients
 
@@ -76,16 +180,6 @@ def update_client_activity(recipients_config: Dict, queue_backend: Optional[Queu
 # Callback functionality removed - unified client approach
 
 
-def format_message_log(action: str, sender_id: str, recipient_id: str, message: str) -> str:
-    """Format a message log entry with complete details."""
-    return f"""
-MESSAGE {action.upper()}
-FROM: {sender_id}
-TO: {recipient_id}
-CONTENT:
-{message}
-{"=" * 80}"""
-
 # Client type detection removed - all clients treated uniformly
 
 # Removed format_ide_client_identity - no longer needed with unified approach
@@ -95,17 +189,78 @@ CONTENT:
 class MessagingServer:
     """Core stateless messaging server for client-to-client communication."""
     
-    def __init__(self, queue_backend: Optional[QueueBackend] = None) -> None:
-        self.queue_backend = queue_backend or InMemoryQueueBackend()
-        logger.info(f"MessagingServer initialized with {type(self.queue_backend).__name__}")
+    def __init__(
+        self,
+        queue_backend: Optional[QueueBackend] = None,
+        clients: Optional[ClientRegistry] = None,
+        admission: Optional[WaitAdmission] = None,
+        rate_limits: Optional[SendRateLimits] = None,
+        backend_factory: Optional[Callable[[], QueueBackend]] = None,
+    ) -> None:
+        self._queue_backend = queue_backend
+        # Builds the queue backend on first use, unless one is assigned before then
+        self._backend_factory = backend_factory or InMemoryQueueBackend
+        # Recently active clients, for session stats
+        self.clients = clients if clients is not None else ClientRegistry()
+        # Caps on parked blocking calls (unlimited by default)
+        self.admission = admission if admission is not None else WaitAdmission()
+        # Token buckets per sender and per recipient (unlimited by default)
+        self.rate_limits = rate_limits if rate_limits is not None else SendRateLimits()
+        self.renderer = MarkdownRenderer()
+        # Topic name -> subscribed client IDs (dict as an ordered set)
+        self.topics: Dict[str, Dict[str, None]] = {}
+        # Clients receiving messages as notifications (stateful mode)
+        self.push = PushDelivery(self, wait_seconds=DEFAULT_CONFIG["timeouts"]["push_wait"])
+        logger.info("MessagingServer initialized")
+    
+    @property
+    def queue_backend(self) -> QueueBackend:
+        if self._queue_backend is None:
+            self._queue_backend = self._backend_factory()
+            logger.info(f"MessagingServer using {type(self._queue_backend).__name__}")
+        return self._queue_backend
     
-    async def send_message(self, sender_id: str, recipient_id: str, content: str) -> str:
-        """Send a message from sender to recipient."""
+    @queue_backend.setter
+    def queue_backend(self, backend: QueueBackend) -> None:
+        self._queue_backend = backend
+    
+    async def start(self) -> None:
+        """Start queue backend background work (expiry sweeper etc.)."""
+        await self.queue_backend.start()
+    
+    async def close(self) -> None:
+        """Stop push delivery and queue backend background work."""
+        await self.push.close()
+        await self.queue_backend.close()
+    
+    async def send_message(
+        self, sender_id: str, recipient_id: str, content: str, correlation_id: Optional[str] = None
+    ) -> str:
+        """Send a message from sender to recipient, tagged with an optional correlation ID."""
+        # Validate inputs
+        error = self._validate_send(sender_id, recipient_id, content) or self._rate_limited(sender_id, recipient_id)
+        if error:
+            return error
+        
+        # Create message
+        message = Message(from_client_id=sender_id, content=content, correlation_id=correlation_id)
         
-        # Cleanup expired messages before processing
-        await self.queue_backend.cleanup_expired_messages()
+        # Send message via queue backend
+        result = await self.queue_backend.send_message(recipient_id, message)
+        self._count_sends([result])
         
-        # Validate inputs
+        if result.accepted:
+            # Notify any blocked calls waiting for this recipient
+            await self.queue_backend.notify_new_message(recipient_id)
+            
+            # Log complete message details
+            message_log.log("sent", sender_id, recipient_id, content)
+        
+        return self._describe_send(recipient_id, result)
+    
+    @staticmethod
+    def _validate_send(sender_id: str, recipient_id: str, content: str) -> Optional[str]:
+        """Error/warning text for an invalid send, or None."""
         if not sender_id.strip():
             return "❌ **Error**: Sender ID cannot be empty"
         
@@ -115,53 +270,203 @@ class MessagingServer:
         if not content.strip():
             return "⚠️ **Warning**: Sending empty message"
         
-        # Create message
-        message = Message(
-            from_client_id=sender_id,
-            content=content,
-            timestamp=datetime.now()
-        )
+        return None
+    
+    @staticmethod
+    def _wait_timeout(call: str, requested: Optional[float]) -> float:
+        """How long call may block: its configured timeout, or the client's deadline if that is sooner."""
+        timeout = DEFAULT_CONFIG["timeouts"][call]
+        if requested is None:
+            return timeout
+        return max(0.0, min(timeout, requested))
+    
+    def _admit_wait(self, call: str, client_ids: List[str]) -> Optional[str]:
+        """Take a blocking-call slot for client_ids; the busy response if a waiter cap is full.
         
-        # Send message via queue backend
-        await self.queue_backend.send_message(recipient_id, message)
+        When None is returned the slot must be given back with ``admission.release``.
+        """
+        refused = self.admission.try_acquire(client_ids)
+        if refused is None:
+            return None
         
-        # Notify any blocked calls waiting for this recipient
-        await self.queue_backend.notify_new_message(recipient_id)
+        metrics.WAITS_REJECTED.labels(call, refused).inc()
+        retry_after = self.admission.retry_after()
+        logger.info(f"Refused {call} for {', '.join(client_ids)}: {refused} waiter cap reached")
+        if refused == "global":
+            reason = "the server has too many waiting calls"
+        else:
+            reason = f"too many waiting calls for `{'`, `'.join(client_ids)}`"
+        return f"⏳ **Busy**: {reason}. Retry after {retry_after} ms."
+    
+    def _rate_limited(self, sender_id: Optional[str], recipient_id: Optional[str]) -> Optional[str]:
+        """Take a send from the sender's and recipient's token buckets; the refusal if either is empty.
         
-        # Log complete message details
-        logger.info(format_message_log("sent", sender_id, recipient_id, content))
+        Pass None for an ID whose bucket should not be charged.
+        """
+        limit = self.rate_limits.acquire(sender_id, recipient_id)
+        if limit is None:
+            return None
         
+        metrics.SENDS_RATE_LIMITED.labels(limit).inc()
+        client_id = sender_id if limit == "sender" else recipient_id
+        retry_after = max(1, math.ceil(self.rate_limits.retry_after(limit, client_id) * 1000))
+        if limit == "sender":
+            return f"⏳ **Rate limited**: `{sender_id}` is sending faster than the server allows. Retry after {retry_after} ms."
+        return f"⏳ **Rate limited**: `{recipient_id}` is receiving messages faster than the server allows. Retry after {retry_after} ms."
+    
+    @staticmethod
+    def _count_sends(results: List[EnqueueResult]) -> None:
+        """Record enqueue outcomes in metrics."""
+        for result in results:
+            metrics.MESSAGES_SENT.labels(result.status).inc()
+    
+    async def _wait_for_messages(self, call: str, client_id: str, timeout: float, **page) -> List[Message]:
+        """Long-poll the backend for client_id, recording wait time and outcome for call."""
+        start = time.perf_counter()
+        messages = await self.queue_backend.wait_for_messages(client_id, timeout, **page)
+        outcome = "delivered" if messages else "timeout"
+        metrics.LONG_POLL_WAIT.labels(call, outcome).observe(time.perf_counter() - start)
+        return messages
+    
+    async def _restore_messages(self, client_id: str, messages: List[Message]) -> None:
+        """Put messages taken for client_id but not delivered back at the head of its queue."""
+        results = await self.queue_backend.restore_messages(client_id, messages)
+        lost = [result for result in results if not result.accepted]
+        if lost:
+            logger.error(f"Lost {len(lost)} undelivered message(s) for {client_id} that could not be requeued: {lost[0].reason}")
+    
+    async def _wait_for_reply(self, waiter: ReplyWaiter, timeout: float) -> Optional[Message]:
+        """Wait for the reply waiter was registered for, recording wait time and outcome."""
+        start = time.perf_counter()
+        reply = await ReplyRegistry.wait(waiter, timeout)
+        outcome = "delivered" if reply is not None else "timeout"
+        metrics.LONG_POLL_WAIT.labels("send_message_and_wait", outcome).observe(time.perf_counter() - start)
+        return reply
+    
+    @staticmethod
+    def _describe_send(recipient_id: str, result: EnqueueResult) -> str:
+        """Markdown result of one send, as returned by send_message."""
+        if not result.accepted:
+            return (
+                f"⏳ **Backpressure**: Message to `{recipient_id}` was not queued ({result.reason}). "
+                "Wait for the recipient to catch up and retry."
+            )
+        if result.status == "dropped_oldest":
+            return (
+                f"✅ **Message sent successfully** to `{recipient_id}`  \n"
+                f"⚠️ Recipient queue was full: {result.dropped} oldest message(s) dropped"
+            )
+        if result.status == "spilled":
+            return f"✅ **Message sent successfully** to `{recipient_id}` (queue full, stored on disk)"
         return f"✅ **Message sent successfully** to `{recipient_id}`"
     
-    async def send_message_and_wait(self, sender_id: str, recipient_id: str, content: str) -> str:
-        """Send a message and wait for a response (blocking call)."""
-        # Use default timeout
-        timeout = DEFAULT_CONFIG["timeouts"]["send_message_and_wait"]
+    async def send_message_and_wait(
+        self,
+        sender_id: str,
+        recipient_id: str,
+        content: str,
+        correlation_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Send a message and wait for a response (blocking call).
+        
+        Where the backend routes replies (``QueueBackend.replies``), the
+        message carries correlation_id (a fresh one unless it continues an
+        earlier exchange) and only the reply - a message quoting that ID, or
+        an unquoted one from recipient_id - ends the wait; every other message
+        stays queued. Otherwise the wait ends with whatever arrives in the
+        sender's queue.
+        
+        timeout is the caller's own deadline in seconds; the wait never
+        exceeds the configured send_message_and_wait timeout.
+        """
+        if timeout is not None and timeout < 0:
+            return "❌ **Error**: timeout cannot be negative"
+        timeout = self._wait_timeout("send_message_and_wait", timeout)
         
+        # Turn the call away before sending anything if no waiter slot is free
+        busy = self._admit_wait("send_message_and_wait", [sender_id])
+        if busy:
+            return busy
+        try:
+            replies = self.queue_backend.replies
+            if replies is not None:
+                return await self._send_and_wait_for_reply(replies, sender_id, recipient_id, content, correlation_id, timeout)
+            return await self._send_and_wait_for_messages(sender_id, recipient_id, content, correlation_id, timeout)
+        finally:
+            self.admission.release([sender_id])
+    
+    async def _send_and_wait_for_messages(
+        self,
+        sender_id: str,
+        recipient_id: str,
+        content: str,
+        correlation_id: Optional[str],
+        timeout: float,
+    ) -> str:
+        """send_message_and_wait for backends without reply routing: any message for the sender ends the wait."""
         # First, send the message
-        send_result = await self.send_message(sender_id, recipient_id, content)
+        send_result = await self.send_message(sender_id, recipient_id, content, correlation_id)
         
         # If send failed, return the error
-        if send_result.startswith("❌") or send_result.startswith("⚠️"):
+        if is_failed_send(send_result):
             return send_result
         
         logger.info(f"Waiting for response to {sender_id} (timeout: {timeout}s)")
         
-        # Wait for a response to arrive in sender's queue
-        message_arrived = await self.queue_backend.wait_for_new_message(sender_id, timeout)
+        # Wait for a response to arrive in sender's queue (handed over directly when possible)
+        messages = await self._wait_for_messages("send_message_and_wait", sender_id, timeout)
         
-        if message_arrived:
-            # Get the response messages
-            messages = await self.queue_backend.get_messages(sender_id, pop=True)
-            if messages:
-                return self._format_messages_as_markdown(sender_id, messages)
-            else:
-                return "📭 **No response received** (queue was empty)"
+        if messages:
+            return self._format_messages_as_markdown(sender_id, messages)
         else:
             return f"⏰ **Timeout**: No response received within {timeout} seconds"
     
-    async def send_message_without_waiting(self, sender_id: str, recipients: List[str], messages: List[str]) -> str:
-        """Send messages (fire and forget) to multiple recipients and return any pending messages for sender."""
+    async def _send_and_wait_for_reply(
+        self,
+        replies: ReplyRegistry,
+        sender_id: str,
+        recipient_id: str,
+        content: str,
+        correlation_id: Optional[str],
+        timeout: float,
+    ) -> str:
+        """send_message_and_wait for backends that route replies to their waiting call."""
+        correlation_id = correlation_id or uuid.uuid4().hex[:16]
+        # Register before sending, so even an immediate reply finds the waiter
+        waiter = replies.register(sender_id, recipient_id, correlation_id)
+        try:
+            send_result = await self.send_message(sender_id, recipient_id, content, correlation_id)
+            if is_failed_send(send_result):
+                return send_result
+            
+            logger.info(f"Waiting for reply {correlation_id} to {sender_id} (timeout: {timeout}s)")
+            reply = await self._wait_for_reply(waiter, timeout)
+        except asyncio.CancelledError:
+            replies.unregister(waiter)
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The reply arrived just as the caller went away: keep it for get_messages
+                await self._restore_messages(sender_id, [waiter.future.result()])
+            raise
+        finally:
+            replies.unregister(waiter)
+        
+        if reply is None:
+            return f"⏰ **Timeout**: No response received within {timeout} seconds"
+        return self._format_messages_as_markdown(sender_id, [reply])
+    
+    async def send_message_without_waiting(
+        self,
+        sender_id: str,
+        recipients: List[str],
+        messages: List[str],
+        correlation_ids: Optional[List[Optional[str]]] = None,
+    ) -> str:
+        """Send messages (fire and forget) to multiple recipients and return any pending messages for sender.
+        
+        correlation_ids, if given, has one entry (or None) per message; a
+        message quoting a pending request's ID is delivered as its reply.
+        """
         # Validate inputs
         if not recipients:
             return "❌ **Error**: At least one recipient must be specified"
@@ -172,17 +477,37 @@ class MessagingServer:
         if len(messages) != len(recipients):
             return f"❌ **Error**: Number of messages ({len(messages)}) must match number of recipients ({len(recipients)})"
         
+        if correlation_ids is not None and len(correlation_ids) != len(messages):
+            return f"❌ **Error**: Number of correlation IDs ({len(correlation_ids)}) must match number of messages ({len(messages)})"
+        
         # Send messages to all recipients
         send_results = []
         failed_sends = []
         
-        for recipient_id, content in zip(recipients, messages):
-            send_result = await self.send_message(sender_id, recipient_id, content)
-            
-            if send_result.startswith("❌") or send_result.startswith("⚠️"):
-                failed_sends.append(f"  - **{recipient_id}**: {send_result}")
+        # Validate everything first, then hand the valid messages to the backend as one batch
+        batch = []
+        for recipient_id, content, correlation_id in zip(recipients, messages, correlation_ids or [None] * len(messages)):
+            error = self._validate_send(sender_id, recipient_id, content) or self._rate_limited(sender_id, recipient_id)
+            if error:
+                failed_sends.append(f"  - **{recipient_id}**: {error}")
             else:
+                batch.append((recipient_id, Message(from_client_id=sender_id, content=content, correlation_id=correlation_id)))
+        
+        results = await self.queue_backend.send_messages(batch)
+        self._count_sends(results)
+        
+        accepted = {}
+        for (recipient_id, message), result in zip(batch, results):
+            if result.accepted:
+                accepted[recipient_id] = None
                 send_results.append(f"  - **{recipient_id}**: ✅ Message sent")
+            else:
+                failed_sends.append(f"  - **{recipient_id}**: {self._describe_send(recipient_id, result)}")
+        
+        # One wake-up per distinct recipient, however many messages it got
+        if accepted:
+            await self.queue_backend.notify_new_messages(accepted)
+            logger.info(f"Sent {len(send_results)} messages from {sender_id} to {len(accepted)} recipients")
         
         # Format results
         total_recipients = len(recipients)
@@ -200,7 +525,6 @@ class MessagingServer:
             result_parts.extend(["**❌ Failed sends:**"] + failed_sends + [""])
         
         # Get any pending messages for the sender (non-blocking)
-        await self.queue_backend.cleanup_expired_messages()
         pending_messages_list = await self.queue_backend.get_messages(sender_id, pop=True)
         
         if pending_messages_list:
@@ -213,80 +537,253 @@ class MessagingServer:
         
         return "\n".join(result_parts)
     
-    async def get_messages(self, sender_id: str) -> str:
-        """Get and remove all messages for a sender, formatted as markdown."""
-        # Use default timeout
-        timeout = DEFAULT_CONFIG["timeouts"]["get_messages"]
+    def subscribe_topic(self, client_id: str, topic: str) -> str:
+        """Subscribe client to a broadcast topic."""
+        if not client_id.strip() or not topic.strip():
+            return "❌ **Error**: Client ID and topic cannot be empty"
+        
+        self.topics.setdefault(topic, {})[client_id] = None
+        logger.info(f"{client_id} subscribed to topic {topic}")
+        count = len(self.topics[topic])
+        return f"✅ **Subscribed** `{client_id}` to topic `{topic}` ({count} subscriber{'s' if count != 1 else ''})"
+    
+    def unsubscribe_topic(self, client_id: str, topic: str) -> str:
+        """Remove client from a broadcast topic."""
+        subscribers = self.topics.get(topic)
+        if not subscribers or client_id not in subscribers:
+            return f"⚠️ **Warning**: `{client_id}` is not subscribed to topic `{topic}`"
+        
+        del subscribers[client_id]
+        if not subscribers:
+            del self.topics[topic]
+        logger.info(f"{client_id} unsubscribed from topic {topic}")
+        return f"✅ **Unsubscribed** `{client_id}` from topic `{topic}`"
+    
+    def subscribe_push(self, client_id: str, send: PushSender) -> str:
+        """Deliver client_id's messages through send (a notification writer) as they arrive."""
+        if not client_id.strip():
+            return "❌ **Error**: Client ID cannot be empty"
+        
+        self.push.subscribe(client_id, send)
+        logger.info(f"{client_id} subscribed to push delivery")
+        return (
+            f"✅ **Push delivery on** for `{client_id}`: new messages arrive as `notifications/message` "
+            "notifications on this session - no need to poll `get_messages`."
+        )
+    
+    def unsubscribe_push(self, client_id: str) -> str:
+        """Stop pushing client_id's messages; they queue for get_messages again."""
+        if not self.push.unsubscribe(client_id):
+            return f"⚠️ **Warning**: `{client_id}` has no push delivery"
+        logger.info(f"{client_id} unsubscribed from push delivery")
+        return f"✅ **Push delivery off** for `{client_id}` - use `get_messages` to receive messages"
+    
+    async def broadcast_message(
+        self,
+        sender_id: str,
+        content: str,
+        recipients: Optional[List[str]] = None,
+        topic: Optional[str] = None,
+    ) -> str:
+        """Send one message to a group of recipients and/or a topic's subscribers.
+        
+        The message is created once and shared by every recipient's queue
+        entry, so cost grows with the number of recipients, not their product
+        with the message size.
+        """
+        if not sender_id.strip():
+            return "❌ **Error**: Sender ID cannot be empty"
+        
+        if not content.strip():
+            return "⚠️ **Warning**: Sending empty message"
         
-        # Cleanup expired messages before processing
-        await self.queue_backend.cleanup_expired_messages()
+        # Explicit recipients first, then topic subscribers; never the sender itself
+        group = dict.fromkeys(r for r in recipients or () if r.strip())
+        group.update(self.topics.get(topic, {}) if topic is not None else {})
+        group.pop(sender_id, None)
         
+        if not group:
+            if topic is not None:
+                return f"❌ **Error**: Broadcast has no recipients (topic `{topic}` has no other subscribers)"
+            return "❌ **Error**: Broadcast has no recipients"
+        
+        # The message is stored once, so it costs the sender one send; each recipient is charged its own
+        limited = self._rate_limited(sender_id, None)
+        if limited:
+            return limited
+        failed_sends = []
+        recipient_ids = []
+        for recipient_id in group:
+            limited = self._rate_limited(None, recipient_id)
+            if limited:
+                failed_sends.append(f"  - **{recipient_id}**: {limited}")
+            else:
+                recipient_ids.append(recipient_id)
+        
+        message = Message(from_client_id=sender_id, content=content)
+        results = await self.queue_backend.send_broadcast(recipient_ids, message) if recipient_ids else []
+        self._count_sends(results)
+        
+        accepted = [r for r, result in zip(recipient_ids, results) if result.accepted]
+        failed_sends.extend(
+            f"  - **{r}**: {self._describe_send(r, result)}"
+            for r, result in zip(recipient_ids, results) if not result.accepted
+        )
+        
+        if accepted:
+            await self.queue_backend.notify_new_messages(accepted)
+            message_log.log("broadcast", sender_id, f"{len(accepted)} recipients", content)
+        
+        target = f"topic `{topic}`" if topic is not None else "group"
+        result_parts = [
+            f"📡 **Broadcast to {target} complete** ({len(accepted)}/{len(group)} successful)",
+            "",
+            f"**✅ Sent to:** {', '.join(f'`{r}`' for r in accepted)}" if accepted else "**✅ Sent to:** nobody",
+        ]
+        if failed_sends:
+            result_parts.extend(["", "**❌ Failed sends:**"] + failed_sends)
+        
+        return "\n".join(result_parts)
+    
+    async def get_messages(
+        self,
+        sender_id: str,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Get and remove pending messages for a sender (one page when limited), formatted as markdown.
+        
+        Blocks for the configured get_messages timeout when nothing is
+        queued, or for timeout seconds if the caller's deadline is sooner.
+        """
         # Validate input
         if not sender_id.strip():
             return "❌ **Error**: Sender ID cannot be empty"
         
+        if max_messages is not None and max_messages < 1:
+            return "❌ **Error**: max_messages must be at least 1"
+        
+        if max_bytes is not None and max_bytes < 1:
+            return "❌ **Error**: max_bytes must be at least 1"
+        
+        if timeout is not None and timeout < 0:
+            return "❌ **Error**: timeout cannot be negative"
+        timeout = self._wait_timeout("get_messages", timeout)
+        
         # Get messages from queue backend
-        messages = await self.queue_backend.get_messages(sender_id, pop=True)
+        messages = await self.queue_backend.get_messages(sender_id, pop=True, max_messages=max_messages, max_bytes=max_bytes)
         
         if not messages:
-            # No messages found - block for configured timeout
+            # No messages found - block for configured timeout, if a waiter slot is free
+            busy = self._admit_wait("get_messages", [sender_id])
+            if busy:
+                return busy
             logger.debug(f"No messages found for {sender_id}, waiting {timeout} seconds...")
             
-            message_arrived = await self.queue_backend.wait_for_new_message(sender_id, timeout)
+            try:
+                messages = await self._wait_for_messages("get_messages", sender_id, timeout, max_messages=max_messages, max_bytes=max_bytes)
+            finally:
+                self.admission.release([sender_id])
             
-            if message_arrived:
-                # Get the new messages that arrived
-                messages = await self.queue_backend.get_messages(sender_id, pop=True)
-                if messages:
-                    logger.info(f"Retrieved {len(messages)} messages for {sender_id} after waiting")
-                    return self._format_messages_as_markdown(sender_id, messages)
-                else:
-                    return "📭 **No messages** for you right now."
-            else:
+            if not messages:
                 logger.debug(f"Timeout waiting for messages for {sender_id}")
                 return "📭 **No messages** for you right now.\n\n💡 **Tip:** Be sure you are using your sender_id (`my_sender_id`) from your `mcp_recipients.json` file, and try again."
+            
+            logger.info(f"Retrieved {len(messages)} messages for {sender_id} after waiting")
+        else:
+            logger.info(f"Retrieved and popped {len(messages)} messages for {sender_id}")
+        
+        result = self._format_messages_as_markdown(sender_id, messages)
         
-        logger.info(f"Retrieved and popped {len(messages)} messages for {sender_id}")
-        return self._format_messages_as_markdown(sender_id, messages)
+        if max_messages is not None or max_bytes is not None:
+            remaining = await self.queue_backend.queue_depth(sender_id)
+            if remaining:
+                result += f"\n📥 **{remaining} more message{'s' if remaining > 1 else ''} waiting** - call `get_messages` again for the next page."
+        
+        return result
     
-    def _format_messages_as_markdown(self, sender_id: str, messages: List[Message]) -> str:
-        """Format a list of messages as markdown."""
-        if not messages:
-            return "📭 **No messages** for you right now."
+    async def get_messages_multi(
+        self,
+        sender_ids: List[str],
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """get_messages for several identities at once, waiting on all their queues in one call.
         
-        # Format each message
-        message_parts = [
-            f"📬 **{len(messages)} message{'s' if len(messages) > 1 else ''} for `{sender_id}`:**\n"
-        ]
+        Returns as soon as any identity has messages, with one section per
+        identity that has some. Page limits apply per identity; timeout is
+        the caller's deadline, as for get_messages.
+        """
+        sender_ids = list(dict.fromkeys(s for s in sender_ids if s.strip()))
+        if not sender_ids:
+            return "❌ **Error**: At least one sender ID must be specified"
+        
+        if max_messages is not None and max_messages < 1:
+            return "❌ **Error**: max_messages must be at least 1"
+        
+        if max_bytes is not None and max_bytes < 1:
+            return "❌ **Error**: max_bytes must be at least 1"
+        
+        if timeout is not None and timeout < 0:
+            return "❌ **Error**: timeout cannot be negative"
+        timeout = self._wait_timeout("get_messages", timeout)
         
-        for msg in messages:
-            relative_time = format_relative_time(msg.timestamp)
-            message_parts.append(f"**From:** `{msg.from_client_id}` ({relative_time})\n{msg.content}\n")
+        # One slot for the call, counted against each identity's cap. Calls
+        # turned away still get what is already queued, without blocking
+        busy = self._admit_wait("get_messages_multi", sender_ids)
+        start = time.perf_counter()
+        try:
+            pages = await self.queue_backend.wait_for_any_messages(
+                sender_ids, 0 if busy else timeout, max_messages=max_messages, max_bytes=max_bytes
+            )
+        finally:
+            if not busy:
+                self.admission.release(sender_ids)
+        outcome = "delivered" if pages else "timeout"
+        metrics.LONG_POLL_WAIT.labels("get_messages_multi", outcome).observe(time.perf_counter() - start)
         
-        return "\n".join(message_parts)
+        if busy and not pages:
+            return busy
+        
+        if not pages:
+            return f"📭 **No messages** for {', '.join(f'`{s}`' for s in sender_ids)} right now."
+        
+        logger.info(f"Retrieved {sum(len(m) for m in pages.values())} messages for {len(pages)} of {len(sender_ids)} identities")
+        sections = []
+        for sender_id in sender_ids:
+            messages = pages.get(sender_id)
+            if not messages:
+                continue
+            section = self._format_messages_as_markdown(sender_id, messages)
+            if max_messages is not None or max_bytes is not None:
+                remaining = await self.queue_backend.queue_depth(sender_id)
+                if remaining:
+                    section += f"\n📥 **{remaining} more message{'s' if remaining > 1 else ''} waiting** for `{sender_id}`."
+            sections.append(section)
+        return "\n---\n\n".join(sections)
+    
+    def _format_messages_as_markdown(self, sender_id: str, messages: List[Message]) -> str:
+        """Format a list of messages as markdown (every page delivered by a tool passes through here)."""
+        now = self._observe_delivery(messages)
+        return self.renderer.render(sender_id, messages, now)
+    
+    @staticmethod
+    def _observe_delivery(messages: List[Message]) -> float:
+        """Record enqueue-to-delivery latency for delivered messages; returns the monotonic "now" used."""
+        now = time.monotonic()
+        observe = metrics.DELIVERY_LATENCY.labels().observe
+        for message in messages:
+            observe(now - message.created_at)
+        return now
     
     def checkin_client(self, client_id: str, name: str, capabilities: str) -> str:
         """Client checkin (for future features, currently just logs)."""
         if not client_id.strip():
             return "❌ **Error**: Client ID cannot be empty"
         
-        # Create/update client info in tracking
-        client_info = {
-            "client_id": client_id,
-            "name": name,
-            "description": capabilities,
-            "clientType": "checked-in client",
-            "last_seen": datetime.now().isoformat(),
-            "messages_in_queue": 0  # Will be updated below
-        }
-        
-        # Update messages in queue count
-        if hasattr(self.queue_backend, 'queues'):
-            queue_messages = self.queue_backend.queues.get(client_id, [])
-            client_info["messages_in_queue"] = len(queue_messages)
-        
-        # Store in global tracking
-        client_activity_tracking[client_id] = client_info
+        self.clients.touch(client_id, name=name, description=capabilities, client_type="checked-in client")
         
         logger.info(f"Client checkin - ID: {client_id}, Name: {name}, Capabilities: {capabilities}")
         
@@ -295,21 +792,26 @@ class MessagingServer:
 
 # Initialize the messaging server and FastMCP
 messaging_server = MessagingServer(
-    queue_backend=InMemoryQueueBackend(
-        message_expiration_seconds=DEFAULT_CONFIG["timeouts"]["message_expiration"]
-    )
+    # Built on first use: main() assigns the backend from its arguments before then,
+    # worker processes and tests get the one QUEUE_BACKEND selects
+    backend_factory=lambda: create_queue_backend(os.getenv("QUEUE_BACKEND", "memory")),
+    clients=ClientRegistry.from_env(),
+    admission=WaitAdmission.from_env(),
+    rate_limits=SendRateLimits.from_env(),
 )
 
 # Initialize FastMCP with HTTP Streamable transport
 mcp = FastMCP(
     name="messaging-server",
     description="MCP server for client-to-client messaging using HTTP Streamable transport. Messaging capabilities are determined by each client's mcp_recipients list, which defines available recipients and client identity. All messaging tools require recipients_config parameter for client activity tracking and proper message routing.",
-    stateless_http=True,  # Use stateless HTTP for Streamable HTTP transport
+    # Stateless HTTP unless push delivery is enabled (--stateful / MCP_STATEFUL)
+    stateless_http=os.getenv("MCP_STATEFUL", "false").lower() != "true",
     json_response=False   # Use SSE streaming format for richer client experience
 )
 
 
 @mcp.tool()
+@metrics.timed_tool
 async def checkin_client(client_id: str, name: str, capabilities: str = "Generic project description") -> str:
     """Check in as a client to announce your presence.
     
@@ -323,22 +825,19 @@ async def checkin_client(client_id: str, name: str, capabilities: str = "Generic
     
     **Note:** For correct identity and attribution, always use the values from your configured `mcp_recipients.json` file. If you are unsure, ask your project lead for the correct configuration.
     """
-    # Update client activity tracking
-    result = messaging_server.checkin_client(client_id, name, capabilities)
-    
-    # Store activity tracking info
-    client_activity_tracking[client_id] = {
-        "client_id": client_id,
-        "name": name,
-        "capabilities": capabilities,
-        "last_checkin": datetime.now().isoformat(),
-        "message_count": len(messaging_server.queue_backend.queues.get(client_id, []))
-    }
-    
-    return result
+    # Records the client in activity tracking
+    return messaging_server.checkin_client(client_id, name, capabilities)
 
 
-async def send_message_and_wait(sender_id: str, recipient_id: str, message: str, expectation: str = "response_expected") -> str:
+async def send_message_and_wait(
+    sender_id: str,
+    recipient_id: str,
+    message: str,
+    expectation: str = "response_expected",
+    correlation_id: Optional[str] = None,
+    timeout_seconds: Optional[float] = None,
+    ctx: Context = None,
+) -> str:
     """Send message and wait for immediate response. **Use only when you need to block and wait.**
     
     **🚨 IMPORTANT**: This blocks for 3 minutes waiting for response! 
@@ -357,6 +856,8 @@ async def send_message_and_wait(sender_id: str, recipient_id: str, message: str,
             - "response_expected": I expect a response via send_message_and_wait
             - "no_response": I do not expect a response
             - "end_conversation": End of conversation
+        correlation_id: Optional - when answering a message that shows a Correlation ID, pass it here
+        timeout_seconds: Optional - stop waiting after this many seconds (at most the server's 3 minutes)
         
     Returns:
         The response message(s) in markdown format, or timeout message (3 minute timeout)
@@ -372,14 +873,18 @@ async def send_message_and_wait(sender_id: str, recipient_id: str, message: str,
     
     # Fire and forget for no_response - don't block
     if expectation == "no_response":
-        result = await messaging_server.send_message(sender_id, recipient_id, formatted_message)
+        result = await messaging_server.send_message(sender_id, recipient_id, formatted_message, correlation_id)
         return f"📭 **Message sent** (no response expected)\n\n{result}"
     
     # Block and wait for response (original behavior)
-    return await messaging_server.send_message_and_wait(sender_id, recipient_id, formatted_message)
+    return await unless_disconnected(
+        messaging_server.send_message_and_wait(sender_id, recipient_id, formatted_message, correlation_id, timeout_seconds),
+        ctx,
+    )
 
 
 @mcp.tool()
+@metrics.timed_tool
 async def send_message_without_waiting(sender_id: str, recipients: List[Dict[str, str]], recipients_config: Dict) -> str:
     """Send messages to one or more recipients instantly (fire & forget).
     
@@ -400,6 +905,8 @@ async def send_message_without_waiting(sender_id: str, recipients: List[Dict[str
         sender_id: Your client ID (MUST be the `my_id` from your local `mcp_recipients.json`)
         recipients: List of recipient-message mappings, where each item is {"id": recipient_id, "message": message_content}. 
                    The recipient_id MUST exist in your local `mcp_recipients.json` file's recipients section.
+                   When replying to a message that shows a Correlation ID, add "correlation_id": that ID
+                   so the reply reaches the call waiting for it.
         recipients_config: Configuration for the sender
         
     Returns:
@@ -408,42 +915,190 @@ async def send_message_without_waiting(sender_id: str, recipients: List[Dict[str
     Examples:
         - Multiple recipients: recipients=[{"id": "alice", "message": "Review code"}, {"id": "bob", "message": "Check UI"}]
         - Single recipient: recipients=[{"id": "alice", "message": "Quick question about the API"}]
+        - Reply: recipients=[{"id": "alice", "message": "Use v2", "correlation_id": "3f2a9c..."}]
         
     Note: Always verify that recipient IDs exist in your local `mcp_recipients.json` before sending messages.
     """
     # Update client activity tracking
-    update_client_activity(recipients_config, messaging_server.queue_backend)
+    update_client_activity(recipients_config)
     
     # Extract recipient IDs and messages from the mappings
     recipient_ids = [r["id"] for r in recipients]
     messages = [r["message"] for r in recipients]
+    correlation_ids = [r.get("correlation_id") or None for r in recipients]
     
-    result = await messaging_server.send_message_without_waiting(sender_id, recipient_ids, messages)
+    result = await messaging_server.send_message_without_waiting(sender_id, recipient_ids, messages, correlation_ids)
     return result
 
 
 @mcp.tool()
-async def get_messages(sender_id: str, recipients_config: Dict) -> str:
+@metrics.timed_tool
+async def broadcast_message(
+    sender_id: str,
+    message: str,
+    recipients_config: Dict,
+    recipients: Optional[List[str]] = None,
+    topic: Optional[str] = None,
+) -> str:
+    """Send the same message to many recipients in one call (fire & forget).
+    
+    The content is stored once and shared by every recipient, so prefer this
+    over send_message_without_waiting when everyone gets identical content.
+    
+    Args:
+        sender_id: Your client ID (MUST be the `my_id` from your local `mcp_recipients.json`)
+        message: The message content sent to every recipient
+        recipients_config: Configuration from your local `mcp_recipients.json`
+        recipients: Optional list of recipient IDs. If neither recipients nor topic is given,
+                    the message goes to every recipient in your `mcp_recipients.json`.
+        topic: Optional topic name - the message also goes to every client subscribed to it
+        
+    Returns:
+        Broadcast results showing which recipients got the message
+    """
+    # Update client activity tracking
+    update_client_activity(recipients_config)
+    
+    if recipients is None and topic is None:
+        recipients = list(recipients_config.get("recipients", {}))
+    
+    return await messaging_server.broadcast_message(sender_id, message, recipients=recipients, topic=topic)
+
+
+@mcp.tool()
+@metrics.timed_tool
+async def subscribe_topic(client_id: str, topic: str, subscribe: bool = True) -> str:
+    """Subscribe to (or unsubscribe from) a broadcast topic.
+    
+    Args:
+        client_id: Your client ID (the `my_id` from your local `mcp_recipients.json`)
+        topic: Topic name, e.g. "releases" or "api-changes"
+        subscribe: True to subscribe, False to unsubscribe
+        
+    Returns:
+        Confirmation of the subscription change
+    """
+    if subscribe:
+        return messaging_server.subscribe_topic(client_id, topic)
+    return messaging_server.unsubscribe_topic(client_id, topic)
+
+
+@mcp.tool()
+@metrics.timed_tool
+async def get_messages(
+    sender_id: str,
+    recipients_config: Dict,
+    max_messages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    timeout_seconds: Optional[float] = None,
+    ctx: Context = None,
+) -> str:
     """Get any pending messages for this sender.
     
     Args:
         sender_id: Your sender ID (MUST be the `my_sender_id` from your local `mcp_recipients.json`)
         recipients_config: Configuration from your local `mcp_recipients.json`
+        max_messages: Optional page size - return at most this many messages (oldest first)
+        max_bytes: Optional page size in bytes of message content (at least one message is always returned)
+        timeout_seconds: Optional - wait at most this many seconds for new messages (0 = don't wait)
         
     Returns:
-        Your messages formatted in markdown (blocks up to 60 seconds waiting for new messages)
+        Your messages formatted in markdown (blocks up to 60 seconds waiting for new messages).
+        When a page limit is given, also says how many messages are still waiting.
         
     Note: If you're not receiving expected messages, verify you're using the correct `my_sender_id` 
     from your `mcp_recipients.json` file, and try again.
     """
     # Update client activity tracking
-    update_client_activity(recipients_config, messaging_server.queue_backend)
+    update_client_activity(recipients_config)
     
     # Get messages from server
-    return await messaging_server.get_messages(sender_id)
+    return await unless_disconnected(
+        messaging_server.get_messages(sender_id, max_messages=max_messages, max_bytes=max_bytes, timeout=timeout_seconds),
+        ctx,
+    )
 
 
 @mcp.tool()
+@metrics.timed_tool
+async def get_messages_multi(
+    sender_ids: List[str],
+    recipients_config: Dict,
+    max_messages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    timeout_seconds: Optional[float] = None,
+    ctx: Context = None,
+) -> str:
+    """Get pending messages for several of your identities in one call.
+    
+    For agents that act as more than one sender ID: waits on all of them at once
+    and returns as soon as any has messages, grouped per identity.
+    
+    Args:
+        sender_ids: Your sender IDs (each one a `my_sender_id` you are configured with)
+        recipients_config: Configuration from your local `mcp_recipients.json`
+        max_messages: Optional page size per identity (oldest first)
+        max_bytes: Optional page size in bytes per identity (at least one message is always returned)
+        timeout_seconds: Optional - wait at most this many seconds for new messages (0 = don't wait)
+        
+    Returns:
+        One markdown section per identity with messages (blocks up to 60 seconds waiting for new messages)
+    """
+    # Update client activity tracking
+    update_client_activity(recipients_config)
+    
+    return await unless_disconnected(
+        messaging_server.get_messages_multi(sender_ids, max_messages=max_messages, max_bytes=max_bytes, timeout=timeout_seconds),
+        ctx,
+    )
+
+
+@mcp.tool()
+@metrics.timed_tool
+async def subscribe_messages(sender_id: str, recipients_config: Dict, ctx: Context, enabled: bool = True) -> str:
+    """Have new messages pushed to this session instead of polling get_messages.
+    
+    Only available when the server runs in stateful mode (--stateful). Each
+    message page arrives as a `notifications/message` notification (logger
+    "mcp_messaging.push") whose data is {"type": "messages", "recipient": ...,
+    "messages": [{"from", "content", "sent_at", "correlation_id"?}]}, sent on
+    the session's standalone SSE stream (the GET stream the client opens).
+    That stream must be open to subscribe; if it closes, undelivered messages
+    stay queued and push stops until you subscribe again.
+    
+    Args:
+        sender_id: Your sender ID (MUST be the `my_sender_id` from your local `mcp_recipients.json`)
+        recipients_config: Configuration from your local `mcp_recipients.json`
+        enabled: True to start push delivery for this session, False to stop it
+        
+    Returns:
+        Confirmation of the change
+    """
+    # Update client activity tracking
+    update_client_activity(recipients_config)
+    
+    if not enabled:
+        return messaging_server.unsubscribe_push(sender_id)
+    
+    if mcp.settings.stateless_http:
+        return "❌ **Error**: Push delivery needs a stateful server (start it with --stateful); use `get_messages` instead."
+    
+    session_id = ctx.request_context.request.headers.get(MCP_SESSION_ID_HEADER)
+    if not push_stream_open(session_id):
+        return "❌ **Error**: This session has no open GET stream to push messages on; open it first or use `get_messages` instead."
+    session = ctx.session
+    
+    async def send(payload: Dict) -> None:
+        # Messages are already popped: fail (and have them restored) rather than let the transport drop them
+        if not push_stream_open(session_id):
+            raise ConnectionError("the session's GET stream is closed")
+        await session.send_log_message(level="info", data=payload, logger="mcp_messaging.push")
+    
+    return messaging_server.subscribe_push(sender_id, send)
+
+
+@mcp.tool()
+@metrics.timed_tool
 async def get_my_identity(recipients_config: Dict) -> str:
     """Get information about your identity and available recipients.
     
@@ -451,7 +1106,7 @@ async def get_my_identity(recipients_config: Dict) -> str:
         Instructions for finding your configuration
     """
     # Update client activity tracking
-    update_client_activity(recipients_config, messaging_server.queue_backend)
+    update_client_activity(recipients_config)
     
     return """## 🆔 Your Messaging Identity & Recipients
 
@@ -484,6 +1139,165 @@ Remember: Always use your my_sender_id from this file - do not generate arbitrar
 
 
 
+async def build_sessions_snapshot(
+    client_ids: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    recent: bool = False,
+) -> Dict:
+    """Session statistics as a dict: messaging clients, queue stats and totals.
+    
+    Args:
+        client_ids: Only include these clients (default: every queued or tracked client)
+        offset: Number of clients to skip
+        limit: Maximum number of clients to include
+        recent: List only tracked clients, most recently active first. The
+            page is sliced from the activity index, so neither the other
+            clients nor every queue's depth are visited.
+    """
+    backend = messaging_server.queue_backend
+    clients = messaging_server.clients
+    clients.evict_stale()
+    
+    if recent:
+        queue_stats = await get_queue_stats()
+        page = [info.client_id for info in clients.recent(offset, limit)]
+        depths = await backend.queue_depths_for(page)
+        messaging_clients = [_client_entry(client_id, depths[client_id]) for client_id in page]
+        total_clients = len(clients)
+    else:
+        queue_depths = await backend.queue_depths()
+        queue_stats = await get_queue_stats(queue_depths)
+        
+        # Clients with queues first (even if not tracked), then tracked clients without queues
+        if client_ids is None:
+            selected = list(queue_depths)
+            selected.extend(info.client_id for info in clients.recent() if info.client_id not in queue_depths)
+        else:
+            selected = [
+                client_id for client_id in dict.fromkeys(client_ids)
+                if client_id in queue_depths or client_id in clients
+            ]
+        
+        page = selected[offset:] if limit is None else selected[offset:offset + limit]
+        messaging_clients = [_client_entry(client_id, queue_depths.get(client_id, 0)) for client_id in page]
+        total_clients = len(selected)
+    
+    # total_messages at root level for frontend compatibility
+    return {
+        "messagingClients": messaging_clients,
+        "queueStats": queue_stats,
+        "waiterStats": messaging_server.admission.stats(),
+        "rateLimits": messaging_server.rate_limits.stats(),
+        "total_messages": queue_stats["total_messages"],
+        "pagination": {"offset": offset, "limit": limit, "total_clients": total_clients},
+    }
+
+
+async def get_queue_stats(queue_depths: Optional[Dict[str, int]] = None) -> Dict:
+    """Queue statistics, kept up to date incrementally by backends that support it."""
+    backend = messaging_server.queue_backend
+    if hasattr(backend, 'get_queue_stats'):
+        return backend.get_queue_stats()
+    
+    if queue_depths is None:
+        queue_depths = await backend.queue_depths()
+    return {
+        "total_queues": len(queue_depths),
+        "total_messages": sum(queue_depths.values()),
+        "active_waiters": len(getattr(backend, 'waiters', {}))
+    }
+
+
+def _client_entry(client_id: str, depth: int) -> Dict:
+    """One messagingClients entry: tracked info (or an untracked placeholder) plus live counts."""
+    info = messaging_server.clients.get(client_id)
+    client_info = info.to_dict() if info is not None else {
+        "client_id": client_id,
+        "name": client_id,
+        "description": "Client with messages in queue",
+        "clientType": "untracked client",
+        # Unknown; a stable value keeps the payload (and its ETag) unchanged between polls
+        "last_seen": None,
+    }
+    waiters = getattr(messaging_server.queue_backend, 'waiters', None)
+    return {
+        **client_info,
+        "messages_in_queue": depth,
+        "waiting_calls": waiters.waiting_on(client_id) if waiters is not None else 0,
+        "blocking_calls": messaging_server.admission.waiting(client_id),
+    }
+
+
+async def build_sessions_delta(client_ids: Set[str]) -> Dict:
+    """Changes for the given clients, in the shape of a sessions snapshot.
+    
+    Clients that are neither tracked nor have queued messages any more are
+    listed under "removed".
+    """
+    backend = messaging_server.queue_backend
+    clients = {}
+    removed = []
+    depths = await backend.queue_depths_for(sorted(client_ids))
+    for client_id, depth in depths.items():
+        if depth or client_id in messaging_server.clients:
+            clients[client_id] = _client_entry(client_id, depth)
+        else:
+            removed.append(client_id)
+    
+    queue_stats = await get_queue_stats()
+    return {
+        "messagingClients": clients,
+        "removed": removed,
+        "queueStats": queue_stats,
+        "waiterStats": messaging_server.admission.stats(),
+        "total_messages": queue_stats["total_messages"],
+    }
+
+
+session_events = SessionEventBus(
+    build_sessions_delta,
+    debounce_seconds=float(os.getenv("SESSION_EVENTS_DEBOUNCE_SECONDS", "0.25")),
+)
+
+
+async def poll_queue_changes(interval: float) -> None:
+    """Feed session_events from periodic depth diffs.
+    
+    Used for backends whose queues are shared between processes and so
+    cannot report every change; runs one poll for all subscribers.
+    """
+    last_depths: Dict[str, int] = {}
+    while True:
+        await asyncio.sleep(interval)
+        if not len(session_events):
+            last_depths = {}
+            continue
+        
+        try:
+            depths = await messaging_server.queue_backend.queue_depths()
+        except Exception as e:
+            logger.warning(f"Error polling queue depths: {e}")
+            continue
+        
+        for client_id in depths.keys() | last_depths.keys():
+            if depths.get(client_id, 0) != last_depths.get(client_id, 0):
+                session_events.mark_dirty(client_id)
+        last_depths = depths
+
+
+def sessions_version() -> Optional[str]:
+    """Token that changes whenever the sessions snapshot would; None if unknown."""
+    messaging_server.clients.evict_stale()
+    backend_version = messaging_server.queue_backend.stats_version()
+    if backend_version is None:
+        return None
+    return (
+        f"{backend_version}.{messaging_server.clients.version}.{messaging_server.admission.version}"
+        f".{messaging_server.rate_limits.version}"
+    )
+
+
 async def _get_active_sessions_internal() -> str:
     """Internal function to get information about active messaging clients.
     
@@ -491,43 +1305,7 @@ async def _get_active_sessions_internal() -> str:
         JSON information about recently active messaging clients including last seen times
     """
     try:
-        # Get queue statistics
-        if hasattr(messaging_server.queue_backend, 'get_queue_stats'):
-            queue_stats = messaging_server.queue_backend.get_queue_stats()
-        else:
-            queue_stats = {
-                "total_queues": len(getattr(messaging_server.queue_backend, 'queues', {})),
-                "total_messages": sum(len(msgs) for msgs in getattr(messaging_server.queue_backend, 'queues', {}).values()),
-                "active_waiters": len(getattr(messaging_server.queue_backend, 'notification_events', {}))
-            }
-        
-        # Update message counts for all queues, even if client isn't tracked
-        messaging_clients = []
-        for client_id, queue in messaging_server.queue_backend.queues.items():
-            client_info = client_activity_tracking.get(client_id, {
-                "client_id": client_id,
-                "name": client_id,
-                "description": "Client with messages in queue",
-                "clientType": "untracked client",
-                "last_seen": datetime.now().isoformat()
-            })
-            client_info["messages_in_queue"] = len(queue)
-            messaging_clients.append(client_info)
-        
-        # Add tracked clients that don't have queues
-        for client_id, client_info in client_activity_tracking.items():
-            if client_id not in messaging_server.queue_backend.queues:
-                client_info["messages_in_queue"] = 0
-                messaging_clients.append(client_info)
-        
-        # Create the response structure with total_messages at root level for frontend compatibility
-        response = {
-            "messagingClients": messaging_clients,
-            "queueStats": queue_stats,
-            "total_messages": queue_stats["total_messages"]  # Add total_messages at root level
-        }
-        
-        return json.dumps(response, indent=2)
+        return json.dumps(await build_sessions_snapshot(), indent=2)
         
     except Exception as e:
         logger.error(f"Error getting session info: {e}")
@@ -535,45 +1313,193 @@ async def _get_active_sessions_internal() -> str:
         return error_msg
 
 
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
+# (etag, body) of the last unfiltered /api/sessions response
+_sessions_cache: Optional[Tuple[str, bytes]] = None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches etag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
 @mcp.custom_route("/api/sessions", methods=["GET", "OPTIONS"])
 async def get_sessions_json(request):
-    """REST endpoint for session statistics - returns pure JSON for normal REST clients."""
+    """REST endpoint for session statistics - returns pure JSON for normal REST clients.
+    
+    Query parameters: client_id (repeatable or comma-separated), offset, limit,
+    order=recent (tracked clients only, most recently active first).
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified
+    without the snapshot being rebuilt.
+    """
+    global _sessions_cache
+    
     # Handle CORS preflight requests
     if request.method == "OPTIONS":
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization"
-        }
-        return JSONResponse(content={}, headers=headers)
+        return JSONResponse(content={}, headers=CORS_HEADERS)
     
     try:
-        # Call our internal get_active_sessions function
-        result = await _get_active_sessions_internal()
-        
-        # Parse the JSON result and return as JSONResponse with CORS headers
-        data = json.loads(result)
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization"
-        }
-        return JSONResponse(content=data, headers=headers)
+        params = request.query_params
+        client_ids = [c for value in params.getlist("client_id") for c in value.split(",") if c] or None
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+        order = params.get("order")
+        if order not in (None, "recent"):
+            raise ValueError(f"unknown order {order!r}")
+        if order and client_ids:
+            raise ValueError("order cannot be combined with client_id")
+    except ValueError as e:
+        return JSONResponse(content={"error": f"Invalid query parameters: {e}"}, status_code=400, headers=CORS_HEADERS)
+    
+    try:
+        if_none_match = request.headers.get("if-none-match")
+        query = request.url.query
+        
+        etag = None
+        version = sessions_version()
+        if version is not None:
+            etag = f'W/"{version}-{zlib.crc32(query.encode()):08x}"'
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={**CORS_HEADERS, "ETag": etag})
+            if not query and _sessions_cache is not None and _sessions_cache[0] == etag:
+                return Response(
+                    content=_sessions_cache[1],
+                    media_type="application/json",
+                    headers={**CORS_HEADERS, "ETag": etag},
+                )
+        
+        data = await build_sessions_snapshot(client_ids, offset, limit, recent=order == "recent")
+        response = JSONResponse(content=data, headers=CORS_HEADERS)
+        
+        if etag is None:
+            # Backend can't version its stats: fall back to a content hash
+            etag = f'W/"{hashlib.sha1(response.body).hexdigest()[:16]}"'
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={**CORS_HEADERS, "ETag": etag})
+        elif not query:
+            _sessions_cache = (etag, response.body)
+        
+        response.headers["ETag"] = etag
+        return response
         
     except Exception as e:
         logger.error(f"Error getting session JSON: {e}")
         error_data = {"error": f"Could not retrieve session information: {str(e)}"}
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization"
-        }
-        return JSONResponse(content=error_data, status_code=500, headers=headers)
+        return JSONResponse(content=error_data, status_code=500, headers=CORS_HEADERS)
+
+
+@mcp.custom_route("/api/sessions/stream", methods=["GET"])
+async def stream_sessions(request):
+    """Server-sent events feed of session statistics for dashboards.
+    
+    Sends a "snapshot" event (same shape as /api/sessions) on connect, then
+    debounced "delta" events for clients whose check-in, queue depth or
+    waiter count changed. A subscriber that falls behind gets a fresh snapshot.
+    """
+    keepalive_seconds = float(os.getenv("SESSION_EVENTS_KEEPALIVE_SECONDS", "15"))
+    
+    async def events():
+        # Subscribe before taking the snapshot so no change falls in between
+        subscription = session_events.subscribe()
+        try:
+            yield format_sse("snapshot", await build_sessions_snapshot())
+            while True:
+                try:
+                    delta = await subscription.get(keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                if delta is None:
+                    yield format_sse("snapshot", await build_sessions_snapshot())
+                else:
+                    yield format_sse("delta", delta)
+        finally:
+            session_events.unsubscribe(subscription)
+    
+    headers = {**CORS_HEADERS, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+async def collect_queue_metrics() -> None:
+    """Sample queue depths and waiter counts into the metrics registry (runs per scrape)."""
+    backend = messaging_server.queue_backend
+    queue_depths = await backend.queue_depths()
+    stats = await get_queue_stats(queue_depths)
+    
+    metrics.QUEUE_DEPTH.reset()
+    observe = metrics.QUEUE_DEPTH.labels().observe
+    for depth in queue_depths.values():
+        observe(depth)
+    metrics.QUEUES.set(stats.get("total_queues", len(queue_depths)))
+    metrics.QUEUED_MESSAGES.set(stats.get("total_messages", sum(queue_depths.values())))
+    metrics.ACTIVE_WAITERS.set(stats.get("active_waiters", 0))
+    metrics.BLOCKING_CALLS.set(len(messaging_server.admission))
+
+
+metrics.REGISTRY.add_collector(collect_queue_metrics)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def get_metrics(request):
+    """Prometheus scrape endpoint: tool latency, delivery latency, long-polls, queue depths, expiry."""
+    try:
+        body = await metrics.REGISTRY.render()
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return PlainTextResponse(f"# error: {e}\n", status_code=500)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # REST endpoints for client registration removed - now handled by client-side parameter injection
 
 
+def create_app() -> Starlette:
+    """Build the Streamable HTTP app with the messaging server tied to its lifespan."""
+    app = mcp.streamable_http_app()
+    # Lets blocking tool calls notice when their client goes away
+    app.add_middleware(DisconnectMiddleware)
+    session_manager_lifespan = app.router.lifespan_context
+    if isinstance(messaging_server.queue_backend, ClusterQueueBackend):
+        # Routes other nodes use to forward sends and long-polls to this one
+        app.router.routes.extend(messaging_server.queue_backend.routes())
+    
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        backend = messaging_server.queue_backend
+        backend.set_change_listener(session_events.mark_dirty)
+        messaging_server.clients.on_change = session_events.mark_dirty
+        poller = None
+        if not backend.emits_queue_changes:
+            poll_seconds = float(os.getenv("SESSION_EVENTS_POLL_SECONDS", "2"))
+            poller = asyncio.create_task(poll_queue_changes(poll_seconds))
+        
+        await messaging_server.start()
+        try:
+            async with session_manager_lifespan(app):
+                yield
+        finally:
+            if poller is not None:
+                poller.cancel()
+            backend.set_change_listener(None)
+            messaging_server.clients.on_change = None
+            await messaging_server.close()
+    
+    app.router.lifespan_context = lifespan
+    return app
+
+
 def main() -> None:
     """Main entry point for the messaging server."""
     parser = argparse.ArgumentParser(description="MCP HTTP Streamable messaging server")
@@ -600,24 +1526,227 @@ def main() -> None:
         "--queue-backend",
         type=str,
         default=os.getenv("QUEUE_BACKEND", "memory"),
-        choices=["memory"],  # Future: add "redis"
+        choices=["memory", "redis", "sqlite", "segment", "broker"],
         help="Queue backend to use"
     )
+    parser.add_argument(
+        "--redis-url",
+        type=str,
+        default=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        help="Redis connection URL (with --queue-backend redis)"
+    )
+    parser.add_argument(
+        "--sqlite-path",
+        type=str,
+        default=os.getenv("SQLITE_PATH", "mcp_messages.db"),
+        help="SQLite database file (with --queue-backend sqlite)"
+    )
+    parser.add_argument(
+        "--segment-dir",
+        type=str,
+        default=os.getenv("SEGMENT_DIR", "mcp_segments"),
+        help="Segment log directory (with --queue-backend segment)"
+    )
+    parser.add_argument(
+        "--broker-socket",
+        type=str,
+        default=os.getenv("BROKER_SOCKET", "mcp_broker.sock"),
+        help="Queue broker Unix socket (with --queue-backend broker or --workers)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("MCP_WORKERS", "1")),
+        help="HTTP worker processes; with the memory backend the queues move to a local broker process"
+    )
+    parser.add_argument(
+        "--cluster-nodes",
+        type=str,
+        default=os.getenv("CLUSTER_NODES", ""),
+        help="Comma-separated base URLs of all cluster nodes (including this one); enables clustered mode"
+    )
+    parser.add_argument(
+        "--node-url",
+        type=str,
+        default=os.getenv("CLUSTER_NODE_URL"),
+        help="This node's base URL as listed in --cluster-nodes (default: http://HOST:PORT)"
+    )
+    parser.add_argument(
+        "--stateful",
+        action="store_true",
+        default=os.getenv("MCP_STATEFUL", "false").lower() == "true",
+        help="Keep MCP sessions so subscribe_messages can push new messages as notifications"
+    )
+    parser.add_argument(
+        "--get-messages-timeout",
+        type=float,
+        default=DEFAULT_CONFIG["timeouts"]["get_messages"],
+        help="Longest get_messages / get_messages_multi wait in seconds (clients may ask for less)"
+    )
+    parser.add_argument(
+        "--send-and-wait-timeout",
+        type=float,
+        default=DEFAULT_CONFIG["timeouts"]["send_message_and_wait"],
+        help="Longest send_message_and_wait wait in seconds (clients may ask for less)"
+    )
+    parser.add_argument(
+        "--message-expiration",
+        type=float,
+        default=DEFAULT_CONFIG["timeouts"]["message_expiration"],
+        help="Seconds before an undelivered message expires"
+    )
+    parser.add_argument(
+        "--max-waiters",
+        type=int,
+        default=messaging_server.admission.max_waiters,
+        help="Most blocking calls parked at once (per process; default unlimited)"
+    )
+    parser.add_argument(
+        "--max-waiters-per-client",
+        type=int,
+        default=messaging_server.admission.max_waiters_per_client,
+        help="Most blocking calls parked at once for one sender ID (default unlimited)"
+    )
+    parser.add_argument(
+        "--send-rate-per-sender",
+        type=float,
+        default=float(os.getenv("SEND_RATE_PER_SENDER") or 0),
+        help="Messages per second one sender may send, burst SEND_BURST_PER_SENDER (0 = unlimited)"
+    )
+    parser.add_argument(
+        "--send-rate-per-recipient",
+        type=float,
+        default=float(os.getenv("SEND_RATE_PER_RECIPIENT") or 0),
+        help="Messages per second one recipient may receive, burst SEND_BURST_PER_RECIPIENT (0 = unlimited)"
+    )
     args = parser.parse_args()
     
+    DEFAULT_CONFIG["timeouts"].update({
+        "get_messages": args.get_messages_timeout,
+        "send_message_and_wait": args.send_and_wait_timeout,
+        "message_expiration": args.message_expiration,
+    })
+    messaging_server.admission.max_waiters = args.max_waiters
+    messaging_server.admission.max_waiters_per_client = args.max_waiters_per_client
+    # Through the environment, so worker processes build the same limits
+    os.environ["SEND_RATE_PER_SENDER"] = str(args.send_rate_per_sender) if args.send_rate_per_sender > 0 else ""
+    os.environ["SEND_RATE_PER_RECIPIENT"] = str(args.send_rate_per_recipient) if args.send_rate_per_recipient > 0 else ""
+    messaging_server.rate_limits = SendRateLimits.from_env()
+    
+    if args.workers > 1:
+        if args.cluster_nodes:
+            parser.error("--cluster-nodes cannot be combined with --workers")
+        if args.stateful:
+            parser.error("--stateful cannot be combined with --workers (sessions live in one process)")
+        run_workers(parser, args)
+        return
+    
+    messaging_server.queue_backend = create_queue_backend(
+        args.queue_backend,
+        redis_url=args.redis_url,
+        sqlite_path=args.sqlite_path,
+        segment_dir=args.segment_dir,
+        broker_socket=args.broker_socket,
+    )
+    
+    if args.cluster_nodes:
+        messaging_server.queue_backend = ClusterQueueBackend(
+            messaging_server.queue_backend,
+            nodes=[node.strip() for node in args.cluster_nodes.split(",") if node.strip()],
+            node_url=args.node_url or f"http://{args.host}:{args.port}",
+            secret=os.getenv("CLUSTER_SECRET") or None,
+            admission=messaging_server.admission,
+        )
+    
     logger.info(f"Starting MCP messaging server on {args.host}:{args.port}")
     logger.info(f"Transport: {args.transport}")
     logger.info(f"Queue backend: {type(messaging_server.queue_backend).__name__}")
-    logger.info("Tools available: checkin_client, send_message_without_waiting, get_messages, get_my_identity")
+    logger.info(f"Sessions: {'stateful (push delivery available)' if args.stateful else 'stateless'}")
+    logger.info(f"Timeouts: {DEFAULT_CONFIG['timeouts']}")
+    logger.info(f"Waiter caps: {args.max_waiters or 'unlimited'} total, {args.max_waiters_per_client or 'unlimited'} per client")
+    logger.info(f"Send rate limits: {messaging_server.rate_limits.stats()}")
+    logger.info("Tools available: checkin_client, send_message_without_waiting, broadcast_message, subscribe_topic, get_messages, get_messages_multi, subscribe_messages, get_my_identity")
     
-    # Configure host and port via FastMCP settings
+    # Configure host, port and session mode via FastMCP settings
     mcp.settings.host = args.host
     mcp.settings.port = args.port
+    mcp.settings.stateless_http = not args.stateful
     
     print(f"🚀 Starting MCP messaging server at http://{args.host}:{args.port}")
     logger.info("MCP messaging server starting", extra={"host": args.host, "port": args.port, "transport": args.transport})
     
-    mcp.run(transport=args.transport)
+    # Run uvicorn directly (instead of mcp.run) so the queue backend's
+    # background work starts and stops with the app lifespan
+    uvicorn.run(
+        create_app(),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
+
+
+def start_broker_process(socket_path: str, timeout: float = 10.0) -> subprocess.Popen:
+    """Start ``python -m mcp_messaging.broker`` and wait until it accepts connections."""
+    process = subprocess.Popen([
+        sys.executable, "-m", "mcp_messaging.broker",
+        "--socket", socket_path,
+        "--message-expiration", str(DEFAULT_CONFIG["timeouts"]["message_expiration"]),
+    ])
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            return process
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"Queue broker did not start on {socket_path}")
+            time.sleep(0.05)
+
+
+def run_workers(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Serve with several uvicorn worker processes sharing one set of queues.
+    
+    Workers import this module afresh and build their backend from the
+    environment, so the chosen backend and timeouts are passed on through
+    QUEUE_BACKEND, GET_MESSAGES_TIMEOUT_SECONDS etc.
+    The memory backend becomes a broker process the workers connect to.
+    Check-in tracking, topic subscriptions and /metrics stay per worker.
+    """
+    if args.queue_backend in ("sqlite", "segment"):
+        parser.error(f"--queue-backend {args.queue_backend} cannot be shared by several workers; use memory, redis or broker")
+    
+    broker_process = None
+    if args.queue_backend == "memory":
+        broker_process = start_broker_process(args.broker_socket)
+        args.queue_backend = "broker"
+    
+    os.environ.update({
+        "QUEUE_BACKEND": args.queue_backend,
+        "REDIS_URL": args.redis_url,
+        "BROKER_SOCKET": args.broker_socket,
+    })
+    os.environ.update({env: str(DEFAULT_CONFIG["timeouts"][name]) for name, env in TIMEOUT_ENV_VARS.items()})
+    for env, cap in (("MAX_WAITERS", args.max_waiters), ("MAX_WAITERS_PER_CLIENT", args.max_waiters_per_client)):
+        os.environ[env] = "" if cap is None else str(cap)
+    
+    print(f"🚀 Starting MCP messaging server at http://{args.host}:{args.port} ({args.workers} workers, {args.queue_backend} backend)")
+    logger.info("MCP messaging server starting", extra={"host": args.host, "port": args.port, "workers": args.workers})
+    
+    try:
+        uvicorn.run(
+            "mcp_messaging.server:create_app",
+            factory=True,
+            workers=args.workers,
+            host=args.host,
+            port=args.port,
+            log_level=mcp.settings.log_level.lower(),
+        )
+    finally:
+        if broker_process is not None:
+            broker_process.terminate()
+            broker_process.wait(timeout=10)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,343 @@
+"""Durable SQLite queue backend (WAL mode, group commit)."""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .limits import EnqueueResult, content_size, take_page
+from .models import Message
+from .message_logging import MessageLogger
+from .queue_backends import QueueBackend
+from .waiters import WaiterRegistry
+
+logger = logging.getLogger(__name__)
+message_log = MessageLogger(logger)
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    correlation_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_recipient_created ON messages (recipient, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_expires ON messages (expires_at) WHERE expires_at IS NOT NULL;
+"""
+
+# (recipient_id, message, deadline, future resolved once the row is committed)
+PendingWrite = Tuple[str, Message, Optional[float], asyncio.Future]
+
+
+class SqliteQueueBackend(QueueBackend):
+    """Queue backend persisting messages in a SQLite database.
+
+    All database access runs on one dedicated thread, so the event loop never
+    blocks on disk I/O. Sends are handed to a writer task that drains whatever
+    has accumulated and commits it in one transaction (group commit): under
+    load, many ``send_message`` calls share one fsync, and each call returns
+    only after its row is durable.
+
+    Deadlines are wall-clock (``time.time()``) so they survive restarts.
+    Wake-ups stay in-process, through a ``WaiterRegistry``.
+    """
+
+    def __init__(
+        self,
+        path: str = "mcp_messages.db",
+        message_expiration_seconds: float = float('inf'),
+        max_batch_size: int = 500,
+        synchronous: str = "FULL",
+        sweep_interval_seconds: float = 1.0,
+    ):
+        self.path = path
+        self.message_expiration_seconds = message_expiration_seconds
+        self.max_batch_size = max_batch_size
+        self.synchronous = synchronous
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.waiters = WaiterRegistry()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-queue")
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._closed = False
+        logger.info(f"Initialized SqliteQueueBackend ({path}, message expiration: {message_expiration_seconds}s)")
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """Run fn on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Database-thread helpers
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "correlation_id" not in columns:
+            # Databases created before correlation IDs were stored
+            conn.execute("ALTER TABLE messages ADD COLUMN correlation_id TEXT")
+        self._conn = conn
+
+    def _insert_batch(self, rows: List[Tuple[str, str, str, float, Optional[float], Optional[str]]]) -> None:
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO messages (recipient, sender, content, created_at, expires_at, correlation_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _select(
+        self, client_id: str, pop: bool, max_messages: Optional[int], max_bytes: Optional[int]
+    ) -> List[Tuple[int, str, str, float, Optional[str]]]:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE" if pop else "BEGIN")
+        try:
+            cursor = conn.execute(
+                "SELECT id, sender, content, created_at, correlation_id FROM messages "
+                "WHERE recipient = ? ORDER BY created_at, id LIMIT ?",
+                (client_id, -1 if max_messages is None else max_messages),
+            )
+            if max_bytes is None:
+                rows = cursor.fetchall()
+            else:
+                rows = take_page(cursor, max_bytes=max_bytes, size=lambda row: content_size(row[2]))
+                cursor.close()
+            if pop and rows:
+                conn.executemany("DELETE FROM messages WHERE id = ?", [(row[0],) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _delete_expired(self, now: float) -> int:
+        return self._conn.execute("DELETE FROM messages WHERE expires_at <= ?", (now,)).rowcount
+
+    def _count(self, client_id: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM messages WHERE recipient = ?", (client_id,)).fetchone()[0]
+
+    def _count_all(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT recipient, COUNT(*) FROM messages GROUP BY recipient").fetchall())
+
+    # Writer task
+
+    async def _write_batches(self) -> None:
+        """Drain the write queue and commit each batch in one transaction.
+
+        A ``None`` item is the shutdown sentinel queued by ``close``; writes
+        queued behind it are failed rather than left waiting forever.
+        """
+        stopping = False
+        while not stopping:
+            item = await self._write_queue.get()
+            if item is None:
+                break
+
+            batch: List[PendingWrite] = [item]
+            while len(batch) < self.max_batch_size and not self._write_queue.empty():
+                item = self._write_queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            rows = [
+                (recipient_id, message.from_client_id, message.content, message.wall_time, deadline, message.correlation_id)
+                for recipient_id, message, deadline, _ in batch
+            ]
+            try:
+                await self._run(self._insert_batch, rows)
+            except Exception as e:
+                logger.error(f"Failed to commit batch of {len(batch)} messages: {e}")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for *_, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            logger.debug(f"Committed batch of {len(batch)} messages")
+
+        while not self._write_queue.empty():
+            item = self._write_queue.get_nowait()
+            if item is not None and not item[3].done():
+                item[3].set_exception(RuntimeError(f"SqliteQueueBackend ({self.path}) is closed"))
+
+    # QueueBackend interface
+
+    async def send_message(self, recipient_id: str, message: Message) -> EnqueueResult:
+        """Queue message for the writer task and wait until it is committed. Raises RuntimeError once closed."""
+        await self.start()
+
+        deadline = None
+        if self.message_expiration_seconds != float('inf'):
+            deadline = time.time() + self.message_expiration_seconds
+
+        committed = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((recipient_id, message, deadline, committed))
+        await committed
+
+        message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return EnqueueResult()
+
+    async def send_messages(self, batch: List[Tuple[str, Message]]) -> List[EnqueueResult]:
+        """Queue the whole batch at once so the writer commits it in one transaction."""
+        await self.start()
+
+        deadline = None
+        if self.message_expiration_seconds != float('inf'):
+            deadline = time.time() + self.message_expiration_seconds
+
+        loop = asyncio.get_running_loop()
+        pending = []
+        for recipient_id, message in batch:
+            committed = loop.create_future()
+            self._write_queue.put_nowait((recipient_id, message, deadline, committed))
+            pending.append(committed)
+        await asyncio.gather(*pending)
+
+        if message_log.enabled:
+            for recipient_id, message in batch:
+                message_log.log("queued", message.from_client_id, recipient_id, message.content)
+        return [EnqueueResult() for _ in batch]
+
+    async def get_messages(
+        self,
+        client_id: str,
+        pop: bool = True,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[Message]:
+        """Get one page of messages for client (and optionally delete it in the same transaction)."""
+        await self.start()
+
+        rows = await self._run(self._select, client_id, pop, max_messages, max_bytes)
+        messages = [
+            Message(from_client_id=sender, content=content, wall_time=created_at, correlation_id=correlation_id)
+            for _, sender, content, created_at, correlation_id in rows
+        ]
+
+        if pop and messages:
+            if message_log.enabled:
+                for msg in messages:
+                    message_log.log("retrieved", msg.from_client_id, client_id, msg.content)
+            logger.info(f"Popped {len(messages)} messages for {client_id}")
+        else:
+            logger.debug(f"Peeked at {len(messages)} messages for {client_id}")
+
+        return messages
+
+    async def cleanup_expired_messages(self) -> int:
+        """Delete expired rows using the expires_at index."""
+        if self.message_expiration_seconds == float('inf'):
+            return 0
+
+        await self.start()
+        removed = await self._run(self._delete_expired, time.time())
+        if removed:
+            logger.info(f"Cleaned up {removed} expired messages")
+        return removed
+
+    async def wait_for_new_message(self, client_id: str, timeout: float) -> bool:
+        """Block until new message arrives, but check existing messages first."""
+        waiter = self.waiters.register([client_id])
+        try:
+            # Registered before checking, so an arrival in between still wakes us
+            if await self.queue_depth(client_id) > 0:
+                logger.debug(f"Messages already available for {client_id}")
+                return True
+
+            logger.debug(f"Waiting for new message for {client_id} (timeout: {timeout}s)")
+            if await self.waiters.wait(waiter, timeout) is None:
+                logger.debug(f"Timeout waiting for message for {client_id}")
+                return False
+            logger.debug(f"Wake-up notification received for {client_id}")
+            return True
+        finally:
+            self.waiters.unregister(waiter)
+
+    async def notify_new_message(self, client_id: str) -> None:
+        """Wake up every blocked call waiting on client_id."""
+        woken = self.waiters.notify(client_id)
+        if woken:
+            logger.debug(f"Notified {woken} blocked calls for {client_id}")
+
+    async def queue_depth(self, client_id: str) -> int:
+        """Number of messages waiting for client_id."""
+        await self.start()
+        return await self._run(self._count, client_id)
+
+    async def queue_depths(self) -> Dict[str, int]:
+        """Queue depth for every client with queued messages."""
+        await self.start()
+        return await self._run(self._count_all)
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Open the database and start the writer and expiry sweeper tasks."""
+        if self._closed:
+            raise RuntimeError(f"SqliteQueueBackend ({self.path}) is closed")
+        if self._writer_task is not None:
+            return
+
+        async with self._start_lock:
+            if self._writer_task is not None:
+                return
+
+            await self._run(self._open)
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._write_batches())
+            if self.message_expiration_seconds != float('inf'):
+                self._sweeper_task = asyncio.create_task(self._sweep_expired_messages())
+            logger.info(f"Opened SQLite queue database {self.path} (WAL, synchronous={self.synchronous})")
+
+    async def close(self) -> None:
+        """Flush pending writes, stop background tasks and close the database."""
+        if self._writer_task is None:
+            return
+        # Later sends raise instead of queueing for a writer that is about to stop
+        self._closed = True
+
+        # Let the writer commit everything already accepted, then stop
+        await self._write_queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
+
+        await self._run(self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+
+    async def _sweep_expired_messages(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await self.run_expiry_sweep()
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {e}")
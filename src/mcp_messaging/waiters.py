@@ -0,0 +1,181 @@
+"""Per-waiter wake-up notifications for blocked message waits."""
+
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import Message
+
+# What a woken waiter receives: the client ID that fired, plus the messages
+# handed to it directly (None for a plain "something arrived" wake-up).
+WakeUp = Tuple[str, Optional[List[Message]]]
+
+
+class Waiter:
+    """One blocked call, waiting on one or more client IDs."""
+
+    __slots__ = ("keys", "future", "accepts_delivery")
+
+    def __init__(self, keys: Tuple[str, ...], future: asyncio.Future, accepts_delivery: bool):
+        self.keys = keys
+        self.future = future
+        self.accepts_delivery = accepts_delivery
+
+    @property
+    def pending(self) -> bool:
+        return not self.future.done()
+
+
+class WaiterRegistry:
+    """Registry of blocked waiters, each with its own future.
+
+    Unlike a shared ``asyncio.Event`` per client, every waiter is resolved
+    individually: a notification wakes *all* current waiters for a client,
+    nobody can clear or delete a wake-up meant for someone else, and a waiter
+    that registered before a check-then-wait cannot miss an arrival.
+
+    Waiters registered with ``accepts_delivery`` can also be handed messages
+    directly (``deliver``), so the woken call needs no second queue read.
+    """
+
+    def __init__(self) -> None:
+        # Insertion-ordered dicts used as ordered sets, so delivery is FIFO
+        self._by_key: Dict[str, Dict[Waiter, None]] = {}
+        self._count = 0
+        # Called with each key whose waiter count changed
+        self.on_change: Optional[Callable[[str], None]] = None
+
+    def __len__(self) -> int:
+        """Number of registered waiters."""
+        return self._count
+
+    def waiting_on(self, key: str) -> int:
+        """Number of waiters registered for key."""
+        return len(self._by_key.get(key, ()))
+
+    def register(self, keys: Iterable[str], accepts_delivery: bool = False) -> Waiter:
+        """Register a waiter on keys. Always pair with ``unregister``."""
+        waiter = Waiter(tuple(keys), asyncio.get_running_loop().create_future(), accepts_delivery)
+        for key in waiter.keys:
+            self._by_key.setdefault(key, {})[waiter] = None
+        self._count += 1
+        if self.on_change is not None:
+            for key in waiter.keys:
+                self.on_change(key)
+        return waiter
+
+    def unregister(self, waiter: Waiter) -> None:
+        """Remove waiter from every key it was registered on."""
+        removed = False
+        for key in waiter.keys:
+            waiters = self._by_key.get(key)
+            if waiters is not None and waiter in waiters:
+                del waiters[waiter]
+                removed = True
+                if not waiters:
+                    del self._by_key[key]
+        if removed:
+            self._count -= 1
+            if self.on_change is not None:
+                for key in waiter.keys:
+                    self.on_change(key)
+
+    def notify(self, key: str) -> int:
+        """Wake every pending waiter registered on key. Returns how many were woken."""
+        woken = 0
+        for waiter in self._by_key.get(key, ()):
+            if waiter.pending:
+                waiter.future.set_result((key, None))
+                woken += 1
+        return woken
+
+    def deliver(self, key: str, messages: List[Message]) -> bool:
+        """Hand messages to the oldest pending waiter on key that accepts delivery."""
+        for waiter in self._by_key.get(key, ()):
+            if waiter.accepts_delivery and waiter.pending:
+                waiter.future.set_result((key, messages))
+                return True
+        return False
+
+    @staticmethod
+    async def wait(waiter: Waiter, timeout: float) -> Optional[WakeUp]:
+        """Wait for waiter to be woken. Returns None on timeout."""
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ReplyWaiter:
+    """One ``send_message_and_wait`` call waiting for the reply to its request."""
+
+    __slots__ = ("client_id", "peer_id", "correlation_id", "future")
+
+    def __init__(self, client_id: str, peer_id: str, correlation_id: str, future: asyncio.Future):
+        self.client_id = client_id
+        self.peer_id = peer_id
+        self.correlation_id = correlation_id
+        self.future = future
+
+
+class ReplyRegistry:
+    """Pending request/reply calls, indexed so a reply finds its call in O(1).
+
+    A message sent to a waiting client is its reply if it carries the call's
+    correlation ID. Both sides of a conversation can keep quoting one ID, as
+    waiters are indexed by (waiting client, correlation ID). A message
+    without a correlation ID (from an agent that does not quote it) is the
+    reply of the oldest call waiting on its sender.
+    Anything else - other senders, or replies to other requests - is not
+    matched and stays queued for ``get_messages``.
+    """
+
+    def __init__(self) -> None:
+        self._by_correlation: Dict[Tuple[str, str], ReplyWaiter] = {}
+        # (waiting client, peer) -> waiters, as an insertion-ordered set
+        self._by_peer: Dict[Tuple[str, str], Dict[ReplyWaiter, None]] = {}
+
+    def __len__(self) -> int:
+        """Number of calls waiting for a reply."""
+        return len(self._by_correlation)
+
+    def register(self, client_id: str, peer_id: str, correlation_id: str) -> ReplyWaiter:
+        """Wait for the reply to a request from client_id to peer_id. Always pair with ``unregister``."""
+        waiter = ReplyWaiter(client_id, peer_id, correlation_id, asyncio.get_running_loop().create_future())
+        self._by_correlation[(client_id, correlation_id)] = waiter
+        self._by_peer.setdefault((client_id, peer_id), {})[waiter] = None
+        return waiter
+
+    def unregister(self, waiter: ReplyWaiter) -> None:
+        """Remove waiter from both indexes."""
+        key = (waiter.client_id, waiter.correlation_id)
+        if self._by_correlation.get(key) is waiter:
+            del self._by_correlation[key]
+        key = (waiter.client_id, waiter.peer_id)
+        waiters = self._by_peer.get(key)
+        if waiters is not None:
+            waiters.pop(waiter, None)
+            if not waiters:
+                del self._by_peer[key]
+
+    def deliver(self, recipient_id: str, message: Message) -> bool:
+        """Resolve the call message (sent to recipient_id) answers. False if it answers none."""
+        if message.correlation_id is not None:
+            waiter = self._by_correlation.get((recipient_id, message.correlation_id))
+            if waiter is not None and not waiter.future.done():
+                waiter.future.set_result(message)
+                return True
+            return False
+
+        for waiter in self._by_peer.get((recipient_id, message.from_client_id), ()):
+            if not waiter.future.done():
+                waiter.future.set_result(message)
+                return True
+        return False
+
+    @staticmethod
+    async def wait(waiter: ReplyWaiter, timeout: float) -> Optional[Message]:
+        """Wait for the reply. Returns None on timeout."""
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            return None
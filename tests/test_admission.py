@@ -0,0 +1,61 @@
+"""Tests for admission control of blocking calls."""
+
+import asyncio
+import re
+
+from mcp_messaging import server
+from mcp_messaging.admission import WaitAdmission
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+
+
+def test_caps_turn_blocking_calls_away():
+    """Full global or per-client caps give a busy response with a retry hint, without sending."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        messaging = server.MessagingServer(backend, admission=WaitAdmission(max_waiters=2, max_waiters_per_client=1))
+
+        first = asyncio.create_task(messaging.get_messages("alice"))
+        await asyncio.sleep(0.01)
+        result = await messaging.get_messages("alice")
+        assert re.match(r"⏳ \*\*Busy\*\*: too many waiting calls for `alice`\. Retry after \d+ ms\.", result)
+
+        second = asyncio.create_task(messaging.get_messages("bob"))
+        await asyncio.sleep(0.01)
+        result = await messaging.send_message_and_wait("carol", "dave", "ping")
+        assert "server has too many waiting calls" in result
+        assert await backend.queue_depth("dave") == 0
+
+        # Queued messages are still handed out while the caps are full
+        await messaging.send_message("dave", "carol", "already here")
+        assert "already here" in await messaging.get_messages_multi(["carol"])
+        assert messaging.admission.stats()["rejected_calls"] == {"global": 2, "client": 1}
+
+        await messaging.send_message("carol", "alice", "hello")
+        await messaging.send_message("carol", "bob", "hello")
+        await asyncio.gather(first, second)
+        assert len(messaging.admission) == 0
+        assert messaging.admission.waiting("alice") == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_counts_in_sessions_snapshot(monkeypatch):
+    """The sessions snapshot reports admitted blocking calls overall and per client."""
+    async def scenario():
+        messaging = server.MessagingServer(InMemoryQueueBackend(), admission=WaitAdmission(max_waiters=10))
+        monkeypatch.setattr(server, "messaging_server", messaging)
+        messaging.clients.touch("alice")
+
+        waiting = asyncio.create_task(messaging.get_messages("alice"))
+        await asyncio.sleep(0.01)
+        snapshot = await server.build_sessions_snapshot()
+        assert snapshot["waiterStats"]["blocking_calls"] == 1
+        assert snapshot["waiterStats"]["max_blocking_calls"] == 10
+        assert snapshot["messagingClients"][0]["blocking_calls"] == 1
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        snapshot = await server.build_sessions_snapshot()
+        assert snapshot["waiterStats"]["blocking_calls"] == 0
+
+    asyncio.run(scenario())
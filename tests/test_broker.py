@@ -0,0 +1,90 @@
+"""Tests for the local queue broker and its worker-side backend."""
+
+import asyncio
+from datetime import datetime
+
+from mcp_messaging.broker import BrokerQueueBackend, QueueBroker
+from mcp_messaging.limits import QueueLimits
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def test_workers_share_queues_through_broker(tmp_path):
+    """A message sent through one worker's connection is paged out through another's."""
+    async def scenario():
+        broker = QueueBroker(InMemoryQueueBackend(limits=QueueLimits(max_messages_per_queue=3)), str(tmp_path / "broker.sock"))
+        await broker.start()
+        first, second = BrokerQueueBackend(broker.path), BrokerQueueBackend(broker.path)
+        try:
+            message = make_message("héllo")
+            result = await first.send_message("alice", message)
+            assert result.status == "queued"
+
+            # Pipelined: many requests in flight on one connection
+            results = await asyncio.gather(*(first.send_message("alice", make_message(f"m{i}")) for i in range(3)))
+            assert [r.accepted for r in results] == [True, True, False]
+            assert results[2].reason
+
+            assert await second.queue_depths() == {"alice": 3}
+            page = await second.get_messages("alice", max_messages=2)
+            assert [m.content for m in page] == ["héllo", "m0"]
+            assert page[0].seq == message.seq
+            assert page[0].from_client_id == "sender1"
+            assert abs(page[0].wall_time - message.wall_time) < 1e-3
+
+            batch = await second.send_messages([("bob", make_message("b1")), ("carol", make_message("c1"))])
+            assert [r.status for r in batch] == ["queued", "queued"]
+            assert await first.queue_depth("bob") == 1
+        finally:
+            await first.close()
+            await second.close()
+            await broker.close()
+
+    asyncio.run(scenario())
+
+
+def test_broker_pushes_wake_ups_to_other_workers(tmp_path):
+    """A receiver blocked in one worker is woken by a send and notify from another."""
+    async def scenario():
+        broker = QueueBroker(InMemoryQueueBackend(), str(tmp_path / "broker.sock"))
+        await broker.start()
+        sender, receiver = BrokerQueueBackend(broker.path), BrokerQueueBackend(broker.path)
+        try:
+            await receiver.start()
+            waiting = asyncio.create_task(receiver.wait_for_messages("alice", timeout=5.0))
+            await asyncio.sleep(0.05)
+
+            await sender.send_message("alice", make_message("wake up"))
+            await sender.notify_new_messages(["alice"])
+
+            messages = await asyncio.wait_for(waiting, 1.0)
+            assert [m.content for m in messages] == ["wake up"]
+            assert await receiver.wait_for_messages("alice", timeout=0.05) == []
+        finally:
+            await sender.close()
+            await receiver.close()
+            await broker.close()
+
+    asyncio.run(scenario())
+
+
+def test_correlation_id_round_trips(tmp_path):
+    """Correlation IDs cross the broker protocol in both directions."""
+    async def scenario():
+        broker = QueueBroker(InMemoryQueueBackend(), str(tmp_path / "broker.sock"))
+        await broker.start()
+        worker = BrokerQueueBackend(broker.path)
+        try:
+            await worker.send_message("alice", Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+            await worker.send_message("alice", make_message("plain"))
+            messages = await worker.get_messages("alice")
+            assert [m.correlation_id for m in messages] == ["abc123", None]
+        finally:
+            await worker.close()
+            await broker.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+"""Tests for the client activity registry."""
+
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from mcp_messaging import server
+from mcp_messaging.clients import ClientRegistry
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+
+
+def test_registry_evicts_stale_and_excess_clients(monkeypatch):
+    """Clients past the TTL or beyond max_clients are dropped, least recently seen first."""
+    now = [1000.0]
+    monkeypatch.setattr("mcp_messaging.clients.time.monotonic", lambda: now[0])
+    changed = []
+    registry = ClientRegistry(ttl_seconds=60, max_clients=3)
+    registry.on_change = changed.append
+
+    for client_id in ("alice", "bob", "carol"):
+        registry.touch(client_id)
+        now[0] += 10
+    registry.touch("alice", name="Alice")
+    assert [info.client_id for info in registry.recent()] == ["alice", "carol", "bob"]
+    assert registry.get("alice").name == "Alice"
+
+    registry.touch("dave")
+    assert "bob" not in registry and len(registry) == 3
+    assert changed[-2:] == ["dave", "bob"]
+
+    now[0] += 55
+    assert registry.evict_stale() == 1
+    assert [info.client_id for info in registry.recent()] == ["dave", "alice"]
+    assert registry.seen_within("dave", 60) and not registry.seen_within("carol", 60)
+
+
+def test_sessions_recent_order_pages_tracked_clients(monkeypatch):
+    """order=recent lists tracked clients most recent first, with live queue depths."""
+    async def scenario():
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(InMemoryQueueBackend()))
+        for client_id in ("alice", "bob", "carol"):
+            server.update_client_activity({"my_sender_id": client_id, "my_name": client_id.title()})
+        await server.messaging_server.send_message("carol", "bob", "hi")
+        server.messaging_server.checkin_client("alice", "Alice", "reviews")
+
+        request = Request({"type": "http", "method": "GET", "path": "/api/sessions", "query_string": b"order=recent&limit=2", "headers": []})
+        data = json.loads((await server.get_sessions_json(request)).body)
+        clients = data["messagingClients"]
+        assert [c["client_id"] for c in clients] == ["alice", "carol"]
+        assert clients[0]["clientType"] == "checked-in client"
+        assert clients[0]["description"] == "reviews"
+        assert data["pagination"]["total_clients"] == 3
+
+        request = Request({"type": "http", "method": "GET", "path": "/api/sessions", "query_string": b"order=recent&offset=2", "headers": []})
+        clients = json.loads((await server.get_sessions_json(request)).body)["messagingClients"]
+        assert [(c["client_id"], c["messages_in_queue"]) for c in clients] == [("bob", 1)]
+
+    asyncio.run(scenario())
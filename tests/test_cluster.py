@@ -0,0 +1,219 @@
+"""Tests for consistent-hash sharding across bridge nodes."""
+
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+
+from mcp_messaging.admission import WaitAdmission
+from mcp_messaging.cluster import SECRET_HEADER, ClusterQueueBackend, HashRing
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.server import MessagingServer, unless_disconnected
+
+NODES = ["http://node-a", "http://node-b"]
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def make_cluster(admission=None):
+    """Two nodes whose /cluster routes are reached through in-process ASGI transports."""
+    apps = {}
+    client = httpx.AsyncClient(mounts={node: httpx.ASGITransport(app=apps.setdefault(node, Starlette())) for node in NODES})
+    backends = {}
+    for node in NODES:
+        backend = ClusterQueueBackend(InMemoryQueueBackend(), NODES, node, secret="s3cret", client=client, admission=admission)
+        apps[node].router.routes.extend(backend.routes())
+        backends[node] = backend
+    return backends["http://node-a"], backends["http://node-b"]
+
+
+def owned_by(ring: HashRing, node: str) -> str:
+    return next(f"client_{i}" for i in range(1000) if ring.node_for(f"client_{i}") == node)
+
+
+def test_hash_ring_is_stable_and_balanced():
+    """Keys spread evenly, and removing a node only moves the keys it owned."""
+    keys = [f"client_{i}" for i in range(10_000)]
+    ring = HashRing(["http://n1", "http://n2", "http://n3"])
+    owners = {key: ring.node_for(key) for key in keys}
+
+    counts = {node: list(owners.values()).count(node) for node in ring.nodes}
+    assert all(2_500 < count < 4_200 for count in counts.values()), counts
+
+    smaller = HashRing(["http://n1", "http://n2"])
+    moved = [key for key in keys if owners[key] != "http://n3" and smaller.node_for(key) != owners[key]]
+    assert moved == []
+
+
+def test_sends_and_long_polls_are_routed_to_owner():
+    """A node forwards sends for remote recipients and proxies their long-polls to the owner."""
+    async def scenario():
+        node_a, node_b = make_cluster()
+        remote = owned_by(node_a.ring, "http://node-b")
+        local = owned_by(node_a.ring, "http://node-a")
+
+        results = await node_a.send_messages([(remote, make_message("to b")), (local, make_message("to a"))])
+        assert [r.status for r in results] == ["queued", "queued"]
+        assert await node_b.local.queue_depths() == {remote: 1}
+        assert await node_a.local.queue_depths() == {local: 1}
+        assert await node_a.queue_depth(remote) == 1
+
+        messages = await node_a.get_messages(remote)
+        assert [m.content for m in messages] == ["to b"]
+
+        # Long-poll proxied from node A to node B, woken by a send forwarded from A
+        waiting = asyncio.create_task(node_a.wait_for_messages(remote, timeout=5.0))
+        await asyncio.sleep(0.05)
+        await node_a.send_message(remote, make_message("wake"))
+        await node_a.notify_new_message(remote)
+        assert [m.content for m in await asyncio.wait_for(waiting, 1.0)] == ["wake"]
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_owner_rejects_send():
+    """A send to a recipient whose owner cannot be reached is rejected, and a receive reports the error."""
+    async def scenario():
+        node_a, _ = make_cluster()
+        node_a.secret = "wrong"
+        remote = owned_by(node_a.ring, "http://node-b")
+
+        result = await node_a.send_message(remote, make_message("lost"))
+        assert not result.accepted
+        assert "node-b" in result.reason
+
+        # Receiving tools answer with an error instead of failing the call
+        messaging = MessagingServer(node_a)
+        result = await unless_disconnected(messaging.get_messages(remote, timeout=0.1), None)
+        assert "could not be reached" in result
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_correlation_id_round_trips():
+    """Correlation IDs survive a forwarded send and a proxied pop."""
+    async def scenario():
+        node_a, _ = make_cluster()
+        remote = owned_by(node_a.ring, "http://node-b")
+
+        await node_a.send_message(remote, Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+        await node_a.send_message(remote, make_message("plain"))
+        messages = await node_a.get_messages(remote)
+        assert [m.correlation_id for m in messages] == ["abc123", None]
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_proxied_long_poll_requeues_on_disconnect():
+    """A proxying node that hangs up releases the owner's waiter, and later messages stay queued."""
+    async def scenario():
+        _, node_b = make_cluster()
+        remote = owned_by(node_b.ring, "http://node-b")
+        body = json.dumps({"client_id": remote, "wait": 5.0}).encode()
+        hung_up = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {"type": "http.request", "body": body, "more_body": False}
+            await hung_up.wait()
+            return {"type": "http.disconnect"}
+
+        headers = [(SECRET_HEADER.lower().encode(), b"s3cret")]
+        request = Request({"type": "http", "method": "POST", "headers": headers}, receive)
+        serving = asyncio.create_task(node_b._serve_messages(request))
+        await asyncio.sleep(0.01)
+        assert len(node_b.local.waiters) == 1 and len(node_b.admission) == 1
+
+        # The message reaches the parked handler in the same tick as the hang-up
+        await node_b.local.send_message(remote, make_message("not lost"))
+        hung_up.set()
+        # Sent before the handler gives "not lost" back; must not overtake it
+        await node_b.local.send_message(remote, make_message("newer"))
+        response = await asyncio.wait_for(serving, 1.0)
+        assert json.loads(response.body) == {"messages": []}
+        assert len(node_b.local.waiters) == 0 and len(node_b.admission) == 0
+        assert [m.content for m in await node_b.local.get_messages(remote)] == ["not lost", "newer"]
+
+        await node_b.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_owner_waiter_caps_apply_to_proxied_long_polls():
+    """A proxied long-poll over the owner's cap is turned away and returns empty after the retry hint."""
+    async def scenario():
+        admission = WaitAdmission(max_waiters_per_client=1, retry_after_ms=10)
+        node_a, node_b = make_cluster(admission=admission)
+        remote = owned_by(node_a.ring, "http://node-b")
+
+        first = asyncio.create_task(node_a.wait_for_messages(remote, timeout=5.0))
+        await asyncio.sleep(0.05)
+        assert await asyncio.wait_for(node_a.wait_for_messages(remote, timeout=5.0), 1.0) == []
+        assert admission.rejected["client"] == 1
+        assert await asyncio.wait_for(node_a.wait_for_new_message(remote, timeout=5.0), 1.0) is False
+
+        await node_a.send_message(remote, make_message("for the first"))
+        assert [m.content for m in await asyncio.wait_for(first, 1.0)] == ["for the first"]
+        assert len(admission) == 0
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_restore_goes_to_the_head_of_the_owners_queue():
+    """Messages restored through a non-owner node are put back in front of the owner's queue."""
+    async def scenario():
+        node_a, node_b = make_cluster()
+        remote = owned_by(node_a.ring, "http://node-b")
+        await node_a.send_message(remote, make_message("first"))
+        taken = await node_a.get_messages(remote)
+        await node_a.send_message(remote, make_message("second"))
+
+        results = await node_a.restore_messages(remote, taken)
+        assert [r.status for r in results] == ["queued"]
+        assert [m.content for m in await node_b.local.get_messages(remote)] == ["first", "second"]
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_queue_depths_for_batches_per_owner():
+    """Depths of many clients cost one request per remote owner, not one per client."""
+    async def scenario():
+        node_a, _ = make_cluster()
+        remote = [f"client_{i}" for i in range(1000) if node_a.ring.node_for(f"client_{i}") == "http://node-b"][:5]
+        local = owned_by(node_a.ring, "http://node-a")
+        for client_id in remote[:2] + [local]:
+            await node_a.send_message(client_id, make_message("hi"))
+
+        posts = []
+        forward = node_a._post
+
+        async def counting_post(node, path, payload, timeout=None):
+            posts.append(path)
+            return await forward(node, path, payload, timeout)
+
+        node_a._post = counting_post
+        depths = await node_a.queue_depths_for(remote + [local])
+        assert depths == {**{client_id: 0 for client_id in remote}, **dict.fromkeys(remote[:2], 1), local: 1}
+        assert posts == ["/cluster/depths"]
+
+        await node_a.client.aclose()
+
+    asyncio.run(scenario())
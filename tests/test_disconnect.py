@@ -0,0 +1,83 @@
+"""Tests for cancelling blocking calls when their client disconnects, and per-call deadlines."""
+
+import asyncio
+import time
+
+from mcp_messaging.disconnect import DISCONNECTED_KEY, DisconnectMiddleware, cancel_on_disconnect
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.server import MessagingServer
+
+
+def test_middleware_flags_disconnected_requests():
+    """The scope event is set by http.disconnect, and at the latest when the response ends."""
+    async def scenario():
+        seen = {}
+
+        async def app(scope, receive, send):
+            event = scope[DISCONNECTED_KEY]
+            await receive()
+            seen["after_body"] = event.is_set()
+            await receive()
+            seen["after_disconnect"] = event.is_set()
+
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}])
+
+        async def receive():
+            return next(messages)
+
+        scope = {"type": "http"}
+        await DisconnectMiddleware(app)(scope, receive, None)
+        assert seen == {"after_body": False, "after_disconnect": True}
+
+        async def finished_app(scope, receive, send):
+            pass
+
+        scope = {"type": "http"}
+        await DisconnectMiddleware(finished_app)(scope, receive, None)
+        assert scope[DISCONNECTED_KEY].is_set()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_releases_waiter_immediately():
+    """A get_messages wait is cancelled on disconnect and later messages stay queued."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        server = MessagingServer(backend)
+        disconnected = asyncio.Event()
+
+        call = asyncio.create_task(cancel_on_disconnect(server.get_messages("alice"), disconnected))
+        await asyncio.sleep(0.01)
+        assert len(backend.waiters) == 1
+
+        start = time.perf_counter()
+        disconnected.set()
+        assert await asyncio.wait_for(call, 1.0) is None
+        assert time.perf_counter() - start < 1.0
+        assert len(backend.waiters) == 0
+
+        await server.send_message("bob", "alice", "for the next poll")
+        assert await backend.queue_depth("alice") == 1
+
+    asyncio.run(scenario())
+
+
+def test_client_deadline_shortens_wait():
+    """timeout caps the wait below the configured default; negative values are rejected."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+
+        start = time.perf_counter()
+        result = await server.get_messages("alice", timeout=0.05)
+        assert "No messages" in result
+        assert time.perf_counter() - start < 1.0
+
+        result = await server.send_message_and_wait("alice", "bob", "anyone?", timeout=0.05)
+        assert "Timeout" in result
+
+        result = await server.get_messages_multi(["alice", "carol"], timeout=0)
+        assert "No messages" in result
+
+        assert "cannot be negative" in await server.get_messages("alice", timeout=-1)
+
+    asyncio.run(scenario())
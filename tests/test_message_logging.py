@@ -0,0 +1,78 @@
+"""Tests for lazy, sampled message logging."""
+
+import logging
+import queue
+
+from mcp_messaging.message_logging import DeferredQueueHandler, MessageLogConfig, MessageLogger, _LazyMessageRecord
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_logger(name: str, level: int = logging.INFO):
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = RecordingHandler()
+    logger.handlers = [handler]
+    return logger, handler
+
+
+def test_structured_hash_mode_hides_content():
+    """Structured records carry fields and never include the raw content."""
+    logger, handler = make_logger("test.message_logging.hash")
+    message_log = MessageLogger(logger, MessageLogConfig(mode="structured", content="hash"))
+
+    message_log.log("queued", "alice", "bob", "secret payload")
+
+    record, = handler.records
+    assert record.event == "message.queued"
+    assert record.sender == "alice" and record.recipient == "bob"
+    assert "secret payload" not in record.getMessage()
+    assert "sha256:" in record.getMessage()
+
+
+def test_sampling_is_per_sender():
+    """Only one of every N messages per sender is logged."""
+    logger, handler = make_logger("test.message_logging.sampling")
+    message_log = MessageLogger(logger, MessageLogConfig(sample_every=3))
+
+    for _ in range(6):
+        message_log.log("queued", "alice", "bob", "hi")
+    message_log.log("queued", "carol", "bob", "hi")
+
+    assert [r.sender for r in handler.records] == ["alice", "alice", "carol"]
+
+
+def test_disabled_level_skips_formatting():
+    """Below INFO nothing is recorded and the message is never rendered."""
+    logger, handler = make_logger("test.message_logging.level", level=logging.WARNING)
+    message_log = MessageLogger(logger, MessageLogConfig())
+
+    assert not message_log.enabled
+    message_log.log("queued", "alice", "bob", "hi")
+    assert handler.records == []
+
+
+def test_deferred_handler_formats_only_message_records_late():
+    """Other records are merged when logged, so later mutation of their arguments is not seen."""
+    records = queue.Queue()
+    logger = logging.getLogger("test.message_logging.deferred")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers = [DeferredQueueHandler(records)]
+
+    state = ["before"]
+    logger.info("state: %s", state)
+    state[0] = "after"
+    MessageLogger(logger, MessageLogConfig()).log("queued", "alice", "bob", "hi")
+
+    plain, message = records.get_nowait(), records.get_nowait()
+    assert plain.getMessage() == "state: ['before']" and plain.args is None
+    assert isinstance(message.args[0], _LazyMessageRecord)
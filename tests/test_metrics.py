@@ -0,0 +1,73 @@
+"""Tests for in-process metrics and the /metrics endpoint."""
+
+import asyncio
+
+from starlette.requests import Request
+
+from mcp_messaging import metrics, server
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+
+
+def make_request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/metrics", "query_string": b"", "headers": []})
+
+
+def sample(text: str, line_prefix: str) -> float:
+    """Value of the first exposition line starting with line_prefix."""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not found in metrics output")
+
+
+def test_histogram_exposition_is_cumulative():
+    """Bucket counts are cumulative (le is inclusive) and end with +Inf, _sum and _count."""
+    registry = metrics.MetricsRegistry()
+    histogram = metrics.Histogram("test_latency_seconds", "Test histogram.", ["op"], buckets=(0.1, 1.0), registry=registry)
+    child = histogram.labels("read")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    assert asyncio.run(registry.render()).splitlines()[2:] == [
+        'test_latency_seconds_bucket{op="read",le="0.1"} 2',
+        'test_latency_seconds_bucket{op="read",le="1"} 3',
+        'test_latency_seconds_bucket{op="read",le="+Inf"} 4',
+        'test_latency_seconds_sum{op="read"} 3.65',
+        'test_latency_seconds_count{op="read"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_server_activity(monkeypatch):
+    """Sends, deliveries, long-poll timeouts, queue depths and expiry sweeps show up in /metrics."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(backend))
+        monkeypatch.setitem(server.DEFAULT_CONFIG["timeouts"], "get_messages", 0.01)
+        before = await metrics.REGISTRY.render()
+
+        await server.messaging_server.send_message("alice", "bob", "hello")
+        await server.messaging_server.send_message("alice", "carol", "hi")
+        await server.messaging_server.get_messages("bob")
+        await server.messaging_server.get_messages("bob")
+
+        expiring = InMemoryQueueBackend(message_expiration_seconds=0.01)
+        await expiring.send_message("dave", Message(from_client_id="alice", content="old"))
+        await asyncio.sleep(0.05)
+        assert await expiring.run_expiry_sweep() == 1
+
+        response = await server.get_metrics(make_request())
+        assert response.status_code == 200
+        after = response.body.decode()
+
+        def delta(name):
+            return sample(after, name) - sample(before, name) if name in before else sample(after, name)
+
+        assert delta('mcp_messages_sent_total{status="queued"}') == 2
+        assert delta("mcp_message_delivery_seconds_count") == 1
+        assert delta('mcp_long_poll_wait_seconds_count{call="get_messages",outcome="timeout"}') == 1
+        assert delta("mcp_messages_expired_total") == 1
+        assert sample(after, 'mcp_queue_depth_bucket{le="1"}') == 1
+        assert sample(after, "mcp_queued_messages") == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+"""Tests for the shared message model."""
+
+import dataclasses
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from mcp_messaging.models import Message, format_relative_time
+
+
+def test_message_is_compact_and_immutable():
+    """Messages are slotted, frozen, intern the sender and carry seq/size."""
+    first = Message(from_client_id="".join(["sen", "der"]), content="héllo")
+    second = Message(from_client_id="sender", content="hi")
+
+    assert not hasattr(first, "__dict__")
+    assert first.from_client_id is second.from_client_id
+    assert second.seq > first.seq
+    assert first.size == len("héllo".encode())
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.content = "changed"
+
+
+def test_timestamps_round_trip_through_wall_clock():
+    """A wall-clock timestamp survives conversion to the monotonic representation."""
+    timestamp = datetime.now() - timedelta(minutes=5)
+    message = Message(from_client_id="sender", content="hi", timestamp=timestamp)
+
+    assert abs(message.wall_time - timestamp.timestamp()) < 1e-3
+    assert abs((message.timestamp - timestamp).total_seconds()) < 1e-3
+    assert format_relative_time(message.created_at) == "5 minutes ago"
+    assert format_relative_time(message.timestamp) == "5 minutes ago"
+    assert format_relative_time(time.monotonic()) == "just now"
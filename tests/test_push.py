@@ -0,0 +1,116 @@
+"""Tests for push delivery of new messages to subscribed sessions."""
+
+import asyncio
+
+import httpx
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.server.streamable_http import MCP_SESSION_ID_HEADER
+
+from mcp_messaging import server
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.server import MessagingServer
+
+
+def test_queued_and_new_messages_are_pushed():
+    """A subscriber first gets its backlog, then each new message as it is sent."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+        pushed = asyncio.Queue()
+        await server.send_message("bob", "alice", "before subscribing")
+
+        server.subscribe_push("alice", pushed.put)
+        first = await asyncio.wait_for(pushed.get(), 1.0)
+        assert first["recipient"] == "alice"
+        assert [m["content"] for m in first["messages"]] == ["before subscribing"]
+
+        await server.send_message("bob", "alice", "live", correlation_id="abc123")
+        second = await asyncio.wait_for(pushed.get(), 1.0)
+        assert second["messages"][0]["from"] == "bob"
+        assert second["messages"][0]["correlation_id"] == "abc123"
+        assert await server.queue_backend.queue_depth("alice") == 0
+
+        assert "off" in server.unsubscribe_push("alice")
+        await server.send_message("bob", "alice", "after unsubscribing")
+        await asyncio.sleep(0.01)
+        assert await server.queue_backend.queue_depth("alice") == 1
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_push_requeues_messages():
+    """When the session is gone, the page goes back to the queue and the subscription ends."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+
+        async def closed_session(payload):
+            raise ConnectionError("session closed")
+
+        server.subscribe_push("alice", closed_session)
+        await asyncio.sleep(0.01)
+        await server.send_message("bob", "alice", "keep me")
+        await asyncio.sleep(0.01)
+
+        assert "alice" not in server.push
+        assert [m.content for m in await server.queue_backend.get_messages("alice")] == ["keep me"]
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_push_needs_the_sessions_get_stream(monkeypatch):
+    """Over the streamable HTTP transport, push is refused without a GET stream and delivered with one."""
+    async def scenario():
+        messaging = MessagingServer(InMemoryQueueBackend())
+        monkeypatch.setattr(server, "messaging_server", messaging)
+        monkeypatch.setattr(server.mcp.settings, "stateless_http", False)
+        monkeypatch.setattr(server.mcp, "_session_manager", None)
+        uv = uvicorn.Server(uvicorn.Config(server.create_app(), host="127.0.0.1", port=0, log_level="warning"))
+        serving = asyncio.create_task(uv.serve())
+        while not uv.started:
+            await asyncio.sleep(0.01)
+        url = f"http://127.0.0.1:{uv.servers[0].sockets[0].getsockname()[1]}/mcp/"
+
+        def call(method, params=None, id=None):
+            body = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+            if id is not None:
+                body["id"] = id
+            return body
+
+        # A bare client that never opens the GET stream
+        headers = {"Accept": "application/json, text/event-stream"}
+        async with httpx.AsyncClient(headers=headers) as client:
+            init = {"protocolVersion": "2025-03-26", "capabilities": {}, "clientInfo": {"name": "bare", "version": "0"}}
+            response = await client.post(url, json=call("initialize", init, id=1))
+            headers = {MCP_SESSION_ID_HEADER: response.headers[MCP_SESSION_ID_HEADER]}
+            await client.post(url, json=call("notifications/initialized"), headers=headers)
+            args = {"sender_id": "alice", "recipients_config": {"my_sender_id": "alice"}}
+            response = await client.post(url, json=call("tools/call", {"name": "subscribe_messages", "arguments": args}, id=2), headers=headers)
+            assert "no open GET stream" in response.text
+        await messaging.send_message("bob", "alice", "stays queued")
+        await asyncio.sleep(0.05)
+        assert await messaging.queue_backend.queue_depth("alice") == 1
+
+        pushed = asyncio.Queue()
+
+        async def on_log(params):
+            await pushed.put(params.data)
+
+        async with streamablehttp_client(url) as (read, write, session_id):
+            async with ClientSession(read, write, logging_callback=on_log) as session:
+                await session.initialize()
+                while not server.push_stream_open(session_id()):
+                    await asyncio.sleep(0.01)
+                args = {"sender_id": "carol", "recipients_config": {"my_sender_id": "carol"}}
+                await session.call_tool("subscribe_messages", args)
+                await messaging.send_message("bob", "carol", "pushed")
+                payload = await asyncio.wait_for(pushed.get(), 5.0)
+                assert payload["recipient"] == "carol"
+                assert [m["content"] for m in payload["messages"]] == ["pushed"]
+
+        uv.should_exit = True
+        await serving
+
+    asyncio.run(scenario())
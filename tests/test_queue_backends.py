@@ -0,0 +1,382 @@
+"""Tests for the queue backend implementations."""
+
+import asyncio
+import time
+from datetime import datetime
+
+from mcp_messaging.expiry import ExpiryIndex
+from mcp_messaging.limits import OverflowPolicy, QueueLimits
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.server import MessagingServer
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def test_expiry_index_skips_delivered_messages():
+    """Deadlines of already-delivered messages never expire newer ones."""
+    index = ExpiryIndex()
+    index.schedule("alice", 1.0)
+    index.schedule("alice", 2.0)
+    index.consume("alice", 2)
+    index.schedule("alice", 3.0)
+
+    assert index.pop_expired(now=2.5) == {}
+    assert index.pop_expired(now=3.0) == {"alice": 1}
+    assert len(index) == 0
+
+
+def test_expired_messages_removed_by_sweep():
+    """Only messages past their deadline are removed by a sweep."""
+    async def scenario():
+        backend = InMemoryQueueBackend(message_expiration_seconds=0.05)
+        await backend.send_message("alice", make_message("old"))
+        await asyncio.sleep(0.1)
+        await backend.send_message("alice", make_message("new"))
+
+        assert await backend.cleanup_expired_messages() == 1
+        messages = await backend.get_messages("alice")
+        assert [m.content for m in messages] == ["new"]
+
+    asyncio.run(scenario())
+
+
+def test_background_sweeper_expires_messages():
+    """The sweeper started with the backend expires messages without any request."""
+    async def scenario():
+        backend = InMemoryQueueBackend(message_expiration_seconds=0.05, sweep_interval_seconds=0.01)
+        await backend.start()
+        try:
+            await backend.send_message("alice", make_message("hello"))
+            await asyncio.sleep(0.15)
+            assert "alice" not in backend.queues
+        finally:
+            await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_notify_wakes_every_waiter():
+    """Concurrent waiters on the same client all see one arrival."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        waiters = [asyncio.create_task(backend.wait_for_new_message("alice", timeout=1.0)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        await backend.send_message("alice", make_message("hello"))
+        await backend.notify_new_message("alice")
+
+        assert await asyncio.gather(*waiters) == [True, True, True]
+        assert len(backend.waiters) == 0
+
+    asyncio.run(scenario())
+
+
+def test_send_hands_message_to_waiting_receiver():
+    """A blocked wait_for_messages gets the message without it being queued."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        receiver = asyncio.create_task(backend.wait_for_messages("alice", timeout=1.0))
+        await asyncio.sleep(0.01)
+
+        await backend.send_message("alice", make_message("hello"))
+
+        messages = await receiver
+        assert [m.content for m in messages] == ["hello"]
+        assert "alice" not in backend.queues
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_receiver_requeues_handed_off_messages():
+    """Messages handed to a receiver cancelled before resuming are returned or re-queued at the head, never lost."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        receiver = asyncio.create_task(backend.wait_for_messages("alice", timeout=1.0))
+        await asyncio.sleep(0.01)
+
+        await backend.send_message("alice", make_message("hello"))
+        receiver.cancel()
+        # Sent before the cancelled receiver gives "hello" back; must not overtake it
+        await backend.send_message("alice", make_message("later"))
+        result, = await asyncio.gather(receiver, return_exceptions=True)
+
+        delivered = result if isinstance(result, list) else []
+        queued = await backend.get_messages("alice")
+        assert [m.content for m in delivered + queued] == ["hello", "later"]
+
+    asyncio.run(scenario())
+
+
+def test_restored_message_expires_before_newer_ones():
+    """A message put back at the head expires on its own deadline, not that of a newer message."""
+    async def scenario():
+        backend = InMemoryQueueBackend(message_expiration_seconds=0.2)
+        old = Message(from_client_id="bob", content="old", created_at=time.monotonic() - 0.15)
+        await backend.send_message("alice", make_message("new 1"))
+        await backend.send_message("alice", make_message("new 2"))
+        backend._restore_head("alice", [old])
+
+        await asyncio.sleep(0.1)
+        assert await backend.cleanup_expired_messages() == 1
+        assert [m.content for m in await backend.get_messages("alice", pop=False)] == ["new 1", "new 2"]
+
+        await asyncio.sleep(0.15)
+        assert await backend.cleanup_expired_messages() == 2
+        assert await backend.queue_depth("alice") == 0
+
+    asyncio.run(scenario())
+
+
+def test_restore_messages_puts_them_back_at_the_head():
+    """Undelivered messages go back in front of newer ones, even when the queue is full."""
+    async def scenario():
+        backend = InMemoryQueueBackend(limits=QueueLimits(max_messages_per_queue=1))
+        await backend.send_message("alice", make_message("first"))
+        taken = await backend.get_messages("alice")
+        await backend.send_message("alice", make_message("second"))
+
+        results = await backend.restore_messages("alice", taken)
+        assert [r.status for r in results] == ["queued"]
+        assert [m.content for m in await backend.get_messages("alice")] == ["first", "second"]
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_with_backpressure():
+    """With the reject policy a full queue refuses new messages and keeps the old ones."""
+    async def scenario():
+        backend = InMemoryQueueBackend(limits=QueueLimits(max_messages_per_queue=2))
+        assert (await backend.send_message("alice", make_message("one"))).status == "queued"
+        await backend.send_message("alice", make_message("two"))
+
+        result = await backend.send_message("alice", make_message("three"))
+        assert not result.accepted
+        assert "limit 2" in result.reason
+
+        assert [m.content for m in await backend.get_messages("alice")] == ["one", "two"]
+        assert backend.get_queue_stats()["total_messages"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_oldest_by_bytes():
+    """The drop-oldest policy evicts just enough old messages to fit the new one."""
+    async def scenario():
+        limits = QueueLimits(max_bytes_per_queue=10, overflow_policy=OverflowPolicy.DROP_OLDEST)
+        backend = InMemoryQueueBackend(limits=limits)
+        for content in ("aaaa", "bbbb", "cc"):
+            await backend.send_message("alice", make_message(content))
+
+        result = await backend.send_message("alice", make_message("dddd"))
+        assert result.status == "dropped_oldest"
+        assert result.dropped == 1
+
+        assert [m.content for m in await backend.get_messages("alice")] == ["bbbb", "cc", "dddd"]
+
+    asyncio.run(scenario())
+
+
+def test_overflow_spills_to_disk_and_refills_in_order(tmp_path):
+    """Spilled messages come back, in order, once the in-memory queue drains."""
+    async def scenario():
+        limits = QueueLimits(
+            max_messages_per_queue=2,
+            overflow_policy=OverflowPolicy.SPILL,
+            spill_directory=str(tmp_path),
+        )
+        backend = InMemoryQueueBackend(limits=limits)
+        results = [await backend.send_message("alice", make_message(str(i))) for i in range(5)]
+        assert [r.status for r in results] == ["queued", "queued", "spilled", "spilled", "spilled"]
+        assert await backend.queue_depth("alice") == 5
+
+        received = []
+        while await backend.queue_depth("alice"):
+            received += [m.content for m in await backend.get_messages("alice")]
+        assert received == ["0", "1", "2", "3", "4"]
+        assert not list(tmp_path.iterdir())
+
+    asyncio.run(scenario())
+
+
+def test_spilled_messages_keep_correlation_id(tmp_path):
+    """The spill file round-trips correlation IDs."""
+    async def scenario():
+        limits = QueueLimits(max_messages_per_queue=1, overflow_policy=OverflowPolicy.SPILL, spill_directory=str(tmp_path))
+        backend = InMemoryQueueBackend(limits=limits)
+        await backend.send_message("alice", make_message("first"))
+        result = await backend.send_message("alice", Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+        assert result.status == "spilled"
+
+        received = []
+        while await backend.queue_depth("alice"):
+            received += await backend.get_messages("alice")
+        assert [m.correlation_id for m in received] == [None, "abc123"]
+
+    asyncio.run(scenario())
+
+
+def test_spilled_messages_survive_restart(tmp_path):
+    """A new backend re-counts spill files left behind, without redelivering what was read."""
+    async def scenario():
+        limits = QueueLimits(max_messages_per_queue=2, overflow_policy=OverflowPolicy.SPILL, spill_directory=str(tmp_path))
+        backend = InMemoryQueueBackend(limits=limits)
+        for i in range(7):
+            await backend.send_message("alice", make_message(str(i)))
+        assert [m.content for m in await backend.get_messages("alice")] == ["0", "1"]
+        await backend.close()
+
+        restarted = InMemoryQueueBackend(limits=limits)
+        await restarted.start()
+        assert await restarted.queue_depth("alice") == 3
+        assert restarted.spill.count("alice") == 1  # The rest was refilled into memory
+        await restarted.send_message("alice", make_message("after restart"))
+        received = []
+        while await restarted.queue_depth("alice"):
+            received += [m.content for m in await restarted.get_messages("alice")]
+        assert received == ["4", "5", "6", "after restart"]
+        await restarted.close()
+        assert not list(tmp_path.iterdir())
+
+    asyncio.run(scenario())
+
+
+def test_spill_files_untouched_until_start(tmp_path):
+    """A backend built but dropped before start() leaves spilled messages for the one that starts."""
+    async def scenario():
+        limits = QueueLimits(max_messages_per_queue=1, overflow_policy=OverflowPolicy.SPILL, spill_directory=str(tmp_path))
+        backend = InMemoryQueueBackend(limits=limits)
+        for i in range(3):
+            await backend.send_message("alice", make_message(str(i)))
+        await backend.close()
+
+        discarded = InMemoryQueueBackend(limits=limits)
+        assert discarded.queues == {}
+        assert discarded.spill.count("alice") == 2
+
+        restarted = InMemoryQueueBackend(limits=limits)
+        await restarted.start()
+        assert [m.content for m in await restarted.get_messages("alice")] == ["1"]
+        assert [m.content for m in await restarted.get_messages("alice")] == ["2"]
+        await restarted.close()
+
+    asyncio.run(scenario())
+
+
+def test_messaging_server_builds_its_backend_once():
+    """The factory runs on first use only, and not at all when a backend is assigned first."""
+    built = []
+
+    def factory():
+        built.append(InMemoryQueueBackend())
+        return built[-1]
+
+    lazy = MessagingServer(backend_factory=factory)
+    assert built == []
+    assert lazy.queue_backend is lazy.queue_backend is built[0]
+
+    chosen = InMemoryQueueBackend()
+    configured = MessagingServer(backend_factory=factory)
+    configured.queue_backend = chosen
+    assert configured.queue_backend is chosen
+    assert len(built) == 1
+
+
+def test_get_messages_drains_backlog_in_pages():
+    """max_messages / max_bytes pop bounded pages and leave the rest queued in order."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        for i in range(5):
+            await backend.send_message("alice", make_message(f"msg{i}"))
+
+        peeked = await backend.get_messages("alice", pop=False, max_messages=2)
+        assert [m.content for m in peeked] == ["msg0", "msg1"]
+
+        page = await backend.get_messages("alice", max_messages=2)
+        assert [m.content for m in page] == ["msg0", "msg1"]
+
+        page = await backend.get_messages("alice", max_bytes=9)
+        assert [m.content for m in page] == ["msg2", "msg3"]
+
+        # A message larger than max_bytes is still returned on its own
+        page = await backend.get_messages("alice", max_bytes=1)
+        assert [m.content for m in page] == ["msg4"]
+        assert "alice" not in backend.queues
+        assert backend.get_queue_stats()["total_bytes"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_send_messages_batch_results_in_order():
+    """A batch returns one result per message, including hand-offs and rejections."""
+    async def scenario():
+        backend = InMemoryQueueBackend(limits=QueueLimits(max_messages_per_queue=1))
+        receiver = asyncio.create_task(backend.wait_for_messages("bob", timeout=1.0))
+        await asyncio.sleep(0.01)
+
+        results = await backend.send_messages([
+            ("alice", make_message("one")),
+            ("alice", make_message("two")),
+            ("bob", make_message("three")),
+        ])
+        assert [r.status for r in results] == ["queued", "rejected", "delivered"]
+        assert [m.content for m in await receiver] == ["three"]
+
+    asyncio.run(scenario())
+
+
+def test_broadcast_stores_payload_once():
+    """A broadcast queues one shared message; its bytes count once and are freed with the last reference."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        message = make_message("x" * 1000)
+        results = await backend.send_broadcast(["alice", "bob", "carol"], message)
+        assert all(r.accepted for r in results)
+
+        stats = backend.get_queue_stats()
+        assert stats["total_messages"] == 3
+        assert stats["total_bytes"] == 1000
+        assert stats["stored_payloads"] == 1
+        assert (await backend.get_messages("bob"))[0] is message
+
+        await backend.get_messages("alice")
+        assert backend.get_queue_stats()["total_bytes"] == 1000
+        await backend.get_messages("carol")
+        assert backend.get_queue_stats()["total_bytes"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_any_messages_uses_one_waiter():
+    """One waiter covers every identity; a send to any of them wakes it with that identity's page."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        waiting = asyncio.create_task(backend.wait_for_any_messages(["alice", "bob", "carol"], timeout=5.0))
+        await asyncio.sleep(0.01)
+        assert len(backend.waiters) == 1
+        assert backend.waiters.waiting_on("bob") == 1
+
+        await backend.send_message("bob", make_message("for bob"))
+        pages = await asyncio.wait_for(waiting, 1.0)
+        assert {client_id: [m.content for m in page] for client_id, page in pages.items()} == {"bob": ["for bob"]}
+        assert len(backend.waiters) == 0
+
+        await backend.send_message("alice", make_message("a1"))
+        await backend.send_message("carol", make_message("c1"))
+        pages = await backend.wait_for_any_messages(["alice", "bob", "carol"], timeout=0.1)
+        assert sorted(pages) == ["alice", "carol"]
+        assert await backend.wait_for_any_messages(["alice", "bob"], timeout=0.01) == {}
+
+    asyncio.run(scenario())
+
+
+def test_expiry_index_uses_its_own_clock():
+    """pop_expired defaults to the clock the index was created with."""
+    now = [100.0]
+    index = ExpiryIndex(clock=lambda: now[0])
+    index.schedule("alice", 150.0)
+    assert index.pop_expired() == {}
+    now[0] = 150.0
+    assert index.pop_expired() == {"alice": 1}
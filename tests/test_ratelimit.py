@@ -0,0 +1,53 @@
+"""Tests for token-bucket rate limiting of sends."""
+
+import asyncio
+
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.ratelimit import RateLimiter, SendRateLimits
+from mcp_messaging.server import MessagingServer, is_failed_send
+
+
+def test_bucket_refills_and_idle_buckets_are_evicted():
+    """Tokens come back at the configured rate; a fully refilled bucket is dropped."""
+    limiter = RateLimiter(rate=2.0, burst=2)
+    assert limiter.retry_after("alice", now=0.0) == 0.0
+    limiter.take("alice", now=0.0)
+    limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=0.0) == 0.5
+    assert limiter.retry_after("alice", now=0.25) == 0.25
+    assert limiter.retry_after("alice", now=0.5) == 0.0
+
+    limiter.take("bob", now=0.5)
+    assert len(limiter) == 2
+    # alice has been idle for the 1 s an empty bucket takes to refill
+    assert limiter.evict_idle(now=1.0) == 1
+    assert len(limiter) == 1
+    assert limiter.evict_idle(now=1.5) == 1
+    assert len(limiter) == 0
+
+
+def test_over_limit_sends_are_refused_explicitly():
+    """A sender past its burst is told so, and nothing more reaches its recipients' queues."""
+    async def scenario():
+        backend = InMemoryQueueBackend()
+        server = MessagingServer(
+            backend,
+            rate_limits=SendRateLimits(per_sender=RateLimiter(rate=0.01, burst=2), per_recipient=RateLimiter(rate=0.01, burst=3)),
+        )
+        assert not is_failed_send(await server.send_message("runaway", "alice", "1"))
+        result = await server.send_message_without_waiting("runaway", ["bob", "carol"], ["2", "3"])
+        assert "(1/2 successful)" in result
+        assert "**carol**: ⏳ **Rate limited**: `runaway` is sending faster than the server allows. Retry after" in result
+
+        result = await server.send_message("runaway", "alice", "4")
+        assert is_failed_send(result) and "Rate limited" in result
+        assert await backend.queue_depth("alice") == 1 and await backend.queue_depth("carol") == 0
+
+        # Other senders are unaffected until the recipient's own bucket runs out
+        assert not is_failed_send(await server.send_message("bob", "alice", "5"))
+        assert not is_failed_send(await server.send_message("carol", "alice", "6"))
+        result = await server.send_message("dave", "alice", "7")
+        assert "`alice` is receiving messages faster than the server allows" in result
+        assert server.rate_limits.stats()["per_recipient"]["buckets"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+"""Tests for the Redis queue backend (run against fakeredis)."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from mcp_messaging.models import Message
+
+fakeredis = pytest.importorskip("fakeredis")
+from mcp_messaging.redis_backend import RedisQueueBackend  # noqa: E402
+
+
+def make_backend(**kwargs) -> RedisQueueBackend:
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return RedisQueueBackend(client=client, **kwargs)
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def test_send_and_pop_messages():
+    """Messages come back in order and the queue is emptied on pop."""
+    async def scenario():
+        backend = make_backend()
+        await backend.send_message("alice", make_message("one"))
+        await backend.send_message("alice", make_message("two"))
+
+        assert await backend.queue_depths() == {"alice": 2}
+        assert await backend.queue_depths_for(["alice", "bob"]) == {"alice": 2, "bob": 0}
+        messages = await backend.get_messages("alice")
+        assert [m.content for m in messages] == ["one", "two"]
+        assert await backend.get_messages("alice") == []
+        assert await backend.queue_depths() == {}
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_notify_wakes_waiter():
+    """A published notification wakes a blocked waiter."""
+    async def scenario():
+        backend = make_backend()
+        await backend.start()
+        waiter = asyncio.create_task(backend.wait_for_new_message("alice", timeout=2.0))
+        await asyncio.sleep(0.05)
+
+        await backend.send_message("alice", make_message("hello"))
+        await backend.notify_new_message("alice")
+
+        assert await waiter is True
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_messages_trimmed():
+    """The sweep trims only the expired head of a queue."""
+    async def scenario():
+        backend = make_backend(message_expiration_seconds=0.05)
+        await backend.send_message("alice", make_message("old"))
+        await asyncio.sleep(0.1)
+        await backend.send_message("alice", make_message("new"))
+
+        assert await backend.cleanup_expired_messages() == 1
+        messages = await backend.get_messages("alice")
+        assert [m.content for m in messages] == ["new"]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_paged_pop_leaves_rest_queued():
+    """A bounded page is trimmed from the head; the client stays listed until drained."""
+    async def scenario():
+        backend = make_backend()
+        for i in range(3):
+            await backend.send_message("alice", make_message(f"msg{i}"))
+
+        page = await backend.get_messages("alice", max_messages=2)
+        assert [m.content for m in page] == ["msg0", "msg1"]
+        assert await backend.queue_depths() == {"alice": 1}
+
+        page = await backend.get_messages("alice", max_bytes=100)
+        assert [m.content for m in page] == ["msg2"]
+        assert await backend.queue_depths() == {}
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_send_messages_batch():
+    """A batch to several recipients lands in each queue in order."""
+    async def scenario():
+        backend = make_backend(message_expiration_seconds=60)
+        results = await backend.send_messages([
+            ("alice", make_message("one")),
+            ("bob", make_message("two")),
+            ("alice", make_message("three")),
+        ])
+        assert all(r.accepted for r in results)
+        assert await backend.queue_depths() == {"alice": 2, "bob": 1}
+        assert [m.content for m in await backend.get_messages("alice")] == ["one", "three"]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_correlation_id_round_trips():
+    """A message's correlation ID survives the Redis encoding; messages without one stay without."""
+    async def scenario():
+        backend = make_backend()
+        await backend.send_message("alice", Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+        await backend.send_message("alice", make_message("plain"))
+        messages = await backend.get_messages("alice")
+        assert [m.correlation_id for m in messages] == ["abc123", None]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_first_waiters_share_one_listener():
+    """Waiters arriving together before the listener exists start only one pubsub listener."""
+    async def scenario():
+        backend = make_backend()
+        created = []
+        pubsub = backend.redis.pubsub
+
+        def counting_pubsub(**kwargs):
+            created.append(kwargs)
+            return pubsub(**kwargs)
+
+        backend.redis.pubsub = counting_pubsub
+        waiters = [asyncio.create_task(backend.wait_for_new_message(f"client{i}", timeout=0.05)) for i in range(5)]
+        await asyncio.gather(*waiters)
+        assert len(created) == 1
+        await backend.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+"""Tests for markdown rendering of messages."""
+
+import io
+import time
+
+from mcp_messaging.models import Message
+from mcp_messaging.rendering import EMPTY_INBOX, MarkdownRenderer
+
+
+def test_render_matches_message_block_format():
+    """Rendered output keeps the header and per-message block layout."""
+    now = time.monotonic()
+    messages = [
+        Message(from_client_id="alice", content="first", created_at=now - 10),
+        Message(from_client_id="bob", content="second", created_at=now - 7250),
+    ]
+
+    rendered = MarkdownRenderer().render("carol", messages, now=now)
+
+    assert rendered == (
+        "📬 **2 messages for `carol`:**\n"
+        "\n**From:** `alice` (just now)\nfirst\n"
+        "\n**From:** `bob` (2 hours ago)\nsecond\n"
+    )
+    assert MarkdownRenderer().render("carol", []) == EMPTY_INBOX
+
+
+def test_age_labels_are_bucketed_and_streamed():
+    """Ages in the same display unit share one label; render_to writes into any stream."""
+    renderer = MarkdownRenderer()
+    assert renderer.age_bucket(3 * 3600 + 59 * 60) == renderer.age_bucket(3 * 3600)
+    assert renderer.age_label(90) == "1 minute ago"
+    assert renderer.age_label(3 * 86400 + 5) == "3 days ago"
+
+    buffer = io.StringIO()
+    renderer.render_to(buffer, "carol", [Message(from_client_id="alice", content="hi")])
+    assert buffer.getvalue().startswith("📬 **1 message for `carol`:**\n")
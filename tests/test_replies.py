@@ -0,0 +1,57 @@
+"""Tests for correlation-ID reply routing in send_message_and_wait."""
+
+import asyncio
+
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.server import MessagingServer
+
+
+def test_only_the_reply_ends_the_wait():
+    """Unrelated messages stay queued; the reply quoting the request's ID resolves the call."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+        backend = server.queue_backend
+
+        waiting = asyncio.create_task(server.send_message_and_wait("alice", "bob", "review please?"))
+        await asyncio.sleep(0.01)
+        request = (await backend.get_messages("bob"))[0]
+        assert request.correlation_id
+
+        await server.send_message("carol", "alice", "unrelated")
+        await server.send_message("bob", "alice", "answer to something else", correlation_id="other")
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        await server.send_message_without_waiting("bob", ["alice"], ["looks good"], [request.correlation_id])
+        result = await asyncio.wait_for(waiting, 1.0)
+        assert "looks good" in result and "unrelated" not in result
+        assert [m.content for m in await backend.get_messages("alice")] == ["unrelated", "answer to something else"]
+        assert len(backend.replies) == 0
+
+    asyncio.run(scenario())
+
+
+def test_unquoted_message_from_recipient_is_the_reply():
+    """An agent that replies without the correlation ID still ends the wait."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+
+        waiting = asyncio.create_task(server.send_message_and_wait("alice", "bob", "ping"))
+        await asyncio.sleep(0.01)
+        await server.send_message("bob", "alice", "pong")
+
+        assert "pong" in await asyncio.wait_for(waiting, 1.0)
+        assert await server.queue_backend.queue_depth("alice") == 0
+
+    asyncio.run(scenario())
+
+
+def test_correlation_ids_must_match_messages():
+    """A correlation_ids list of the wrong length is rejected instead of silently dropping sends."""
+    async def scenario():
+        server = MessagingServer(InMemoryQueueBackend())
+        result = await server.send_message_without_waiting("bob", ["alice", "carol"], ["one", "two"], ["abc"])
+        assert result.startswith("❌ **Error**: Number of correlation IDs (1)")
+        assert await server.queue_backend.queue_depth("alice") == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,181 @@
+"""Tests for the append-only segment log queue backend."""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+from mcp_messaging.models import Message
+from mcp_messaging.segment_backend import SegmentLogQueueBackend
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def test_recovery_replays_log_tail(tmp_path):
+    """Messages sent after the last checkpoint are recovered without a clean close."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        for i in range(10):
+            await backend.send_message("alice", make_message(f"msg {i}"))
+        backend.checkpoint()
+        for i in range(10, 15):
+            await backend.send_message("alice", make_message(f"msg {i}"))
+        await backend.get_messages("bob")
+        backend.flush()  # Simulated crash: no close(), no final checkpoint
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        messages = await recovered.get_messages("alice")
+        assert [m.content for m in messages] == [f"msg {i}" for i in range(15)]
+        await recovered.close()
+
+    asyncio.run(scenario())
+
+
+def test_popped_messages_stay_popped_after_restart(tmp_path):
+    """Ack records are replayed, so delivered messages are not redelivered."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path))
+        await backend.send_message("alice", make_message("first"))
+        await backend.get_messages("alice")
+        await backend.send_message("alice", make_message("second"))
+        backend.flush()
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path))
+        assert [m.content for m in await recovered.get_messages("alice")] == ["second"]
+        await recovered.close()
+
+    asyncio.run(scenario())
+
+
+def test_compaction_reclaims_segments(tmp_path):
+    """Sealed segments are relocated/deleted once most of their messages are gone."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        for i in range(300):
+            await backend.send_message("bob" if i % 10 else "alice", make_message(f"payload {i}"))
+        segments_before = len(backend.segments)
+        await backend.get_messages("bob")
+
+        assert await backend.compact() > 0
+        assert len(backend.segments) < segments_before
+        assert len([f for f in os.listdir(tmp_path) if f.endswith(".seg")]) == len(backend.segments)
+
+        messages = await backend.get_messages("alice")
+        assert [m.content for m in messages] == [f"payload {i}" for i in range(0, 300, 10)]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_messages_acked(tmp_path):
+    """Expired messages are removed and stay removed after restart."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path), message_expiration_seconds=0.05)
+        await backend.send_message("alice", make_message("old"))
+        await asyncio.sleep(0.1)
+        await backend.send_message("alice", make_message("new"))
+
+        assert await backend.cleanup_expired_messages() == 1
+        await backend.close()
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path))
+        assert [m.content for m in await recovered.get_messages("alice")] == ["new"]
+        await recovered.close()
+
+    asyncio.run(scenario())
+
+
+def test_correlation_id_round_trips(tmp_path):
+    """Correlation IDs are written to the log and recovered after a restart."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        await backend.send_message("alice", Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+        await backend.send_message("alice", make_message("plain"))
+        backend.flush()
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        messages = await recovered.get_messages("alice")
+        assert [(m.content, m.correlation_id) for m in messages] == [("reply", "abc123"), ("plain", None)]
+        await recovered.close()
+
+    asyncio.run(scenario())
+
+
+def test_background_checkpoint_skipped_when_idle(tmp_path):
+    """The periodic checkpoint is written off the loop, and only after queues changed."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path))
+        checkpoint = os.path.join(str(tmp_path), "checkpoint")
+        await backend._compact_async()
+        assert not os.path.exists(checkpoint)
+
+        await backend.send_message("alice", make_message("hello"))
+        await backend._compact_async()
+        assert os.path.exists(checkpoint)
+
+        os.remove(checkpoint)
+        await backend._compact_async()
+        assert not os.path.exists(checkpoint)
+
+        await backend.get_messages("alice")
+        await backend._compact_async()
+        assert os.path.exists(checkpoint)
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_empty_segment_file_ignored_on_recovery(tmp_path):
+    """A zero-length segment left by a crash right after rolling does not block startup."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        await backend.send_message("alice", make_message("kept"))
+        backend.flush()
+        empty = backend._segment_path(backend._active.base + backend._active.size)
+        open(empty, "wb").close()
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path), segment_bytes=4096)
+        assert os.path.exists(empty)  # Recovery waits for start()
+        await recovered.start()
+        assert not os.path.exists(empty)
+        for i in range(100):
+            await recovered.send_message("alice", make_message(f"more {i}"))
+        messages = await recovered.get_messages("alice")
+        assert [m.content for m in messages] == ["kept"] + [f"more {i}" for i in range(100)]
+        await recovered.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_waits_for_an_in_flight_checkpoint(tmp_path):
+    """close() lets a cancelled compaction's checkpoint write finish before unmapping segments."""
+    async def scenario():
+        backend = SegmentLogQueueBackend(directory=str(tmp_path))
+        await backend.send_message("alice", make_message("hello"))
+        write_checkpoint = backend._write_checkpoint
+        started = threading.Event()
+        errors = []
+
+        def slow_write(*args):
+            started.set()
+            time.sleep(0.2)
+            try:
+                write_checkpoint(*args)
+            except ValueError as e:  # Segment mmap already closed
+                errors.append(e)
+
+        backend._write_checkpoint = slow_write
+        compaction = asyncio.create_task(backend.compact())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        compaction.cancel()
+        await backend.close()
+        assert errors == []
+
+        recovered = SegmentLogQueueBackend(directory=str(tmp_path))
+        assert [m.content for m in await recovered.get_messages("alice")] == ["hello"]
+        await recovered.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+"""Tests for debounced session change events."""
+
+import asyncio
+
+from mcp_messaging.events import SessionEventBus, format_sse
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+
+
+def test_changes_are_coalesced_into_one_delta():
+    """Queue and waiter changes within the debounce window produce a single delta."""
+    async def scenario():
+        built = []
+
+        async def build_delta(client_ids):
+            built.append(set(client_ids))
+            return {"clients": sorted(client_ids)}
+
+        bus = SessionEventBus(build_delta, debounce_seconds=0.02)
+        backend = InMemoryQueueBackend()
+        backend.set_change_listener(bus.mark_dirty)
+
+        # Nothing is recorded without subscribers
+        await backend.send_message("alice", Message(from_client_id="bob", content="early"))
+        await asyncio.sleep(0.05)
+        assert built == []
+
+        subscription = bus.subscribe()
+        for _ in range(10):
+            await backend.send_message("alice", Message(from_client_id="bob", content="hi"))
+        await backend.wait_for_new_message("carol", timeout=0.001)
+
+        assert await subscription.get(timeout=1.0) == {"clients": ["alice", "carol"]}
+        assert built == [{"alice", "carol"}]
+        bus.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_told_to_resync():
+    """A subscriber whose queue overflows gets a single resync marker instead of stale deltas."""
+    async def scenario():
+        async def build_delta(client_ids):
+            return {"clients": sorted(client_ids)}
+
+        bus = SessionEventBus(build_delta, debounce_seconds=0, max_queued_events=2)
+        subscription = bus.subscribe()
+        for i in range(3):
+            bus.mark_dirty(f"client{i}")
+            await asyncio.sleep(0.01)
+
+        assert await subscription.get(timeout=1.0) is None
+        assert subscription.queue.empty()
+        assert format_sse("delta", {"a": 1}) == 'event: delta\ndata: {"a":1}\n\n'
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+"""Tests for the /api/sessions REST endpoint."""
+
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from mcp_messaging import server
+from mcp_messaging.models import Message
+from mcp_messaging.queue_backends import InMemoryQueueBackend
+from mcp_messaging.ratelimit import RateLimiter, SendRateLimits
+
+
+def make_request(query: str = "", if_none_match: str = "") -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/sessions", "query_string": query.encode(), "headers": headers})
+
+
+def test_sessions_etag_and_not_modified(monkeypatch):
+    """An unchanged snapshot answers If-None-Match with 304; a new message changes the ETag."""
+    async def scenario():
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(InMemoryQueueBackend()))
+        monkeypatch.setattr(server, "_sessions_cache", None)
+        backend = server.messaging_server.queue_backend
+        await backend.send_message("alice", Message(from_client_id="bob", content="hi"))
+
+        first = await server.get_sessions_json(make_request())
+        assert first.status_code == 200
+        assert json.loads(first.body)["total_messages"] == 1
+        etag = first.headers["etag"]
+
+        assert (await server.get_sessions_json(make_request(if_none_match=etag))).status_code == 304
+
+        await backend.send_message("alice", Message(from_client_id="bob", content="again"))
+        changed = await server.get_sessions_json(make_request(if_none_match=etag))
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    asyncio.run(scenario())
+
+
+def test_sessions_filter_and_pagination(monkeypatch):
+    """client_id filters the clients; offset/limit page them and report the total."""
+    async def scenario():
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(InMemoryQueueBackend()))
+        backend = server.messaging_server.queue_backend
+        for recipient in ("alice", "bob", "carol"):
+            await backend.send_message(recipient, Message(from_client_id="dave", content="hi"))
+
+        data = json.loads((await server.get_sessions_json(make_request("client_id=bob,carol&limit=1"))).body)
+        assert [c["client_id"] for c in data["messagingClients"]] == ["bob"]
+        assert data["pagination"] == {"offset": 0, "limit": 1, "total_clients": 2}
+
+        data = json.loads((await server.get_sessions_json(make_request("offset=2"))).body)
+        assert [c["client_id"] for c in data["messagingClients"]] == ["carol"]
+
+        assert (await server.get_sessions_json(make_request("limit=abc"))).status_code == 400
+
+    asyncio.run(scenario())
+
+
+def test_sessions_etag_follows_rate_limit_buckets(monkeypatch):
+    """A new or evicted rate-limit bucket changes the ETag, as rateLimits is part of the body."""
+    async def scenario():
+        limits = SendRateLimits(per_sender=RateLimiter(rate=1.0))
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(InMemoryQueueBackend(), rate_limits=limits))
+        monkeypatch.setattr(server, "_sessions_cache", None)
+
+        first = await server.get_sessions_json(make_request())
+        etag = first.headers["etag"]
+        assert json.loads(first.body)["rateLimits"]["per_sender"]["buckets"] == 0
+
+        limits.per_sender.take("alice")
+        changed = await server.get_sessions_json(make_request(if_none_match=etag))
+        assert changed.status_code == 200
+        assert json.loads(changed.body)["rateLimits"]["per_sender"]["buckets"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_content_hash_etag_is_stable_for_untracked_clients(monkeypatch):
+    """Without a backend version, the hashed body of an unchanged snapshot still matches If-None-Match."""
+    class UnversionedBackend(InMemoryQueueBackend):
+        def stats_version(self):
+            return None
+
+    async def scenario():
+        monkeypatch.setattr(server, "messaging_server", server.MessagingServer(UnversionedBackend()))
+        monkeypatch.setattr(server, "_sessions_cache", None)
+        # Queued for a client that never checked in, so it is listed untracked
+        await server.messaging_server.queue_backend.send_message("alice", Message(from_client_id="bob", content="hi"))
+
+        first = await server.get_sessions_json(make_request())
+        assert json.loads(first.body)["messagingClients"][0]["last_seen"] is None
+        await asyncio.sleep(0.01)
+        assert (await server.get_sessions_json(make_request(if_none_match=first.headers["etag"]))).status_code == 304
+
+    asyncio.run(scenario())
@@ -0,0 +1,145 @@
+"""Tests for the durable SQLite queue backend."""
+
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from mcp_messaging.models import Message
+from mcp_messaging.sqlite_backend import SqliteQueueBackend
+
+
+def make_message(content: str, sender: str = "sender1") -> Message:
+    return Message(from_client_id=sender, content=content, timestamp=datetime.now())
+
+
+def test_messages_survive_restart(tmp_path):
+    """Committed messages are still queued after reopening the database."""
+    path = str(tmp_path / "queue.db")
+
+    async def scenario():
+        backend = SqliteQueueBackend(path=path)
+        await asyncio.gather(*(
+            backend.send_message("alice", make_message(f"msg {i}")) for i in range(20)
+        ))
+        await backend.close()
+
+        reopened = SqliteQueueBackend(path=path)
+        assert await reopened.queue_depths() == {"alice": 20}
+        messages = await reopened.get_messages("alice")
+        assert [m.content for m in messages] == [f"msg {i}" for i in range(20)]
+        assert await reopened.queue_depth("alice") == 0
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_rows_deleted(tmp_path):
+    """Expired rows are removed by cleanup."""
+    async def scenario():
+        backend = SqliteQueueBackend(path=str(tmp_path / "queue.db"), message_expiration_seconds=0.05)
+        await backend.send_message("alice", make_message("old"))
+        await asyncio.sleep(0.1)
+        await backend.send_message("alice", make_message("new"))
+
+        assert await backend.cleanup_expired_messages() == 1
+        messages = await backend.get_messages("alice")
+        assert [m.content for m in messages] == ["new"]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_paged_pop_deletes_only_the_page(tmp_path):
+    """max_messages / max_bytes limit the rows selected and deleted."""
+    async def scenario():
+        backend = SqliteQueueBackend(path=str(tmp_path / "queue.db"))
+        for i in range(5):
+            await backend.send_message("alice", make_message(f"msg{i}"))
+
+        page = await backend.get_messages("alice", max_messages=2)
+        assert [m.content for m in page] == ["msg0", "msg1"]
+
+        page = await backend.get_messages("alice", max_bytes=9)
+        assert [m.content for m in page] == ["msg2", "msg3"]
+        assert await backend.queue_depth("alice") == 1
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_any_messages_wakes_on_notify(tmp_path):
+    """The generic multi-identity wait is woken by a notify for any of its IDs."""
+    async def scenario():
+        backend = SqliteQueueBackend(path=str(tmp_path / "queue.db"))
+        waiting = asyncio.create_task(backend.wait_for_any_messages(["alice", "bob"], timeout=5.0))
+        await asyncio.sleep(0.05)
+        assert len(backend.waiters) == 1
+
+        await backend.send_message("bob", make_message("for bob"))
+        await backend.notify_new_message("bob")
+        pages = await asyncio.wait_for(waiting, 1.0)
+        assert {client_id: [m.content for m in page] for client_id, page in pages.items()} == {"bob": ["for bob"]}
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_correlation_id_round_trips(tmp_path):
+    """Correlation IDs are stored in their own nullable column and survive a restart."""
+    path = str(tmp_path / "queue.db")
+
+    async def scenario():
+        backend = SqliteQueueBackend(path=path)
+        await backend.send_message("alice", Message(from_client_id="bob", content="reply", correlation_id="abc123"))
+        await backend.send_message("alice", make_message("plain"))
+        await backend.close()
+
+        reopened = SqliteQueueBackend(path=path)
+        messages = await reopened.get_messages("alice")
+        assert [m.correlation_id for m in messages] == ["abc123", None]
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_database_without_correlation_column_is_migrated(tmp_path):
+    """A database created before correlation IDs were stored gains the column on open."""
+    path = str(tmp_path / "queue.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, recipient TEXT NOT NULL, "
+            "sender TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL)"
+        )
+        conn.execute("INSERT INTO messages (recipient, sender, content, created_at) VALUES ('alice', 'bob', 'old', 1.0)")
+
+    async def scenario():
+        backend = SqliteQueueBackend(path=path)
+        await backend.send_message("alice", Message(from_client_id="bob", content="new", correlation_id="abc123"))
+        messages = await backend.get_messages("alice")
+        assert [(m.content, m.correlation_id) for m in messages] == [("old", None), ("new", "abc123")]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_sends_fail_once_closing(tmp_path):
+    """A send that arrives while the backend closes raises instead of waiting forever."""
+    async def scenario():
+        backend = SqliteQueueBackend(path=str(tmp_path / "queue.db"))
+        await backend.send_message("alice", make_message("committed"))
+
+        closing = asyncio.create_task(backend.close())
+        await asyncio.sleep(0)  # close() has queued its shutdown sentinel
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(backend.send_message("alice", make_message("too late")), 1.0)
+        await closing
+        with pytest.raises(RuntimeError):
+            await backend.send_messages([("alice", make_message("after close"))])
+
+        reopened = SqliteQueueBackend(path=str(tmp_path / "queue.db"))
+        assert [m.content for m in await reopened.get_messages("alice")] == ["committed"]
+        await reopened.close()
+
+    asyncio.run(scenario())